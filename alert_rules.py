@@ -0,0 +1,278 @@
+"""
+PRISM 경고 규칙 엔진
+- 구역별 임계값 (기본 규칙 + 구역별 덮어쓰기)
+- 임계값 / 변화율 규칙, 지속 시간 조건, 히스테리시스
+- 규칙은 한 번만 컴파일하고, 샘플은 백그라운드 큐에서 하나씩 증분 평가 (샘플당 규칙 수만큼의 고정 비용)
+
+규칙 예시 (PRISM_ALERT_RULES 환경 변수로 JSON 파일 지정 가능):
+{
+  "default": [
+    {"id": "temperature_high", "metric": "temperature", "op": ">", "threshold": 50,
+     "hysteresis": 2, "duration": 10, "level": "danger"}
+  ],
+  "zones": {
+    "warehouse": [{"id": "temperature_high", "threshold": 40}]
+  }
+}
+"""
+
+import asyncio
+import json
+import operator
+import os
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from structured_logging import get_logger
+
+# ============================================
+# 기본 규칙
+# ============================================
+
+DEFAULT_RULES = [
+    {"id": "flame", "metric": "flame", "op": ">=", "threshold": 1, "level": "danger",
+     "message": "불꽃 감지!"},
+    {"id": "temperature_high", "metric": "temperature", "op": ">", "threshold": 50, "hysteresis": 2,
+     "level": "danger", "message": "온도 위험 수준"},
+    {"id": "gas_high", "metric": "gas", "op": ">", "threshold": 100, "hysteresis": 5,
+     "level": "danger", "message": "가스 농도 위험"},
+    {"id": "dust_high", "metric": "dust", "op": ">", "threshold": 100, "hysteresis": 5,
+     "level": "warning", "message": "미세먼지 농도 높음"},
+    {"id": "temperature_rise", "metric": "temperature", "type": "rate", "op": ">", "threshold": 5,
+     "per_seconds": 60, "level": "warning", "message": "온도 급상승"},
+]
+
+METRIC_INDEX = {"temperature": 0, "gas": 1, "dust": 2, "flame": 3}
+OPERATORS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+ALERT_QUEUE_SIZE = 10000  # 평가 대기 샘플 수 (가득 차면 새 샘플은 평가하지 않고 버림)
+
+logger = get_logger("alerts")
+
+# ============================================
+# 규칙 컴파일
+# ============================================
+
+class CompiledRule:
+    """
+    규칙 설정을 평가하기 쉬운 형태로 변환
+    - threshold: 값이 조건을 만족하면 발생, 히스테리시스만큼 벗어나야 해제
+    - rate: window초 이상 떨어진 기준 샘플 대비 변화율(per_seconds 기준)이 조건을 만족하면 발생
+    - duration: 조건이 이 시간(초) 이상 계속되어야 발생
+    """
+
+    __slots__ = ("id", "metric", "index", "type", "op", "threshold", "clear_op", "clear_threshold",
+                 "duration", "per_seconds", "window", "level", "message", "config")
+
+    def __init__(self, config: Dict):
+        if config.get("metric") not in METRIC_INDEX:
+            raise ValueError(f"알 수 없는 지표입니다: {config.get('metric')}")
+        if config.get("op", ">") not in OPERATORS:
+            raise ValueError(f"지원하지 않는 연산자입니다: {config.get('op')}")
+        rule_type = config.get("type", "threshold")
+        if rule_type not in ("threshold", "rate"):
+            raise ValueError(f"지원하지 않는 규칙 종류입니다: {rule_type}")
+
+        self.config = config
+        self.id = config["id"]
+        self.metric = config["metric"]
+        self.index = METRIC_INDEX[self.metric]
+        self.type = rule_type
+        self.op = OPERATORS[config.get("op", ">")]
+        self.threshold = float(config["threshold"])
+        self.duration = float(config.get("duration", 0))
+        self.per_seconds = float(config.get("per_seconds", 60))
+        self.window = float(config.get("window", 30))
+        self.level = config.get("level", "warning")
+        self.message = config.get("message", self.id)
+
+        # 해제 조건: 반대 방향으로 히스테리시스만큼 벗어나야 함
+        hysteresis = float(config.get("hysteresis", 0))
+        if config.get("op", ">") in (">", ">="):
+            self.clear_op = operator.lt
+            self.clear_threshold = self.threshold - hysteresis
+        else:
+            self.clear_op = operator.gt
+            self.clear_threshold = self.threshold + hysteresis
+
+
+def merge_rules(default: List[Dict], overrides: List[Dict]) -> List[Dict]:
+    """구역별 규칙을 같은 id의 기본 규칙에 덮어씀 (새 id는 추가, enabled=false면 제거)"""
+    merged = {rule["id"]: dict(rule) for rule in default}
+    for override in overrides:
+        merged[override["id"]] = {**merged.get(override["id"], {}), **override}
+    return [rule for rule in merged.values() if rule.get("enabled", True)]
+
+
+def load_rule_config() -> Dict:
+    """PRISM_ALERT_RULES(JSON 파일)가 있으면 사용, 없으면 기본 규칙"""
+    path = os.getenv("PRISM_ALERT_RULES")
+    if not path:
+        return {"default": DEFAULT_RULES, "zones": {}}
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    return {"default": config.get("default", DEFAULT_RULES), "zones": config.get("zones", {})}
+
+# ============================================
+# 규칙 상태 (구역 x 규칙)
+# ============================================
+
+class RuleState:
+    __slots__ = ("active", "pending_since", "prev_ts", "prev_value")
+
+    def __init__(self):
+        self.active = False
+        self.pending_since: Optional[float] = None
+        self.prev_ts: Optional[float] = None
+        self.prev_value: Optional[float] = None
+
+# ============================================
+# 경고 엔진
+# ============================================
+
+class AlertEngine:
+    """
+    수신 경로에서는 submit()으로 큐에 넣기만 하고, 백그라운드 태스크가 규칙을 평가
+    상태가 바뀔 때(발생/해제)만 on_event 콜백 호출
+    """
+
+    def __init__(self, on_event: Callable[[Dict], None], config: Optional[Dict] = None):
+        self.on_event = on_event
+        self.config = config or load_rule_config()
+        self._compiled: Dict[str, List[CompiledRule]] = {}
+        self._states: Dict[str, Dict[str, RuleState]] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.dropped = 0
+        self._default_rules = [CompiledRule(rule) for rule in self.config["default"]]
+
+    # --------------------------------------------
+    # 규칙 관리
+    # --------------------------------------------
+
+    def rules_for(self, zone: str) -> List[CompiledRule]:
+        """구역 규칙 (최초 요청 시 한 번만 컴파일)"""
+        rules = self._compiled.get(zone)
+        if rules is None:
+            overrides = self.config["zones"].get(zone)
+            if overrides:
+                rules = [CompiledRule(rule) for rule in merge_rules(self.config["default"], overrides)]
+            else:
+                rules = self._default_rules
+            self._compiled[zone] = rules
+        return rules
+
+    def compile_zone_rules(self, overrides: List[Dict]) -> List[CompiledRule]:
+        """구역별 덮어쓰기를 적용하지 않고 검증/컴파일만 (검증 실패시 ValueError 등)"""
+        return [CompiledRule(rule) for rule in merge_rules(self.config["default"], overrides)]
+
+    def set_zone_rules(self, zone: str, overrides: List[Dict]) -> List[CompiledRule]:
+        """구역별 규칙 교체 (검증 실패시 ValueError, 기존 규칙 유지)"""
+        rules = self.compile_zone_rules(overrides)
+        self.config["zones"][zone] = overrides
+        self._compiled[zone] = rules
+        # 규칙이 바뀌면 해당 구역 상태 초기화
+        self._states.pop(zone, None)
+        return rules
+
+    def restore_active(self, alerts: List[Dict]) -> None:
+        """다른 엔진에서 발생 중이던 경고를 이어받음 (해제 조건을 만족하면 해제 이벤트가 나가도록)"""
+        for alert in alerts:
+            states = self._states.setdefault(alert["zone"], {})
+            state = states.get(alert["rule"])
+            if state is None:
+                state = states[alert["rule"]] = RuleState()
+            state.active = True
+
+    def active_alerts(self) -> List[Dict]:
+        alerts = []
+        for zone, states in self._states.items():
+            for rule in self.rules_for(zone):
+                state = states.get(rule.id)
+                if state is not None and state.active:
+                    alerts.append({"zone": zone, "rule": rule.id, "metric": rule.metric, "level": rule.level})
+        return alerts
+
+    # --------------------------------------------
+    # 백그라운드 평가
+    # --------------------------------------------
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=ALERT_QUEUE_SIZE)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def submit(self, zone: str, ts: float, temperature: float, gas: float, dust: float, flame: bool) -> None:
+        """수신 경로에서 호출: 큐에 넣기만 함 (가득 차면 버림)"""
+        if self._queue is None:
+            return
+        try:
+            self._queue.put_nowait((zone, ts, (temperature, gas, dust, 1.0 if flame else 0.0)))
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _run(self) -> None:
+        while True:
+            zone, ts, values = await self._queue.get()
+            try:
+                self.evaluate(zone, ts, values)
+            except Exception:
+                logger.exception("경고 규칙 평가 오류", extra={"fields": {"zone": zone}})
+
+    def evaluate(self, zone: str, ts: float, values: tuple) -> None:
+        """샘플 하나에 대해 구역 규칙을 증분 평가"""
+        states = self._states.get(zone)
+        if states is None:
+            states = self._states[zone] = {}
+        for rule in self.rules_for(zone):
+            state = states.get(rule.id)
+            if state is None:
+                state = states[rule.id] = RuleState()
+            value = values[rule.index]
+
+            if rule.type == "rate":
+                # 샘플 간격이 짧으면 잡음이 커지므로 기준 샘플과 window초 이상 떨어졌을 때만 평가
+                if state.prev_ts is None:
+                    state.prev_ts, state.prev_value = ts, value
+                    continue
+                elapsed = ts - state.prev_ts
+                if elapsed < rule.window:
+                    continue
+                observed = (value - state.prev_value) / elapsed * rule.per_seconds
+                state.prev_ts, state.prev_value = ts, value
+            else:
+                observed = value
+
+            if not state.active:
+                if rule.op(observed, rule.threshold):
+                    if state.pending_since is None:
+                        state.pending_since = ts
+                    if ts - state.pending_since >= rule.duration:
+                        state.active = True
+                        state.pending_since = None
+                        self._emit(zone, rule, "active", observed, ts)
+                else:
+                    state.pending_since = None
+            elif rule.clear_op(observed, rule.clear_threshold) or (
+                    rule.clear_threshold == rule.threshold and not rule.op(observed, rule.threshold)):
+                state.active = False
+                self._emit(zone, rule, "cleared", observed, ts)
+
+    def _emit(self, zone: str, rule: CompiledRule, status: str, value: float, ts: float) -> None:
+        self.on_event({
+            "zone": zone,
+            "rule": rule.id,
+            "metric": rule.metric,
+            "level": rule.level if status == "active" else "normal",
+            "status": status,
+            "value": None if rule.metric == "flame" else round(value, 2),
+            "message": f"{zone} - {rule.message}" + ("" if status == "active" else " 해제"),
+            "timestamp": datetime.fromtimestamp(ts).isoformat()
+        })
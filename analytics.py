@@ -0,0 +1,140 @@
+"""
+PRISM 구역 통계 / 이상치 분석 (NumPy)
+- 원본 링 버퍼에서 복사한 열 배열을 그대로 NumPy 배열로 보고 계산 (샘플별 Python 반복 없음)
+- 이동 평균/표준편차: 시간 기준 창(window초)을 searchsorted + 누적합으로 계산
+- 이상치: 직전 창의 평균/표준편차 대비 z-score가 기준을 넘는 샘플
+- 여러 구역 비교: 구역별 요약을 같은 형식으로 계산해서 지표별 순위/차이 반환
+"""
+
+from array import array
+from typing import Dict, List, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # /api/analytics만 사용 불가
+    np = None
+
+from history_store import METRICS
+
+PERCENTILES = (5, 25, 50, 75, 95, 99)
+MIN_WINDOW_SAMPLES = 5   # 이동 통계를 믿을 수 있는 최소 샘플 수 (미만이면 z-score 계산 안 함)
+MAX_ANOMALIES = 100      # 응답에 포함하는 이상치 샘플 수 (|z| 큰 순)
+
+Columns = Tuple[array, ...]
+
+
+def available() -> bool:
+    return np is not None
+
+# ============================================
+# 이동 통계
+# ============================================
+
+def rolling_stats(timestamps, values, window: float):
+    """
+    샘플마다 직전 window초 (현재 샘플 제외) 구간의 평균, 표준편차, 샘플 수
+    누적합 차이로 계산하므로 O(n log n) (창 경계 탐색) + O(n)
+    """
+    starts = np.searchsorted(timestamps, timestamps - window, side="left")
+    ends = np.arange(len(values))
+    counts = ends - starts
+
+    # 값을 전체 평균 기준으로 옮겨 누적 제곱합의 자릿수 손실을 줄임
+    shifted = values - values.mean()
+    cumsum = np.concatenate(([0.0], np.cumsum(shifted)))
+    cumsq = np.concatenate(([0.0], np.cumsum(shifted * shifted)))
+    sums = cumsum[ends] - cumsum[starts]
+    squares = cumsq[ends] - cumsq[starts]
+
+    has_window = counts > 0
+    means = np.zeros(len(values))
+    np.divide(sums, counts, out=means, where=has_window)
+    variances = np.zeros(len(values))
+    np.divide(squares, counts, out=variances, where=has_window)
+    variances = np.maximum(variances - means * means, 0.0)
+    # 창이 비어 있는 샘플(구간 첫 샘플 등)은 자기 값, 표준편차 0
+    return np.where(has_window, means + values.mean(), values), np.sqrt(variances), counts
+
+
+def zscores(values, means, stds, counts):
+    """창 샘플이 부족하거나 표준편차가 0이면 0"""
+    valid = (counts >= MIN_WINDOW_SAMPLES) & (stds > 0)
+    scores = np.zeros(len(values))
+    np.divide(values - means, stds, out=scores, where=valid)
+    return scores
+
+# ============================================
+# 요약
+# ============================================
+
+def summarize(columns: Columns, window: float, threshold: float, points: int,
+              percentiles: Sequence[float] = PERCENTILES, detail: bool = True) -> Dict:
+    """
+    (timestamp, temperature, gas, dust) 열 배열의 지표별 요약
+    detail=True면 이동 평균/표준편차 계열(points개로 줄임)과 이상치 샘플 포함
+    """
+    timestamps = np.frombuffer(columns[0], dtype=np.float64)
+    n = len(timestamps)
+    summary: Dict = {"count": n, "metrics": {}}
+    if n == 0:
+        return summary
+    summary["start"] = float(timestamps[0])
+    summary["end"] = float(timestamps[-1])
+
+    # 이동 통계 계열은 균등 간격 인덱스만 반환
+    picks = np.unique(np.linspace(0, n - 1, min(points, n)).astype(np.int64))
+    anomalies: List[Tuple[float, str, float, float]] = []
+
+    for name, column in zip(METRICS, columns[1:]):
+        values = np.frombuffer(column, dtype=np.float64)
+        means, stds, counts = rolling_stats(timestamps, values, window)
+        scores = zscores(values, means, stds, counts)
+        flagged = np.flatnonzero(np.abs(scores) > threshold)
+
+        quantiles = np.percentile(values, percentiles)
+        metric = {
+            "mean": float(values.mean()),
+            "std": float(values.std()),
+            "min": float(values.min()),
+            "max": float(values.max()),
+            "percentiles": {f"p{p:g}": float(q) for p, q in zip(percentiles, quantiles)},
+            "anomalies": int(len(flagged)),
+        }
+        if detail:
+            metric["rolling"] = {
+                "t": (timestamps[picks] * 1000).round().astype(np.int64).tolist(),
+                "mean": means[picks].tolist(),
+                "std": stds[picks].tolist(),
+            }
+            top = flagged[np.argsort(-np.abs(scores[flagged]), kind="stable")[:MAX_ANOMALIES]]
+            anomalies += [(float(timestamps[i]), name, float(values[i]), float(scores[i])) for i in top]
+        summary["metrics"][name] = metric
+
+    if detail:
+        anomalies.sort(key=lambda a: -abs(a[3]))
+        summary["anomalies"] = [
+            {"t": round(ts * 1000), "metric": name, "value": value, "z": round(score, 3)}
+            for ts, name, value, score in sorted(anomalies[:MAX_ANOMALIES])
+        ]
+    return summary
+
+
+def compare(summaries: Dict[str, Dict]) -> Dict[str, Dict]:
+    """
+    구역별 요약의 지표별 비교
+    평균 기준 가장 높은/낮은 구역, 구역 간 차이, 전체 평균 대비 편차
+    """
+    comparison = {}
+    for name in METRICS:
+        means = {zone: s["metrics"][name]["mean"] for zone, s in summaries.items() if name in s["metrics"]}
+        if not means:
+            continue
+        overall = sum(means.values()) / len(means)
+        comparison[name] = {
+            "mean": means,
+            "highest": max(means, key=means.get),
+            "lowest": min(means, key=means.get),
+            "spread": max(means.values()) - min(means.values()),
+            "deviation": {zone: value - overall for zone, value in means.items()},
+        }
+    return comparison
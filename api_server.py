@@ -4,15 +4,41 @@ PRISM 센서 데이터 FastAPI 서버
 SSH를 통한 원격 장치 관리 기능 포함
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, ConfigDict, ValidationError
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict
+from typing import Any, List, Optional, Dict
 import random
+from array import array
 import asyncio
+from contextlib import nullcontext
+import logging
+import math
 import os
+import time
+
+from alert_rules import AlertEngine
+import analytics
+from device_registry import DeviceRecord, DeviceRegistry
+from history_archive import ARCHIVE_RETENTION_SECONDS, ZoneArchive, find_gaps, median_interval, merge_columns
+from history_export import ENCODERS, RAW_FIELDS, ROLLUP_FIELDS, stream_export
+from history_store import METRICS, ROLLUP_TIERS, ZoneHistory, ZoneRollups, aggregate_buckets, lttb_indices
+from live_updates import LiveHub, format_event
+from rate_limit import RateLimiter, acquire_all, limiter_from_env
+from response_cache import DEVICES_TAG, ResponseCache, encode_json, zone_tag
+from metrics import PROMETHEUS_CONTENT_TYPE, Registry, RequestMetricsMiddleware, resident_memory_bytes
+from shared_store import SharedLatestMap, open_shared_store
+from ssh_pool import COMMAND_TIMEOUT, CommandResult, SSHError, SSHPool
+from sensor_codec import PRISM_CONTENT_TYPE, WireFormatError, decode_samples
+from storage import CHECKPOINT_INTERVAL, create_storage_backend
+from structured_logging import dropped_count, get_logger, get_sampled_logger
+
+logger = get_logger("api")
+ingest_log = get_sampled_logger("ingest")  # 고빈도 수신 로그 (샘플링)
+alert_log = get_logger("alerts")
 
 app = FastAPI(
     title="PRISM Sensor API", 
@@ -29,11 +55,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ============================================
+# 메트릭 (/metrics, 수신/조회 경로에서는 카운터 증가만)
+# ============================================
+
+metrics = Registry()
+http_requests = metrics.counter("prism_http_requests_total", "라우트별 요청 수", ("method", "route", "status"))
+http_latency = metrics.histogram("prism_http_request_duration_seconds", "라우트별 응답 시작까지 걸린 시간",
+                                 ("method", "route"))
+ingest_samples = metrics.counter("prism_ingest_samples_total", "구역별 저장된 샘플 수", ("zone",))
+ingest_rejected = metrics.counter("prism_ingest_rejected_total", "거부된 샘플 수")
+limited_samples = metrics.counter("prism_ingest_limited_samples_total",
+                                  "속도 제한으로 최신값만 반영하고 저장하지 않은 샘플 수", ("zone",))
+history_queries = metrics.counter("prism_history_queries_total", "이력 조회 처리 방식별 요청 수", ("source",))
+history_points = metrics.counter("prism_history_points_total", "이력 조회 처리 방식별 응답 포인트 수", ("source",))
+
+app.add_middleware(RequestMetricsMiddleware, requests_total=http_requests, latency=http_latency)
+
 # ============================================
 # 데이터 모델
 # ============================================
 
 class SensorData(BaseModel):
+    # NaN/Infinity는 JSON으로 응답할 수 없으므로 수집 단계에서 거부
+    model_config = ConfigDict(allow_inf_nan=False)
+
     zone: str
     temperature: float
     gas: float
@@ -41,219 +87,1244 @@ class SensorData(BaseModel):
     flame: bool
     timestamp: Optional[datetime] = None
 
+class SensorSample(BaseModel):
+    """배치 전송용 샘플 (zone은 다중 구역 배치에서만 필요)"""
+    model_config = ConfigDict(allow_inf_nan=False)
+
+    zone: Optional[str] = None
+    temperature: float
+    gas: float
+    dust: float
+    flame: bool = False
+    timestamp: Optional[datetime] = None
+
+class SensorBatch(BaseModel):
+    samples: List[Dict[str, Any]]  # 항목별로 검증하여 거부 사유를 개별 보고
+    device_id: Optional[str] = None  # 지정하면 하트비트로도 처리
+
 class HistoricalData(BaseModel):
     timestamp: datetime
     temperature: float
     gas: float
     dust: float
 
-class DeviceInfo(BaseModel):
-    device_id: str
-    device_type: str  # raspberry_pi, orange_pi
-    ip_address: str
-    status: str  # online, offline
-    last_seen: datetime
-    zone: str
-
 class SSHCommand(BaseModel):
     command: str
+    timeout: Optional[float] = None  # 명령 제한 시간 (초, 생략하면 PRISM_SSH_COMMAND_TIMEOUT)
+
+class FleetCommand(BaseModel):
+    """여러 장치에 같은 명령 실행 (대상 조건은 모두 만족해야 함, 하나 이상 필요)"""
+    command: str
+    zone: Optional[str] = None
+    device_type: Optional[str] = None
+    device_ids: Optional[List[str]] = None
+    online_only: bool = False
+    parallelism: Optional[int] = None  # 동시 실행 장치 수 (생략하면 PRISM_SSH_FLEET_PARALLELISM)
+    timeout: Optional[float] = None    # 장치별 명령 제한 시간 (초)
+
+class AlertRules(BaseModel):
+    rules: List[Dict[str, Any]]  # 기본 규칙에 덮어쓸 구역별 규칙 (id 기준)
 
 # ============================================
 # 인메모리 데이터 저장
 # ============================================
 
 sensor_data_store: Dict[str, SensorData] = {}
-historical_data_store: Dict[str, List[Dict]] = {}
-device_info_store: Dict[str, DeviceInfo] = {
-    "raspberry_pi_01": DeviceInfo(
-        device_id="raspberry_pi_01",
-        device_type="raspberry_pi",
-        ip_address="192.168.1.100",
-        status="online",
-        last_seen=datetime.now(),
-        zone="testbox"
-    ),
-    "orange_pi_01": DeviceInfo(
-        device_id="orange_pi_01",
-        device_type="orange_pi",
-        ip_address="192.168.1.101",
-        status="offline",
-        last_seen=datetime.now() - timedelta(hours=1),
-        zone="warehouse"
+historical_data_store: Dict[str, ZoneHistory] = {}
+rollup_store: Dict[str, ZoneRollups] = {}  # 1분/10분/1시간 집계 (장기 조회용)
+archive_store: Dict[str, ZoneArchive] = {}  # 원본 보존 기간 이후 원본 샘플 (압축 청크, PRISM_ARCHIVE_DAYS)
+
+# PRISM_STORAGE=shared: 여러 워커가 같은 mmap 파일의 최신값/이력을 공유
+shared_store = open_shared_store()
+if shared_store is not None:
+    sensor_data_store = SharedLatestMap(shared_store, SensorData)
+    historical_data_store = shared_store.histories
+    rollup_store = shared_store.rollups
+
+# 워커 간 공유 상태 (장치 목록, 속도 제한 버킷, 경고 평가 저널, 경고 규칙)
+shared_state = shared_store.state if shared_store is not None else None
+
+# 압축 보관은 워커마다 따로 청크를 닫게 되므로 공유 저장소에서는 사용하지 않음
+archive_enabled = shared_store is None and ARCHIVE_RETENTION_SECONDS > 0
+
+def history_write_lock():
+    """이력 버퍼 갱신 구간 (공유 저장소일 때만 워커 간 배타 잠금)"""
+    return shared_store.write_lock() if shared_store is not None else nullcontext()
+
+def history_read_lock():
+    """이력 조회 구간 (공유 저장소일 때만 공유 잠금)"""
+    return shared_store.read_lock() if shared_store is not None else nullcontext()
+
+def state_write_lock():
+    """속도 제한 버킷 확인/소비 구간 (공유 저장소일 때만 워커 간 배타 잠금)"""
+    return shared_store.write_lock() if shared_store is not None else nullcontext()
+
+live_hub = LiveHub()  # 실시간 업데이트 구독자 (SSE)
+response_cache = ResponseCache()  # 조회 응답 캐시 (수신/하트비트 시 해당 구역/장치 항목만 무효화)
+
+def publish_device_status(device: DeviceRecord):
+    """장치 온라인/오프라인 전환 로그 기록 및 실시간 구독자에게 device 이벤트 전송"""
+    payload = device.to_dict()
+    logger.info("장치 상태 변경", extra={"fields": {"device_id": device.device_id, "status": device.status}})
+    response_cache.invalidate(DEVICES_TAG)
+    live_hub.publish(device.zone, "device", payload)
+
+# 장치 레지스트리 (만료 시각 순 힙으로 온라인 상태 관리)
+device_registry = DeviceRegistry(on_transition=publish_device_status)
+device_registry.register("raspberry_pi_01", "raspberry_pi", "192.168.1.100", "testbox")
+device_registry.register("orange_pi_01", "orange_pi", "192.168.1.101", "warehouse",
+                         last_seen=(datetime.now() - timedelta(hours=1)).timestamp())
+
+# ============================================
+# 영구 저장소 (PRISM_STORAGE=segment 설정 시 재시작 후에도 유지)
+# ============================================
+
+storage = create_storage_backend()
+
+def save_checkpoint():
+    """롤업/최신 센서값/장치 정보를 저장소 체크포인트로 넘김 (기록은 백그라운드 스레드)"""
+    storage.checkpoint(
+        rollup_store,
+        {zone: data.model_dump(mode="json") for zone, data in sensor_data_store.items()},
+        device_registry.snapshot()
     )
-}
+
+DEVICE_EXPIRY_INTERVAL = 5  # 장치 오프라인 전환 확인 주기 (초)
+
+async def checkpoint_loop():
+    while True:
+        await asyncio.sleep(CHECKPOINT_INTERVAL)
+        save_checkpoint()
+        if shared_store is not None:
+            await asyncio.to_thread(shared_store.flush)
+
+SHARED_RELAY_INTERVAL = 0.5  # 다른 워커가 받은 최신값 확인 주기 (초)
+
+async def shared_relay_loop():
+    """
+    다른 워커가 갱신한 구역의 최신값을 이 워커의 실시간 구독자에게 전달
+    공유 상태(장치 목록, 경고 규칙, 경고 평가 저널/이벤트)도 같은 주기로 반영
+    """
+    while True:
+        await asyncio.sleep(SHARED_RELAY_INTERVAL)
+        for zone in shared_store.changed_zones():
+            response_cache.invalidate(zone_tag(zone))
+            data = sensor_data_store.get(zone)
+            if data is not None:
+                live_hub.publish(zone, "sensor", sensor_payload(data))
+        refresh_devices()
+        sync_alert_rules()
+        read_alert_journal()
+        relay_alerts()
+
+def refresh_devices():
+    """다른 워커가 기록한 장치 정보를 반영한 뒤 오프라인 전환 확인 (조회 전에 호출)"""
+    if shared_state is not None and shared_state.device_seq != app.state.device_seq:
+        app.state.device_seq = shared_state.device_seq
+        for device in shared_state.devices():
+            device_registry.merge(*device)
+        response_cache.invalidate(DEVICES_TAG)
+    device_registry.expire()
+
+def sync_alert_rules():
+    """다른 워커에서 바꾼 구역별 경고 규칙 적용 (바뀐 구역만 상태 초기화)"""
+    if shared_state.rules_seq == app.state.rules_seq:
+        return
+    app.state.rules_seq = shared_state.rules_seq
+    for zone, overrides in shared_state.rules().items():
+        if alert_engine.config["zones"].get(zone) != overrides:
+            alert_engine.set_zone_rules(zone, overrides)
+
+def read_alert_journal():
+    """
+    평가 담당 워커만 모든 워커가 받은 샘플을 저널 순서대로 경고 규칙 평가 큐에 넣음
+    담당이 바뀌면 이전 담당이 마지막으로 넣은 위치부터 이어서 평가하고 발생 중이던 경고를 이어받음
+    """
+    if not shared_state.evaluator:
+        if not shared_state.claim_evaluator():
+            return
+        alert_engine.restore_active(shared_state.active_alerts())
+    rows, position, skipped = shared_state.read_journal(shared_state.evaluated)
+    alert_engine.dropped += skipped
+    for zone, ts, temperature, gas, dust, flame in rows:
+        alert_engine.submit(zone, ts, temperature, gas, dust, flame)
+    shared_state.evaluated = position
+
+def relay_alerts():
+    """평가 담당 워커가 낸 경고 이벤트를 이 워커의 실시간 구독자에게 전달 (로그는 평가 담당만 기록)"""
+    alerts, app.state.alert_position = shared_state.read_alerts(app.state.alert_position)
+    for alert in alerts:
+        live_hub.publish(alert["zone"], "alert", alert)
+
+async def device_expiry_loop():
+    """연결이 끊긴 장치를 주기적으로 오프라인 전환 (만료 예정 장치만 확인)"""
+    while True:
+        await asyncio.sleep(DEVICE_EXPIRY_INTERVAL)
+        refresh_devices()
+
+@app.on_event("startup")
+async def load_storage():
+    """
+    저장소에서 이전 상태 복원
+    체크포인트 + 최근 세그먼트만 읽으므로 전체 이력을 재생하지 않음
+    """
+    state = await asyncio.to_thread(storage.load)
+    historical_data_store.update(state["histories"])
+    rollup_store.update(state["rollups"])
+    if archive_enabled:
+        archive_store.update(state["archives"])
+        for zone, history in historical_data_store.items():
+            archive = archive_store.get(zone)
+            if archive is None:
+                archive = archive_store[zone] = ZoneArchive()
+            archive.resume(history)  # 마지막 청크 이후 복원된 샘플은 다음 청크로
+    for zone, data in state["latest"].items():
+        sensor_data_store[zone] = SensorData(**data)
+    device_registry.restore(state["devices"])
+    if shared_state is not None:
+        # 이 워커만 아는 장치를 공유 목록에 추가한 뒤 공유 목록 기준으로 맞춤
+        for device in device_registry.values():
+            shared_state.upsert_device(device.device_id, device.device_type, device.ip_address,
+                                       device.zone, device.last_seen, keep_existing=True)
+        app.state.device_seq = shared_state.device_seq
+        for device in shared_state.devices():
+            device_registry.merge(*device, notify=False)
+        app.state.rules_seq = None
+        sync_alert_rules()
+        app.state.alert_position = shared_state.event_head  # 시작 전 이벤트는 전달하지 않음
+    app.state.checkpoint_task = asyncio.create_task(checkpoint_loop())
+    app.state.device_expiry_task = asyncio.create_task(device_expiry_loop())
+    if shared_store is not None:
+        shared_store.changed_zones()  # 시작 시점 값은 다시 전달하지 않음
+        app.state.shared_relay_task = asyncio.create_task(shared_relay_loop())
+    alert_engine.start()
+    ssh_pool.start()
+
+@app.on_event("shutdown")
+async def close_storage():
+    app.state.checkpoint_task.cancel()
+    app.state.device_expiry_task.cancel()
+    await alert_engine.stop()
+    await ssh_pool.stop()
+    save_checkpoint()
+    await asyncio.to_thread(storage.close)
+    if shared_store is not None:
+        app.state.shared_relay_task.cancel()
+        shared_store.flush()
+        shared_store.close()
 
 # ============================================
 # 센서 데이터 엔드포인트
 # ============================================
 
-@app.post("/api/sensors/{zone}")
-async def update_sensor_data(zone: str, data: SensorData):
+def zone_buffers(zone: str):
+    """구역의 원본 링 버퍼와 롤업 계층 (없으면 생성)"""
+    if shared_store is not None:
+        return shared_store.zone_buffers(zone)
+    history = historical_data_store.get(zone)
+    if history is None:
+        history = historical_data_store[zone] = ZoneHistory()
+    rollups = rollup_store.get(zone)
+    if rollups is None:
+        rollups = rollup_store[zone] = ZoneRollups()
+    return history, rollups
+
+def record_history(zone: str, ts: float, temperature: float, gas: float, dust: float) -> bool:
+    """
+    원본 링 버퍼(24시간 지난 데이터는 자동 만료)와 롤업 계층에 샘플 추가 후 저장소에 기록
+    (배치와 같은 규칙, 반환: 저장 여부)
+    """
+    return not record_history_batch(zone, [(ts, temperature, gas, dust)])
+
+def record_history_batch(zone: str, rows: List[tuple]) -> List[int]:
+    """
+    시간순 (timestamp, temperature, gas, dust) 행 여러 개를 한 번에 저장
+    구역의 마지막 저장 시각보다 이전 행(다른 장치와 겹친 배치, 늦게 비운 스풀)도 시간순 위치에 넣음
+    - 원본 버퍼 첫 행 이후: 원본 버퍼에 끼워 넣음 (이미 청크로 닫힌 구간이면 압축 보관소 청크도 교체)
+    - 원본 버퍼 첫 행 이전: 압축 보관소 청크에만 병합 (압축 보관을 쓰지 않거나 보관 기간이 지났으면 저장 안 함)
+    저장소에는 하나의 큐 항목으로 넘김
+    반환: 저장하지 못한 행의 rows 안 위치
+    """
+    archive = archive_store.get(zone) if archive_enabled else None
+    archived = archive.last_timestamp if archive is not None else None  # 청크로 닫힌 마지막 시각
+    ring_rows, closed_rows, stored, dropped = [], [], [], []
+    added = 0  # 원본 버퍼에 넣은 행 중 아직 청크로 닫지 않은 구간의 행 수
+    with history_write_lock():
+        history, rollups = zone_buffers(zone)
+        if len(history) >= history.max_capacity:
+            floor = history.first_timestamp  # 최대 용량에서 덮어쓴 행이 있으므로 첫 행 이후만
+        elif len(history):
+            # 이 배치를 넣은 뒤에도 만료되지 않는 시각 이후 (보존 기간 안에서는 빠진 행이 없음)
+            floor = math.nextafter(max(history.last_timestamp, rows[-1][0]) - history.retention_seconds, math.inf)
+        else:
+            floor = math.nextafter(archived, math.inf) if archived is not None else -math.inf
+        for i, row in enumerate(rows):
+            ts = row[0]
+            closed = archived is not None and ts <= archived
+            in_ring = ts >= floor
+            if not in_ring and not (closed and ts > archived - archive.retention_seconds):
+                dropped.append(i)
+                continue
+            if in_ring:
+                ring_rows.append(row)
+                added += not closed
+            if closed:
+                closed_rows.append(row)
+            stored.append(row)
+            rollups.add(*row)
+        history.insert_rows(ring_rows)
+    if stored:
+        storage.append_samples(zone, stored)
+    archive_history(zone, history, added, closed_rows)
+    return dropped
+
+def archive_history(zone: str, history: ZoneHistory, added: int, late: List[tuple] = ()):
+    """
+    원본 버퍼 끝에 추가된 행 수를 압축 보관소에 알림
+    청크 조건(1시간 또는 4096행)이 되면 압축해서 저장소에 기록
+    late: 이미 청크로 닫힌 구간의 행 (해당 청크를 병합한 새 청크로 교체해서 저장소에 기록)
+    """
+    if not archive_enabled:
+        return
+    archive = archive_store.get(zone)
+    if archive is None:
+        archive = archive_store[zone] = ZoneArchive()
+    for payload in archive.add(history, added) + archive.insert(list(late)):
+        storage.append_chunk(zone, payload)
+
+def history_window(zone: str, start_ts: float, end_ts: Optional[float]):
+    """
+    [start_ts, end_ts] 구간의 원본 샘플 열 배열
+    원본 버퍼보다 오래된 부분은 압축 보관소에서 해당 청크만 풀어서 앞에 이어 붙임
+    """
+    history = historical_data_store.get(zone)
+    if history is not None and len(history):
+        columns = history.columns(*history.locate(start_ts, end_ts))
+        before = history.first_timestamp
+    else:
+        columns = tuple(array("d") for _ in range(1 + len(METRICS)))
+        before = math.inf
+    archive = archive_store.get(zone)
+    if archive is None or not archive.chunks or start_ts >= before:
+        return columns
+    older = archive.columns(start_ts, end_ts if end_ts is not None else math.inf, before)
+    return merge_columns(older, columns)
+
+def publish_alert(alert: Dict):
+    """
+    경고 규칙 상태 변화 (발생/해제) 로그 기록 및 실시간 구독자에게 alert 이벤트 전송
+    """
+    level = logging.WARNING if alert["status"] == "active" else logging.INFO
+    fields = {key: value for key, value in alert.items() if key not in ("level", "message")}
+    alert_log.log(level, alert["message"], extra={"fields": {**fields, "alert_level": alert["level"]}})
+    live_hub.publish(alert["zone"], "alert", alert)
+    if shared_state is not None:
+        # 평가 담당 워커에서만 호출됨: 다른 워커는 이벤트를 읽어서 구독자에게만 전달
+        shared_state.append_alert(alert, alert_engine.active_alerts())
+
+alert_engine = AlertEngine(publish_alert)  # 경고 규칙 평가 (수신 경로 밖의 백그라운드 큐)
+
+def submit_alerts(zone: str, rows: List[tuple]):
+    """
+    (timestamp, 온도, 가스, 먼지, 불꽃) 샘플을 경고 규칙 평가에 넘김
+    공유 저장소에서는 경고 평가 저널에 기록 (평가 담당 워커 하나가 읽어서 평가)
+    """
+    if shared_state is not None:
+        shared_state.append_samples(zone, rows)
+        return
+    for ts, temperature, gas, dust, flame in rows:
+        alert_engine.submit(zone, ts, temperature, gas, dust, flame)
+
+def sensor_payload(data: SensorData) -> Dict:
+    """현재 센서 데이터 응답/이벤트 형식"""
+    return {
+        "zone": data.zone,
+        "temperature": data.temperature,
+        "gas": data.gas,
+        "dust": data.dust,
+        "flame": data.flame,
+        "timestamp": data.timestamp.isoformat(),
+        "connected": True
+    }
+
+MAX_BATCH_SIZE = 1000              # 배치 요청당 최대 샘플 수
+FUTURE_SAMPLE_TOLERANCE = 5 * 60   # 장치 시계 오차 허용 범위 (초)
+
+def ingest_batch(items: List[Dict[str, Any]], default_zone: Optional[str] = None) -> Dict:
+    """
+    JSON 배치 샘플을 한 번에 검증한 뒤 일괄 저장
+    거부된 항목은 인덱스와 사유를 함께 반환
+    """
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"배치당 최대 {MAX_BATCH_SIZE}개까지 전송할 수 있습니다")
+    
+    now_ts = datetime.now().timestamp()
+    entries = []
+    rejected = []
+    for index, item in enumerate(items):
+        try:
+            sample = SensorSample.model_validate(item)
+        except ValidationError as e:
+            rejected.append({"index": index, "error": e.errors(include_url=False)[0]["msg"]})
+            continue
+        zone = default_zone or sample.zone
+        if not zone:
+            rejected.append({"index": index, "error": "zone이 지정되지 않았습니다"})
+            continue
+        ts = sample.timestamp.timestamp() if sample.timestamp is not None else now_ts
+        entries.append((ts, index, zone, sample.temperature, sample.gas, sample.dust, sample.flame))
+    
+    return store_samples(entries, rejected)
+
+def ingest_decoded(zone: str, samples: List[tuple]) -> Dict:
+    """
+    바이너리 포맷으로 디코딩된 샘플 저장 (이미 타입이 정해져 있으므로 pydantic 검증 생략)
+    """
+    if len(samples) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"배치당 최대 {MAX_BATCH_SIZE}개까지 전송할 수 있습니다")
+    entries = [
+        (ts, index, zone, temperature, gas, dust, flame)
+        for index, (ts, temperature, gas, dust, flame) in enumerate(samples)
+    ]
+    return store_samples(entries, [])
+
+def store_samples(entries: List[tuple], rejected: List[Dict]) -> Dict:
+    """
+    (timestamp, index, zone, temperature, gas, dust, flame) 항목을 구역별로 시간순 정렬하여 일괄 저장
+    - 허용 오차를 넘는 미래 시각은 거부, 허용 오차 안의 미래 시각은 서버 시각으로 맞춤
+      (시계가 빠른 장치 하나가 구역의 마지막 저장 시각을 앞당기지 않도록)
+    - 구역의 마지막 저장 시각보다 이전 샘플은 시간순 위치에 넣고 응답의 late에 개수 표시
+      (원본/압축 보관 기간보다 오래된 샘플만 거부)
+    - 경고 규칙 평가와 현재값 갱신은 마지막 저장 시각 이후 샘플만 사용
+    """
+    now_ts = datetime.now().timestamp()
+    by_zone: Dict[str, List[tuple]] = {}
+    for entry in entries:
+        if entry[0] > now_ts + FUTURE_SAMPLE_TOLERANCE:
+            rejected.append({"index": entry[1], "error": "timestamp가 미래 시각입니다"})
+            continue
+        if entry[0] > now_ts:
+            entry = (now_ts,) + entry[1:]
+        by_zone.setdefault(entry[2], []).append(entry)
+    
+    accepted = 0
+    late = 0
+    for zone, zone_entries in by_zone.items():
+        zone_entries.sort(key=lambda e: (e[0], e[1]))
+        history = historical_data_store.get(zone)
+        last_ts = history.last_timestamp if history is not None and len(history) else None
+        rows = [(ts, temperature, gas, dust) for ts, _, _, temperature, gas, dust, _ in zone_entries]
+        dropped = set(record_history_batch(zone, rows))
+        alerts = []
+        for position, (ts, index, _, temperature, gas, dust, flame) in enumerate(zone_entries):
+            if position in dropped:
+                rejected.append({"index": index, "error": "원본/압축 보관 기간보다 오래된 샘플입니다"})
+            elif last_ts is not None and ts < last_ts:
+                late += 1
+            else:
+                alerts.append((ts, temperature, gas, dust, flame))
+        
+        stored = len(rows) - len(dropped)
+        if not stored:
+            continue
+        accepted += stored
+        ingest_samples.inc((zone,), stored)
+        response_cache.invalidate(zone_tag(zone))
+        if alerts:
+            submit_alerts(zone, alerts)
+            ts, temperature, gas, dust, flame = alerts[-1]
+            data = sensor_data_store[zone] = SensorData(
+                zone=zone,
+                temperature=temperature,
+                gas=gas,
+                dust=dust,
+                flame=flame,
+                timestamp=datetime.fromtimestamp(ts)
+            )
+            live_hub.publish(zone, "sensor", sensor_payload(data))
+    
+    if rejected:
+        ingest_rejected.inc(amount=len(rejected))
+    rejected.sort(key=lambda r: r["index"])
+    return {
+        "status": "success" if not rejected else "partial",
+        "accepted": accepted,
+        "late": late,
+        "rejected": rejected
+    }
+
+# ============================================
+# 수신 속도 제한 (장치별/구역별 토큰 버킷, 초과시 429 + Retry-After)
+# ============================================
+
+def ingest_limiter(prefix: str, rate: float, burst: float) -> RateLimiter:
+    """공유 저장소에서는 버킷을 워커 간에 공유 (워커 수와 관계없이 설정한 한도 적용)"""
+    limiter = limiter_from_env(prefix, rate, burst)
+    if shared_state is not None:
+        return shared_state.limiter(prefix, limiter.rate, limiter.burst)
+    return limiter
+
+device_limiter = ingest_limiter("DEVICE", 5, MAX_BATCH_SIZE)
+zone_limiter = ingest_limiter("ZONE", 20, 2 * MAX_BATCH_SIZE)
+heartbeat_limiter = ingest_limiter("HEARTBEAT", 1, 5)
+
+def device_key(request: Request, device_id: Optional[str]) -> str:
+    """장치 ID가 없는 요청(단일 JSON 전송)은 접속 IP 기준으로 제한"""
+    if device_id:
+        return device_id
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+def ingest_wait(request: Request, device_id: Optional[str], zone_counts: Dict[str, int]) -> float:
+    """장치/구역 버킷에서 샘플 수만큼 토큰 소비 (부족하면 소비 없이 대기 시간 반환)"""
+    limits = [(device_limiter, device_key(request, device_id), sum(zone_counts.values()))]
+    limits += [(zone_limiter, zone, count) for zone, count in zone_counts.items()]
+    with state_write_lock():
+        return acquire_all(limits)
+
+def coalesce_latest(zone: str, count: int, ts: float, temperature: float, gas: float, dust: float, flame: bool):
+    """
+    제한에 걸린 요청은 이력에 저장하지 않고 최신값만 반영
+    (불꽃은 요청 안에서 한 번이라도 감지되면 유지, 경고 규칙은 그대로 평가)
+    """
+    limited_samples.inc((zone,), count)
+    ts = min(ts, datetime.now().timestamp())  # 미래 시각은 저장 경로와 같이 서버 시각으로 맞춤
+    current = sensor_data_store.get(zone)
+    if current is not None and current.timestamp.timestamp() > ts:
+        return
+    data = sensor_data_store[zone] = SensorData(
+        zone=zone, temperature=temperature, gas=gas, dust=dust, flame=flame,
+        timestamp=datetime.fromtimestamp(ts)
+    )
+    response_cache.invalidate(zone_tag(zone))
+    live_hub.publish(zone, "sensor", sensor_payload(data))
+    submit_alerts(zone, [(ts, temperature, gas, dust, flame)])
+
+def coalesce_items(items: List[Dict[str, Any]], default_zone: Optional[str] = None):
+    """JSON 배치의 구역별 마지막 샘플만 검증해서 최신값으로 반영"""
+    now_ts = datetime.now().timestamp()
+    by_zone: Dict[str, List[Dict[str, Any]]] = {}
+    for item in items:
+        zone = default_zone or (item.get("zone") if isinstance(item, dict) else None)
+        if zone:
+            by_zone.setdefault(zone, []).append(item)
+    for zone, zone_items in by_zone.items():
+        try:
+            sample = SensorSample.model_validate(zone_items[-1])
+        except ValidationError:
+            continue
+        flame = any(item.get("flame") for item in zone_items)
+        ts = sample.timestamp.timestamp() if sample.timestamp is not None else now_ts
+        coalesce_latest(zone, len(zone_items), ts, sample.temperature, sample.gas, sample.dust, flame)
+
+def coalesce_decoded(zone: str, samples: List[tuple]):
+    if samples:
+        ts, temperature, gas, dust, _ = samples[-1]
+        coalesce_latest(zone, len(samples), ts, temperature, gas, dust, any(sample[4] for sample in samples))
+
+def rate_limited(wait: float, coalesced: bool = True) -> HTTPException:
+    retry_after = max(1, math.ceil(wait))
+    detail = f"전송 속도 제한을 초과했습니다. {retry_after}초 후 다시 시도하세요"
+    return HTTPException(
+        status_code=429,
+        detail=detail + (" (최신값만 반영됨)" if coalesced else ""),
+        headers={"Retry-After": str(retry_after)}
+    )
+
+def zone_item_counts(items: List[Dict[str, Any]]) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for item in items:
+        zone = item.get("zone") if isinstance(item, dict) else None
+        if zone:
+            counts[zone] = counts.get(zone, 0) + 1
+    return counts
+
+def log_batch(zone: str, device_id: Optional[str], result: Dict):
+    """배치 수신 로그 (샘플링, 거부된 항목이 있으면 WARNING)"""
+    level = logging.WARNING if result["rejected"] else logging.INFO
+    ingest_log.log(level, zone, "배치 수신", device_id=device_id,
+                   accepted=result["accepted"], rejected=len(result["rejected"]))
+
+# ============================================
+# 요청 본문 해석 (JSON 또는 바이너리 포맷, Content-Type으로 구분)
+# ============================================
+
+def request_body_schema(model) -> Dict:
+    """JSON 모델과 바이너리 포맷을 모두 받는 엔드포인트의 OpenAPI 요청 본문 정의"""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": model.model_json_schema()},
+                PRISM_CONTENT_TYPE: {"schema": {"type": "string", "format": "binary"}}
+            }
+        }
+    }
+
+def is_binary_payload(request: Request) -> bool:
+    return request.headers.get("content-type", "").split(";")[0].strip() == PRISM_CONTENT_TYPE
+
+async def read_binary_payload(request: Request):
+    """바이너리 페이로드 디코딩: (구역, 장치 ID, 샘플 목록)"""
+    try:
+        return decode_samples(await request.body())
+    except WireFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def read_json_payload(request: Request, model):
+    """JSON 본문을 모델로 검증 (실패시 FastAPI 기본 형식의 422 응답)"""
+    try:
+        return model.model_validate_json(await request.body())
+    except ValidationError as e:
+        errors = []
+        for error in e.errors():
+            error = {**error, "loc": ("body", *error["loc"])}
+            if error["type"] == "finite_number":
+                # 거부한 NaN/Infinity 입력값은 JSON 응답에 담을 수 없으므로 제외
+                error.pop("input", None)
+            errors.append(error)
+        raise RequestValidationError(errors)
+
+@app.post("/api/sensors/batch", openapi_extra=request_body_schema(SensorBatch))
+async def update_sensor_data_batch_multi(request: Request):
+    """
+    여러 구역의 샘플을 한 번에 전송하는 엔드포인트
+    JSON은 각 샘플에 zone 필수, 바이너리 포맷은 헤더의 구역 사용
+    """
+    if is_binary_payload(request):
+        zone, device_id, samples = await read_binary_payload(request)
+        if device_id:
+            touch_device(device_id)
+        wait = ingest_wait(request, device_id, {zone: len(samples)})
+        if wait:
+            coalesce_decoded(zone, samples)
+            raise rate_limited(wait)
+        result = ingest_decoded(zone, samples)
+    else:
+        batch = await read_json_payload(request, SensorBatch)
+        device_id = batch.device_id
+        if device_id:
+            touch_device(device_id)
+        wait = ingest_wait(request, device_id, zone_item_counts(batch.samples))
+        if wait:
+            coalesce_items(batch.samples)
+            raise rate_limited(wait)
+        result = ingest_batch(batch.samples)
+    log_batch("*", device_id, result)
+    return result
+
+@app.post("/api/sensors/{zone}/batch", openapi_extra=request_body_schema(SensorBatch))
+async def update_sensor_data_batch(zone: str, request: Request):
+    """
+    한 구역의 타임스탬프가 있는 샘플 여러 개를 한 번에 전송하는 엔드포인트
+    장치에서 10~100개씩 모아 전송하여 요청당 오버헤드를 줄임
+    device_id를 함께 보내면 별도 하트비트 요청 없이 연결 상태가 갱신됨
+    Content-Type: application/vnd.prism.samples 이면 바이너리 포맷으로 해석
+    """
+    if is_binary_payload(request):
+        _, device_id, samples = await read_binary_payload(request)
+        items = None
+    else:
+        batch = await read_json_payload(request, SensorBatch)
+        device_id, items = batch.device_id, batch.samples
+    if device_id:
+        touch_device(device_id, zone)
+    
+    wait = ingest_wait(request, device_id, {zone: len(samples if items is None else items)})
+    if wait:
+        if items is None:
+            coalesce_decoded(zone, samples)
+        else:
+            coalesce_items(items, default_zone=zone)
+        raise rate_limited(wait)
+    
+    result = ingest_decoded(zone, samples) if items is None else ingest_batch(items, default_zone=zone)
+    log_batch(zone, device_id, result)
+    return {**result, "zone": zone}
+
+@app.post("/api/sensors/{zone}", openapi_extra=request_body_schema(SensorData))
+async def update_sensor_data(zone: str, request: Request):
     """
     라즈베리파이/오렌지파이에서 센서 데이터를 전송하는 엔드포인트
     Express 서버를 통해 또는 직접 호출 가능
+    Content-Type: application/vnd.prism.samples 이면 바이너리 포맷으로 해석 (장치 타임스탬프 사용)
     """
+    if is_binary_payload(request):
+        _, device_id, samples = await read_binary_payload(request)
+        if device_id:
+            touch_device(device_id, zone)
+        wait = ingest_wait(request, device_id, {zone: len(samples)})
+        if wait:
+            coalesce_decoded(zone, samples)
+            raise rate_limited(wait)
+        result = ingest_decoded(zone, samples)
+        return {**result, "message": "센서 데이터가 업데이트되었습니다", "zone": zone}
+    
+    data = await read_json_payload(request, SensorData)
     data.zone = zone
     data.timestamp = datetime.now()
     
-    print(f"📊 센서 데이터 수신 [{zone}]: 온도={data.temperature}°C, 가스={data.gas}ppm, 먼지={data.dust}μg/m³")
+    wait = ingest_wait(request, None, {zone: 1})
+    if wait:
+        coalesce_latest(zone, 1, data.timestamp.timestamp(), data.temperature, data.gas, data.dust, data.flame)
+        raise rate_limited(wait)
+    
+    ingest_log.info(zone, "센서 데이터 수신", temperature=data.temperature, gas=data.gas, dust=data.dust)
     
-    # 현재 데이터 저장
+    # 현재 데이터 저장 및 실시간 구독자에게 전달
     sensor_data_store[zone] = data
+    response_cache.invalidate(zone_tag(zone))
+    live_hub.publish(zone, "sensor", sensor_payload(data))
     
     # 히스토리 데이터 저장
-    if zone not in historical_data_store:
-        historical_data_store[zone] = []
-    
-    historical_data_store[zone].append({
-        "timestamp": data.timestamp,
-        "temperature": data.temperature,
-        "gas": data.gas,
-        "dust": data.dust
-    })
-    
-    # 최근 24시간 데이터만 유지
-    cutoff_time = datetime.now() - timedelta(hours=24)
-    historical_data_store[zone] = [
-        d for d in historical_data_store[zone]
-        if d["timestamp"] > cutoff_time
-    ]
+    record_history(zone, data.timestamp.timestamp(), data.temperature, data.gas, data.dust)
+    ingest_samples.inc((zone,))
     
-    # 임계값 체크 및 경고
-    if data.flame:
-        print(f"⚠️  [위험] {zone} - 불꽃 감지!")
-    if data.temperature > 50:
-        print(f"⚠️  [위험] {zone} - 온도 위험 수준: {data.temperature}°C")
-    if data.gas > 100:
-        print(f"⚠️  [위험] {zone} - 가스 농도 위험: {data.gas}ppm")
+    # 경고 규칙 평가 (백그라운드 큐에 넣기만 함)
+    submit_alerts(zone, [(data.timestamp.timestamp(), data.temperature, data.gas, data.dust, data.flame)])
     
     return {"status": "success", "message": "센서 데이터가 업데이트되었습니다", "zone": zone}
 
 @app.get("/api/sensors/{zone}")
-async def get_sensor_data(zone: str):
+async def get_sensor_data(zone: str, request: Request):
     """
     웹 대시보드에서 현재 센서 데이터를 가져오는 엔드포인트
     실제 연결된 센서가 없으면 404 에러 반환 (더미 데이터 제거)
     """
-    if zone not in sensor_data_store:
-        # 센서가 연결되지 않은 경우 404 에러 반환
-        raise HTTPException(status_code=404, detail=f"센서 데이터를 찾을 수 없습니다. 구역: {zone}")
+    def build():
+        data = sensor_data_store.get(zone)
+        if data is None:
+            # 센서가 연결되지 않은 경우 404 에러 반환
+            raise HTTPException(status_code=404, detail=f"센서 데이터를 찾을 수 없습니다. 구역: {zone}")
+        return sensor_payload(data)
     
-    data = sensor_data_store[zone]
-    return {
-        "zone": data.zone,
-        "temperature": data.temperature,
-        "gas": data.gas,
-        "dust": data.dust,
-        "flame": data.flame,
-        "timestamp": data.timestamp.isoformat(),
-        "connected": True
-    }
+    return response_cache.respond(request, (zone_tag(zone),), build)
+
+@app.get("/api/stream")
+async def stream_updates(request: Request, zones: Optional[str] = None):
+    """
+    실시간 업데이트 스트림 (Server-Sent Events)
+    - zones: 구독할 구역 (쉼표로 구분, 생략하면 전체 구역)
+    - event: sensor (새 센서 데이터), alert (경고 규칙 발생/해제), device (장치 온라인/오프라인 전환)
+    연결 직후 구독 구역의 현재 데이터를 먼저 보내고 이후 수신되는 데이터를 즉시 전달
+    """
+    zone_set = {z.strip() for z in zones.split(",") if z.strip()} if zones else None
+    subscription = live_hub.subscribe(zone_set)
+    
+    # 현재 데이터를 먼저 큐에 넣어 연결 직후 화면을 채움
+    for zone, data in sensor_data_store.items():
+        if zone_set is None or zone in zone_set:
+            subscription.push(format_event("sensor", sensor_payload(data)))
+    
+    async def event_stream():
+        try:
+            yield b"retry: 3000\n\n"
+            async for frame in live_hub.stream(subscription):
+                if await request.is_disconnected():
+                    break
+                yield frame
+        finally:
+            live_hub.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# ============================================
+# 경고 규칙 엔드포인트
+# ============================================
+
+@app.get("/api/alerts")
+async def get_active_alerts():
+    """
+    현재 발생 중인 경고 목록
+    """
+    alerts = shared_state.active_alerts() if shared_state is not None else alert_engine.active_alerts()
+    return {"alerts": alerts, "queue_depth": alert_engine.queue_depth}
+
+@app.get("/api/alerts/rules/{zone}")
+async def get_alert_rules(zone: str):
+    """
+    구역에 적용되는 경고 규칙 (기본 규칙 + 구역별 덮어쓰기)
+    """
+    return {"zone": zone, "rules": [rule.config for rule in alert_engine.rules_for(zone)]}
+
+@app.put("/api/alerts/rules/{zone}")
+async def update_alert_rules(zone: str, body: AlertRules):
+    """
+    구역별 경고 규칙 설정 (같은 id의 기본 규칙을 덮어씀, enabled=false로 비활성화)
+    """
+    try:
+        # 검증과 공유 기록이 모두 끝난 뒤에만 이 워커에 적용 (실패하면 어느 워커도 바뀌지 않음)
+        alert_engine.compile_zone_rules(body.rules)
+        if shared_state is not None:
+            shared_state.set_zone_rules(zone, body.rules)  # 다른 워커는 공유 주기마다 적용
+        rules = alert_engine.set_zone_rules(zone, body.rules)
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"잘못된 경고 규칙입니다: {e}")
+    return {"zone": zone, "rules": [rule.config for rule in rules]}
+
+HISTORY_FORMATS = ("rows", "columns")
+BUCKET_FIELDS = ROLLUP_FIELDS[1:]
 
 @app.get("/api/history/{zone}")
-async def get_historical_data(zone: str, hours: int = 24, days: int = None):
+async def get_historical_data(
+    zone: str,
+    request: Request,
+    hours: int = 24,
+    days: int = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    bucket: Optional[int] = None,
+    points: Optional[int] = None,
+    method: str = "mean",
+    format: str = "rows"
+):
     """
     지정된 시간 동안의 과거 센서 데이터를 가져오는 엔드포인트
+    - hours/days: 현재 시각 기준 최근 구간
+    - start/end: 명시적 구간 (ISO 8601, start가 있으면 hours/days보다 우선)
+    - bucket: 버킷 크기(초) 단위로 집계 (평균 + min/max + count)
+    - points: 목표 포인트 수로 다운샘플링 (method=mean: 버킷 집계, method=lttb: LTTB 샘플 선택)
+    - format: rows(기본, 샘플별 객체 배열) | columns(지표별 배열, t는 epoch 밀리초)
+      예) {"t": [1700000000000, ...], "temperature": [...], "gas": [...], "dust": [...]}
+      집계 결과는 count와 지표별 _min/_max 배열 포함
+    집계 요청은 해상도를 만족하는 가장 거친 롤업 계층(1분/10분/1시간)에서 처리하므로
+    원본 보존 기간(24시간)보다 긴 구간도 조회 가능
+    원본 샘플 요청은 24시간 이전 구간을 압축 보관소(PRISM_ARCHIVE_DAYS)에서 풀어서 이어 붙임
     실제 데이터가 없으면 빈 배열 반환 (더미 데이터 제거)
+    같은 조회는 해당 구역에 새 데이터가 들어오기 전까지(최대 PRISM_CACHE_TTL초) 캐시에서 응답
     """
     if days:
         hours = days * 24  # 일 단위를 시간으로 변환
     
-    if zone not in historical_data_store or len(historical_data_store[zone]) == 0:
+    if start is not None and end is not None and start.timestamp() > end.timestamp():
+        raise HTTPException(status_code=400, detail="start는 end보다 이전이어야 합니다")
+    if bucket is not None and bucket < 1:
+        raise HTTPException(status_code=400, detail="bucket은 1초 이상이어야 합니다")
+    if points is not None and points < 3:
+        raise HTTPException(status_code=400, detail="points는 3 이상이어야 합니다")
+    if method not in ("mean", "lttb"):
+        raise HTTPException(status_code=400, detail="method는 mean 또는 lttb만 지원합니다")
+    if format not in HISTORY_FORMATS:
+        raise HTTPException(status_code=400, detail="format은 rows 또는 columns만 지원합니다")
+    
+    def build():
+        with history_read_lock():
+            kind, result = select_history(zone, hours, start, end, bucket, points, method)
+        # 응답 본문을 바로 직렬화 (jsonable_encoder를 거치지 않음)
+        if format == "columns":
+            return encode_json(history_columns(kind, result))
+        return encode_json(history_rows(kind, result))
+    
+    return response_cache.respond(request, (zone_tag(zone),), build)
+
+def select_history(zone: str, hours: int, start: Optional[datetime], end: Optional[datetime],
+                   bucket: Optional[int], points: Optional[int], method: str):
+    """
+    조회 구간/해상도에 맞는 이력 (롤업 계층 또는 원본 버퍼)
+    반환: ("buckets", 집계 레코드 목록) 또는 ("samples", (timestamp, temperature, gas, dust) 배열)
+    타임스탬프는 epoch 초, 응답 형식 변환은 history_rows/history_columns에서 처리
+    """
+    history = historical_data_store.get(zone)
+    rollups = rollup_store.get(zone)
+    if history is None or rollups is None:
         # 데이터가 없으면 빈 배열 반환
-        return []
+        history_queries.inc(("empty",))
+        return "samples", tuple(array("d") for _ in range(1 + len(METRICS)))
+    
+    now_ts = datetime.now().timestamp()
+    start_ts = start.timestamp() if start is not None else now_ts - hours * 3600
+    end_ts = end.timestamp() if end is not None else None
+    
+    # 샘플이 시간순으로 저장되어 있으므로 이진 탐색으로 구간 경계만 찾음
+    lo, hi = history.locate(start_ts, end_ts)
+    raw_rows = hi - lo
+    # 요청 구간이 원본 보존 기간(24시간)을 넘어서면 원본 버퍼만으로는 채울 수 없음
+    raw_complete = start_ts >= now_ts - history.retention_seconds
+    archive = archive_store.get(zone)
+    if not raw_complete and archive is not None and archive.chunks and archive.first_timestamp <= start_ts:
+        # 원본 버퍼 이전 구간은 압축 보관소에서 (행 수는 겹치는 청크 기준 상한)
+        raw_complete = True
+        before = history.first_timestamp if len(history) else math.inf
+        raw_rows += archive.count(start_ts, min(end_ts if end_ts is not None else math.inf, before))
+    
+    # 집계 해상도 결정 (bucket 지정 또는 points 기준 평균 집계)
+    resolution = bucket
+    if bucket is None and points is not None and method == "mean":
+        if raw_complete and raw_rows <= points:
+            resolution = None
+        else:
+            span = (end_ts if end_ts is not None else now_ts) - start_ts
+            resolution = max(1, math.ceil(span / points))
     
-    cutoff_time = datetime.now() - timedelta(hours=hours)
-    filtered_data = [
+    # 해상도를 만족하는 가장 거친 롤업 계층에서 바로 응답
+    if resolution is not None:
+        tier = rollups.select(resolution, exact=bucket is not None)
+        if tier is not None:
+            bucket_seconds = math.ceil(resolution / tier.bucket_seconds) * tier.bucket_seconds
+            aligned_start = (start_ts // bucket_seconds) * bucket_seconds
+            tier_lo, tier_hi = tier.locate(aligned_start, end_ts)
+            buckets = tier.aggregate(tier_lo, tier_hi, bucket_seconds)
+            count_history_query("rollup", len(buckets))
+            return "buckets", buckets
+    
+    columns = history_window(zone, start_ts, end_ts)
+    
+    if resolution is not None:
+        buckets = aggregate_buckets(columns, resolution)
+        count_history_query("raw_aggregate", len(buckets))
+        return "buckets", buckets
+    
+    # LTTB 다운샘플링 (원본 샘플 기준)
+    if method == "lttb" and points is not None and len(columns[0]) > points:
+        indices = lttb_indices(columns, points)
+        columns = tuple(array("d", [column[i] for i in indices]) for column in columns)
+        count_history_query("lttb", len(indices))
+        return "samples", columns
+    
+    count_history_query("raw", len(columns[0]))
+    return "samples", columns
+
+def history_rows(kind: str, result) -> List[Dict]:
+    """샘플/버킷별 객체 배열 (timestamp는 ISO 8601 문자열)"""
+    if kind == "buckets":
+        for record in result:
+            record["timestamp"] = datetime.fromtimestamp(record["timestamp"]).isoformat()
+        return result
+    timestamps, temperatures, gases, dusts = result
+    return [
         {
-            "timestamp": d["timestamp"].isoformat(),
-            "temperature": d["temperature"],
-            "gas": d["gas"],
-            "dust": d["dust"]
+            "timestamp": datetime.fromtimestamp(ts).isoformat(),
+            "temperature": temperature,
+            "gas": gas,
+            "dust": dust
         }
-        for d in historical_data_store[zone]
-        if d["timestamp"] > cutoff_time
+        for ts, temperature, gas, dust in zip(timestamps, temperatures, gases, dusts)
     ]
+
+def history_columns(kind: str, result) -> Dict[str, list]:
+    """
+    지표별 배열 (t = epoch 밀리초)
+    원본 샘플은 저장소 열 배열을 그대로 목록으로 변환하므로 샘플별 dict/문자열을 만들지 않음
+    """
+    if kind == "buckets":
+        body = {"t": [round(record["timestamp"] * 1000) for record in result]}
+        for field in BUCKET_FIELDS:
+            body[field] = [record[field] for record in result]
+        return body
+    timestamps = result[0]
+    body = {"t": [round(ts * 1000) for ts in timestamps]}
+    for name, column in zip(METRICS, result[1:]):
+        body[name] = column.tolist()
+    return body
+
+@app.get("/api/history/{zone}/gaps")
+async def get_history_gaps(
+    zone: str,
+    request: Request,
+    hours: int = 24,
+    days: int = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    """
+    수집 공백 조회 (장치 전원/네트워크 문제 등으로 샘플이 끊긴 구간)
+    - 샘플 간격이 max(30초, 중앙값 간격 x 3)를 넘으면 공백 (직전 샘플 ~ 다음 샘플)
+    - 원본 버퍼 이전 구간은 압축 청크를 닫을 때 기록한 공백을 사용 (청크를 풀지 않음)
+    """
+    if days:
+        hours = days * 24
+    if start is not None and end is not None and start.timestamp() > end.timestamp():
+        raise HTTPException(status_code=400, detail="start는 end보다 이전이어야 합니다")
+    
+    def build():
+        now_ts = datetime.now().timestamp()
+        start_ts = start.timestamp() if start is not None else now_ts - hours * 3600
+        end_ts = end.timestamp() if end is not None else now_ts
+        gaps = []
+        with history_read_lock():
+            history = historical_data_store.get(zone)
+            before = math.inf
+            if history is not None and len(history):
+                before = history.first_timestamp
+                # 구간 경계에 걸친 공백도 찾도록 앞뒤 샘플 하나씩 포함
+                lo, hi = history.locate(start_ts, end_ts)
+                timestamps = history.columns(max(0, lo - 1), min(len(history), hi + 1))[0]
+                ring_gaps = find_gaps(timestamps, median_interval(timestamps))
+            else:
+                ring_gaps = []
+            archive = archive_store.get(zone)
+            if archive is not None:
+                gaps = [gap for gap in archive.gaps(start_ts, end_ts) if gap[1] <= before]
+        gaps += ring_gaps
+        history_queries.inc(("gaps",))
+        return encode_json({
+            "zone": zone,
+            "start": datetime.fromtimestamp(start_ts).isoformat(),
+            "end": datetime.fromtimestamp(end_ts).isoformat(),
+            "count": len(gaps),
+            "total_seconds": round(sum(gap_end - gap_start for gap_start, gap_end in gaps), 3),
+            "gaps": [
+                {
+                    "start": datetime.fromtimestamp(gap_start).isoformat(),
+                    "end": datetime.fromtimestamp(gap_end).isoformat(),
+                    "seconds": round(gap_end - gap_start, 3)
+                }
+                for gap_start, gap_end in gaps
+            ]
+        })
+    
+    return response_cache.respond(request, (zone_tag(zone),), build)
+
+def count_history_query(source: str, points: int):
+    history_queries.inc((source,))
+    history_points.inc((source,), points)
+
+@app.get("/api/analytics/{zone}")
+async def get_zone_analytics(
+    zone: str,
+    request: Request,
+    hours: int = 24,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    window: float = 300,
+    threshold: float = 3.0,
+    points: int = 200,
+    compare: Optional[str] = None
+):
+    """
+    구역 통계 요약 (원본 샘플 기준, NumPy로 계산)
+    - 지표별 평균/표준편차/최소/최대/백분위수(p5~p99)
+    - rolling: 직전 window초 이동 평균/표준편차 (points개로 줄인 계열, t는 epoch 밀리초)
+    - anomalies: 직전 window초 대비 |z-score|가 threshold를 넘는 샘플 (|z| 큰 순 최대 100개)
+    - compare: 쉼표로 구분한 비교 구역 → comparison에 구역별 요약과 지표별 순위/편차
+    """
+    if not analytics.available():
+        raise HTTPException(status_code=503, detail="numpy가 설치되지 않았습니다")
+    if window <= 0 or threshold <= 0:
+        raise HTTPException(status_code=400, detail="window와 threshold는 0보다 커야 합니다")
+    if not 2 <= points <= 5000:
+        raise HTTPException(status_code=400, detail="points는 2~5000 사이여야 합니다")
+    if start is not None and end is not None and start.timestamp() > end.timestamp():
+        raise HTTPException(status_code=400, detail="start는 end보다 이전이어야 합니다")
+    
+    others = [other for other in dict.fromkeys(compare.split(",")) if other and other != zone] if compare else []
+    
+    def build():
+        now_ts = datetime.now().timestamp()
+        start_ts = start.timestamp() if start is not None else now_ts - hours * 3600
+        end_ts = end.timestamp() if end is not None else None
+        # 열 배열만 잠금 안에서 복사하고 계산은 잠금 밖에서
+        with history_read_lock():
+            columns = {name: history_window(name, start_ts, end_ts) for name in [zone] + others}
+        
+        summary = analytics.summarize(columns[zone], window, threshold, points)
+        result = {"zone": zone, "window": window, "threshold": threshold, **summary}
+        if others:
+            summaries = {zone: summary}
+            for name in others:
+                summaries[name] = analytics.summarize(columns[name], window, threshold, points, detail=False)
+            result["comparison"] = {
+                "zones": {name: s for name, s in summaries.items() if name != zone},
+                "metrics": analytics.compare(summaries)
+            }
+        return encode_json(result)
+    
+    return response_cache.respond(request, [zone_tag(name) for name in [zone] + others], build)
+
+@app.get("/api/export")
+async def export_history(
+    zones: Optional[str] = None,
+    hours: int = 24,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    bucket: Optional[int] = None,
+    format: str = "ndjson"
+):
+    """
+    이력 내보내기 (구간 길이와 무관하게 일정한 메모리로 스트리밍)
+    - zones: 쉼표로 구분한 구역 목록 (생략하면 전체 구역)
+    - hours 또는 start/end: 구간 (end를 생략하면 요청 시각까지)
+    - bucket: 생략하면 원본 샘플, 60/600/3600이면 해당 롤업 계층 (원본 보존 기간보다 긴 구간용)
+    - format: ndjson | csv | columns (열 단위 바이너리, 형식은 history_export.py 참고)
+    """
+    encoder_class = ENCODERS.get(format)
+    if encoder_class is None:
+        raise HTTPException(status_code=400, detail="format은 ndjson, csv, columns만 지원합니다")
+    tiers = [tier_bucket for tier_bucket, _ in ROLLUP_TIERS]
+    if bucket is not None and bucket not in tiers:
+        raise HTTPException(status_code=400, detail=f"bucket은 {', '.join(map(str, tiers))} 중 하나여야 합니다")
+    if start is not None and end is not None and start.timestamp() > end.timestamp():
+        raise HTTPException(status_code=400, detail="start는 end보다 이전이어야 합니다")
+    
+    now_ts = datetime.now().timestamp()
+    start_ts = start.timestamp() if start is not None else now_ts - hours * 3600
+    end_ts = end.timestamp() if end is not None else now_ts  # 계속 들어오는 샘플 때문에 끝나지 않는 일 방지
+    zone_list = [zone for zone in zones.split(",") if zone] if zones else \
+        sorted(set(historical_data_store) | set(archive_store))
     
-    return filtered_data
+    def source(zone: str):
+        if bucket is None:
+            # 원본 버퍼 이전 구간은 압축 보관소에서 먼저 내보냄
+            return zone, lambda: historical_data_store.get(zone), lambda: archive_store.get(zone)
+        
+        def tier():
+            rollups = rollup_store.get(zone)
+            return rollups.tiers[tiers.index(bucket)] if rollups is not None else None
+        return zone, tier, None
+    
+    encoder = encoder_class(RAW_FIELDS if bucket is None else ROLLUP_FIELDS)
+    body = stream_export([source(zone) for zone in zone_list], encoder, start_ts, end_ts,
+                         rollup=bucket is not None, lock=history_read_lock)
+    history_queries.inc(("export",))
+    filename = f"prism_export_{datetime.fromtimestamp(now_ts):%Y%m%d_%H%M%S}.{encoder.extension}"
+    return StreamingResponse(body, media_type=encoder.media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
 
 # ============================================
 # 장치 관리 엔드포인트
 # ============================================
 
 @app.get("/api/devices")
-async def get_devices():
+async def get_devices(request: Request):
     """
     모든 연결된 장치(라즈베리파이/오렌지파이) 목록 조회
+    온라인 여부는 레지스트리가 마지막 연결 시각 기준(5분)으로 관리
     """
-    devices = []
-    for device_id, device in device_info_store.items():
-        # 마지막 연결 시간 기준으로 온라인/오프라인 판단
-        time_diff = datetime.now() - device.last_seen
-        is_online = time_diff.total_seconds() < 300  # 5분 이내
-        
-        devices.append({
-            "device_id": device.device_id,
-            "device_type": device.device_type,
-            "ip_address": device.ip_address,
-            "status": "online" if is_online else "offline",
-            "last_seen": device.last_seen.isoformat(),
-            "zone": device.zone
-        })
+    def build():
+        refresh_devices()
+        return [device.to_dict() for device in device_registry.values()]
     
-    return devices
+    return response_cache.respond(request, (DEVICES_TAG,), build)
 
 @app.get("/api/device/{device_id}")
 async def get_device_info(device_id: str):
     """
     특정 장치 정보 조회
     """
-    if device_id not in device_info_store:
+    refresh_devices()
+    device = device_registry.get(device_id)
+    if device is None:
         raise HTTPException(status_code=404, detail="장치를 찾을 수 없습니다")
-    
-    device = device_info_store[device_id]
-    time_diff = datetime.now() - device.last_seen
-    is_online = time_diff.total_seconds() < 300
-    
-    return {
-        "device_id": device.device_id,
-        "device_type": device.device_type,
-        "ip_address": device.ip_address,
-        "status": "online" if is_online else "offline",
-        "last_seen": device.last_seen.isoformat(),
-        "zone": device.zone
-    }
+    return device.to_dict()
+
+# 장치 SSH 명령 실행 (장치별 연결 재사용, PRISM_SSH_* 환경 변수 참고)
+ssh_pool = SSHPool()
+
+def ssh_target(device_id: str) -> DeviceRecord:
+    device = device_registry.get(device_id)
+    if device is None:
+        raise HTTPException(status_code=404, detail="장치를 찾을 수 없습니다")
+    if device.ip_address == "0.0.0.0" and not ssh_pool.simulate:
+        raise HTTPException(status_code=409, detail="장치 IP 주소를 알 수 없습니다")
+    return device
 
 @app.post("/api/device/{device_id}/command")
-async def execute_ssh_command(device_id: str, command_data: SSHCommand):
+async def execute_ssh_command(device_id: str, command_data: SSHCommand, stream: bool = False):
     """
     SSH를 통해 라즈베리파이/오렌지파이에 명령 실행
-    실제 구현시 paramiko 또는 asyncssh 라이브러리 사용
+    - 기본: 명령이 끝난 뒤 전체 출력 반환 (접속 실패 502, 시간 초과 504)
+    - stream=true: 출력 줄을 받는 대로 NDJSON으로 전달
+      {"stream": "stdout", "data": "..."} ... 마지막 줄 {"exit_status": 0} 또는 {"error": "..."}
     """
-    if device_id not in device_info_store:
-        raise HTTPException(status_code=404, detail="장치를 찾을 수 없습니다")
+    device = ssh_target(device_id)
+    timeout = command_data.timeout or COMMAND_TIMEOUT
     
-    device = device_info_store[device_id]
+    logger.info("SSH 명령 실행 요청", extra={"fields": {"device_id": device_id, "command": command_data.command}})
     
-    print(f"🔧 SSH 명령 실행 요청 [{device_id}]: {command_data.command}")
+    if stream:
+        async def lines():
+            try:
+                async for name, value in ssh_pool.stream(device.ip_address, command_data.command, timeout):
+                    if name == "exit":
+                        yield encode_json({"exit_status": value}) + b"\n"
+                    else:
+                        yield encode_json({"stream": name, "data": value}) + b"\n"
+            except SSHError as e:
+                yield encode_json({"error": str(e)}) + b"\n"
+        
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
     
-    # 실제 SSH 명령 실행 (예제)
-    # import paramiko
-    # ssh = paramiko.SSHClient()
-    # ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    # ssh.connect(device.ip_address, username='pi', password='raspberry')
-    # stdin, stdout, stderr = ssh.exec_command(command_data.command)
-    # output = stdout.read().decode()
-    # ssh.close()
+    result = await ssh_pool.run(device_id, device.ip_address, command_data.command, timeout)
+    if result.error is not None:
+        logger.warning("SSH 명령 실패", extra={"fields": {"device_id": device_id, "error": result.error}})
+        raise HTTPException(status_code=504 if result.timed_out else 502, detail=result.error)
+    return {**result.to_dict(), "timestamp": datetime.now().isoformat()}
+
+FLEET_PARALLELISM = int(os.getenv("PRISM_SSH_FLEET_PARALLELISM", 16))
+FLEET_MAX_PARALLELISM = 256
+
+@app.post("/api/devices/command")
+async def execute_fleet_command(body: FleetCommand):
+    """
+    구역/장치 종류/장치 ID 목록으로 고른 장치들에 같은 명령을 동시에 실행
+    (예: 구역 전체 장치에서 sudo systemctl restart prism-sensor)
+    결과는 장치별로 끝나는 대로 NDJSON 한 줄씩 전달하고, 마지막 줄에 요약
+      {"targets": 3}
+      {"device_id": "...", "status": "success", "exit_status": 0, "output": "...", ...}
+      {"summary": {"total": 3, "succeeded": 2, "failed": 1, "duration": 1.2}}
+    전체 소요 시간은 장치 수의 합이 아니라 가장 느린 장치(동시 실행 수 이내) 기준
+    """
+    if body.zone is None and body.device_type is None and body.device_ids is None:
+        raise HTTPException(status_code=400, detail="zone, device_type, device_ids 중 하나 이상을 지정하세요")
+    parallelism = FLEET_PARALLELISM if body.parallelism is None else body.parallelism
+    if not 1 <= parallelism <= FLEET_MAX_PARALLELISM:
+        raise HTTPException(status_code=400, detail=f"parallelism은 1~{FLEET_MAX_PARALLELISM} 사이여야 합니다")
+    timeout = body.timeout or COMMAND_TIMEOUT
     
-    # 테스트용 더미 응답
-    return {
-        "status": "success",
-        "device_id": device_id,
-        "command": command_data.command,
-        "output": f"명령 실행 완료 (시뮬레이션)\n{command_data.command}",
-        "timestamp": datetime.now().isoformat()
-    }
+    refresh_devices()
+    if body.device_ids is not None:
+        candidates = [device_registry.get(device_id) or device_id for device_id in dict.fromkeys(body.device_ids)]
+    else:
+        candidates = list(device_registry.values())
+    
+    targets = []
+    skipped: List[CommandResult] = []
+    for device in candidates:
+        if isinstance(device, str):
+            skipped.append(fleet_skip(device, body.command, "장치를 찾을 수 없습니다"))
+            continue
+        if body.zone is not None and device.zone != body.zone:
+            continue
+        if body.device_type is not None and device.device_type != body.device_type:
+            continue
+        if body.online_only and not device.online:
+            continue
+        if device.ip_address == "0.0.0.0" and not ssh_pool.simulate:
+            skipped.append(fleet_skip(device.device_id, body.command, "장치 IP 주소를 알 수 없습니다"))
+            continue
+        targets.append((device.device_id, device.ip_address))
+    
+    logger.info("장치 일괄 명령 실행", extra={"fields": {
+        "command": body.command, "targets": len(targets), "skipped": len(skipped), "parallelism": parallelism
+    }})
+    
+    async def results():
+        started = time.monotonic()
+        succeeded = 0
+        yield encode_json({"targets": len(targets) + len(skipped)}) + b"\n"
+        for result in skipped:
+            yield encode_json(result.to_dict()) + b"\n"
+        async for result in ssh_pool.run_many(targets, body.command, parallelism, timeout):
+            succeeded += result.ok
+            yield encode_json(result.to_dict()) + b"\n"
+        total = len(targets) + len(skipped)
+        yield encode_json({"summary": {
+            "total": total,
+            "succeeded": succeeded,
+            "failed": total - succeeded,
+            "duration": round(time.monotonic() - started, 3)
+        }}) + b"\n"
+    
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+def fleet_skip(device_id: str, command: str, error: str) -> CommandResult:
+    """실행하지 않은 대상의 결과 줄"""
+    result = CommandResult(device_id, command)
+    result.error = error
+    return result
 
 @app.post("/api/device/{device_id}/heartbeat")
 async def device_heartbeat(device_id: str):
@@ -261,22 +1332,25 @@ async def device_heartbeat(device_id: str):
     장치 하트비트 (연결 상태 갱신)
     라즈베리파이/오렌지파이에서 주기적으로 호출
     """
-    if device_id in device_info_store:
-        device_info_store[device_id].last_seen = datetime.now()
-        device_info_store[device_id].status = "online"
-    else:
-        # 새로운 장치 등록 (자동 발견)
-        device_info_store[device_id] = DeviceInfo(
-            device_id=device_id,
-            device_type="unknown",
-            ip_address="0.0.0.0",
-            status="online",
-            last_seen=datetime.now(),
-            zone="unknown"
-        )
+    with state_write_lock():
+        wait = heartbeat_limiter.acquire(device_id)
+    if wait:
+        raise rate_limited(wait, coalesced=False)
+    touch_device(device_id)
     
     return {"status": "ok", "device_id": device_id}
 
+def touch_device(device_id: str, zone: Optional[str] = None):
+    """
+    장치 연결 상태 갱신 (하트비트 또는 장치 ID가 포함된 데이터 전송시)
+    등록되지 않은 장치는 자동 등록
+    """
+    device = device_registry.touch(device_id, zone)
+    if shared_state is not None:
+        shared_state.upsert_device(device.device_id, device.device_type, device.ip_address,
+                                   device.zone, device.last_seen)
+    response_cache.invalidate(DEVICES_TAG)
+
 # ============================================
 # CCTV 관련 엔드포인트
 # ============================================
@@ -294,11 +1368,16 @@ async def get_cctv_stream(zone: str):
 # 구역 관리 엔드포인트
 # ============================================
 
+ZONE_IDS = ("testbox", "warehouse", "inspection", "machine")
+
 @app.get("/api/zones")
-async def get_zones():
+async def get_zones(request: Request):
     """
     모든 구역 목록과 상태를 반환
     """
+    return response_cache.respond(request, [zone_tag(zone) for zone in ZONE_IDS], list_zones)
+
+def list_zones() -> List[Dict]:
     zones = [
         {
             "id": "testbox",
@@ -341,15 +1420,66 @@ async def health_check():
     """
     서버 상태 확인
     """
+    refresh_devices()
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "active_zones": len(sensor_data_store),
-        "total_devices": len(device_info_store),
-        "online_devices": sum(1 for d in device_info_store.values() 
-                            if (datetime.now() - d.last_seen).total_seconds() < 300)
+        "total_devices": len(device_registry),
+        "online_devices": device_registry.online_count
     }
 
+# ============================================
+# 메트릭
+# ============================================
+
+def collect_store_samples():
+    for zone, history in historical_data_store.items():
+        yield (zone,), len(history)
+
+def collect_store_bytes():
+    for zone, history in historical_data_store.items():
+        rollups = rollup_store.get(zone)
+        yield (zone, "raw"), history.nbytes
+        if rollups is not None:
+            yield (zone, "rollup"), rollups.nbytes
+    for zone, archive in archive_store.items():
+        yield (zone, "archive"), archive.nbytes
+
+def collect_queue_depths():
+    yield ("alerts",), alert_engine.queue_depth
+    yield ("storage",), storage.queue_depth
+
+def collect_devices():
+    refresh_devices()
+    yield ("online",), device_registry.online_count
+    yield ("offline",), device_registry.offline_count
+
+metrics.gauge("prism_history_samples", "구역별 원본 버퍼 샘플 수", ("zone",), collect_store_samples)
+metrics.gauge("prism_history_bytes", "구역별 이력 버퍼 메모리 (바이트)", ("zone", "kind"), collect_store_bytes)
+metrics.gauge("prism_process_resident_memory_bytes", "서버 프로세스 메모리 (RSS)",
+              collect=lambda: [((), resident_memory_bytes())])
+metrics.gauge("prism_queue_depth", "백그라운드 처리 대기 항목 수", ("queue",), collect_queue_depths)
+metrics.gauge("prism_alerts_dropped", "큐가 가득 차서 평가하지 못한 샘플 수",
+              collect=lambda: [((), alert_engine.dropped)])
+metrics.gauge("prism_log_dropped", "큐가 가득 차서 버린 로그 수", collect=lambda: [((), dropped_count())])
+metrics.gauge("prism_live_subscribers", "실시간 업데이트(SSE) 구독자 수",
+              collect=lambda: [((), live_hub.subscriber_count)])
+metrics.gauge("prism_devices", "상태별 장치 수", ("status",), collect_devices)
+metrics.gauge("prism_ssh_connections", "장치 SSH 연결 수 (open: 열린 연결, active: 실행 중인 명령)", ("state",),
+              collect=lambda: [(("open",), ssh_pool.open_connections), (("active",), ssh_pool.active_sessions)])
+metrics.gauge("prism_response_cache_entries", "조회 응답 캐시 항목 수", collect=lambda: [((), len(response_cache))])
+metrics.gauge("prism_response_cache_requests", "조회 응답 캐시 결과별 요청 수", ("result",),
+              collect=lambda: [(("hit",), response_cache.hits), (("miss",), response_cache.misses),
+                               (("not_modified",), response_cache.not_modified)])
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Prometheus 형식 메트릭
+    """
+    return Response(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
 @app.get("/")
 async def root():
     """
@@ -383,139 +1513,16 @@ if __name__ == "__main__":
     print("   라즈베리파이/오렌지파이 → FastAPI (JSON/SSH)")
     print("")
     
-    uvicorn.run(app, host="0.0.0.0", port=port)
-
-# CORS 설정 (프론트엔드에서 접근 가능하도록)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # 실제 운영시에는 특정 도메인만 허용
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# 데이터 모델
-class SensorData(BaseModel):
-    zone: str
-    temperature: float
-    gas: float
-    dust: float
-    flame: bool
-    timestamp: datetime
-
-class HistoricalData(BaseModel):
-    timestamp: datetime
-    temperature: float
-    gas: float
-    dust: float
-
-# 인메모리 데이터 저장 (실제로는 데이터베이스 사용 권장)
-sensor_data_store = {}
-historical_data_store = {}
-
-# 라즈베리파이에서 센서 데이터 받기 (POST)
-@app.post("/api/sensors/{zone}")
-async def update_sensor_data(zone: str, data: SensorData):
-    """
-    라즈베리파이에서 센서 데이터를 전송하는 엔드포인트
-    """
-    data.zone = zone
-    data.timestamp = datetime.now()
-    
-    # 현재 데이터 저장
-    sensor_data_store[zone] = data
-    
-    # 히스토리 데이터 저장
-    if zone not in historical_data_store:
-        historical_data_store[zone] = []
-    
-    historical_data_store[zone].append({
-        "timestamp": data.timestamp,
-        "temperature": data.temperature,
-        "gas": data.gas,
-        "dust": data.dust
-    })
-    
-    # 최근 24시간 데이터만 유지
-    cutoff_time = datetime.now() - timedelta(hours=24)
-    historical_data_store[zone] = [
-        d for d in historical_data_store[zone]
-        if d["timestamp"] > cutoff_time
-    ]
-    
-    return {"status": "success", "message": "센서 데이터가 업데이트되었습니다"}
-
-# 중복된 엔드포인트 제거됨 - 위쪽의 get_sensor_data 사용
-
-# 중복된 엔드포인트 제거됨 - 위쪽의 get_historical_data 사용
-
-# CCTV 스트림 (예제)
-@app.get("/api/cctv/{zone}/stream")
-async def get_cctv_stream(zone: str):
-    """
-    CCTV 스트림을 제공하는 엔드포인트
-    실제로는 IP 카메라 또는 라즈베리파이 카메라 모듈과 연동
-    """
-    # 실제 구현시 카메라 스트림 반환
-    # 현재는 플레이스홀더
-    raise HTTPException(status_code=503, detail="CCTV 스트림이 연결되지 않았습니다")
-
-# 모든 구역 목록
-@app.get("/api/zones")
-async def get_zones():
-    """
-    모든 구역 목록과 상태를 반환
-    """
-    zones = [
-        {
-            "id": "testbox",
-            "name": "TEST BOX",
-            "active": True,
-            "status": "normal"
-        },
-        {
-            "id": "warehouse",
-            "name": "원자재 창고",
-            "active": False,
-            "status": "inactive"
-        },
-        {
-            "id": "inspection",
-            "name": "제품 검사실",
-            "active": False,
-            "status": "inactive"
-        },
-        {
-            "id": "machine",
-            "name": "기계/전기실",
-            "active": False,
-            "status": "inactive"
-        }
-    ]
-    
-    return zones
-
-# 헬스 체크
-@app.get("/health")
-async def health_check():
-    """
-    서버 상태 확인
-    """
-    return {
-        "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
-        "active_zones": len(sensor_data_store)
-    }
-
-# 루트 경로
-@app.get("/")
-async def root():
-    return {
-        "message": "PRISM Sensor API",
-        "version": "1.0.0",
-        "docs": "/docs"
-    }
+    # 요청마다 남는 접근 로그는 기본적으로 끔 (PRISM_ACCESS_LOG=1로 켜기)
+    access_log = os.getenv("PRISM_ACCESS_LOG") == "1"
+    workers = int(os.getenv("PRISM_WORKERS", 1))
+    if workers > 1:
+        # 워커 프로세스마다 이 모듈을 다시 import하므로 공유 저장소가 필요
+        if os.getenv("PRISM_STORAGE", "shared").lower() != "shared":
+            raise SystemExit("PRISM_WORKERS > 1은 PRISM_STORAGE=shared에서만 사용할 수 있습니다")
+        os.environ["PRISM_STORAGE"] = "shared"
+        print(f"👥 워커 {workers}개 (공유 저장소: PRISM_STORAGE=shared)")
+        uvicorn.run("api_server:app", host="0.0.0.0", port=port, workers=workers, access_log=access_log)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port, access_log=access_log)
 
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
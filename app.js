@@ -96,26 +96,115 @@ app.post('/api/sensors/:zone', async (req, res) => {
     }
 });
 
+// 센서 데이터 배치 업데이트 (여러 샘플을 한 번에 전송)
+app.post('/api/sensors/:zone/batch', async (req, res) => {
+    try {
+        const { zone } = req.params;
+        const response = await axios.post(
+            `${FASTAPI_URL}/api/sensors/${zone}/batch`,
+            req.body,
+            { timeout: 10000 }
+        );
+        
+        res.json(response.data);
+    } catch (error) {
+        console.error(`센서 데이터 배치 업데이트 실패 [${req.params.zone}]:`, error.message);
+        res.status(500).json({ error: '센서 데이터를 업데이트할 수 없습니다' });
+    }
+});
+
+// 실시간 업데이트 스트림 (Server-Sent Events)
+app.get('/api/stream', async (req, res) => {
+    try {
+        const response = await axios.get(`${FASTAPI_URL}/api/stream`, {
+            params: req.query,
+            responseType: 'stream',
+            timeout: 0 // 스트림은 장시간 유지
+        });
+        
+        res.setHeader('Content-Type', 'text/event-stream');
+        res.setHeader('Cache-Control', 'no-cache');
+        res.setHeader('X-Accel-Buffering', 'no');
+        res.flushHeaders();
+        
+        response.data.pipe(res);
+        // 브라우저 연결이 끊기면 FastAPI 연결도 종료
+        req.on('close', () => response.data.destroy());
+    } catch (error) {
+        console.error('실시간 스트림 연결 실패:', error.message);
+        res.status(503).json({ error: '실시간 스트림에 연결할 수 없습니다' });
+    }
+});
+
+// FastAPI 응답을 다시 파싱하지 않고 바이트 그대로 전달 (상태 코드, 형식, 캐시 헤더 유지)
+const PASSTHROUGH_HEADERS = ['content-type', 'content-length', 'content-disposition', 'etag', 'cache-control'];
+
+async function pipeFromFastAPI(req, res, url, params, timeout) {
+    const headers = {};
+    if (req.headers['if-none-match']) headers['If-None-Match'] = req.headers['if-none-match'];
+    
+    const response = await axios.get(url, {
+        params,
+        headers,
+        responseType: 'stream',
+        timeout,
+        validateStatus: () => true // 400/404/304도 FastAPI 응답 그대로 전달
+    });
+    
+    res.status(response.status);
+    for (const name of PASSTHROUGH_HEADERS) {
+        if (response.headers[name] !== undefined) res.setHeader(name, response.headers[name]);
+    }
+    response.data.pipe(res);
+    // 브라우저 연결이 끊기면 FastAPI 연결도 종료
+    res.on('close', () => response.data.destroy());
+}
+
 // 과거 데이터 조회
 app.get('/api/history/:zone', async (req, res) => {
     try {
         const { zone } = req.params;
-        const { hours, days } = req.query;
+        const { hours, days, start, end, bucket, points, method, format } = req.query;
         
-        let url = `${FASTAPI_URL}/api/history/${zone}`;
-        const params = [];
-        if (hours) params.push(`hours=${hours}`);
-        if (days) params.push(`days=${days}`);
-        if (params.length > 0) url += `?${params.join('&')}`;
+        const url = `${FASTAPI_URL}/api/history/${zone}`;
+        const params = {};
+        if (hours) params.hours = hours;
+        if (days) params.days = days;
+        if (start) params.start = start;
+        if (end) params.end = end;
+        if (bucket) params.bucket = bucket;
+        if (points) params.points = points;
+        if (method) params.method = method;
+        if (format) params.format = format;
         
-        const response = await axios.get(url, { timeout: 10000 });
-        res.json(response.data);
+        await pipeFromFastAPI(req, res, url, params, 10000);
     } catch (error) {
         console.error(`과거 데이터 조회 실패 [${req.params.zone}]:`, error.message);
         res.status(500).json({ error: '과거 데이터를 가져올 수 없습니다' });
     }
 });
 
+// 구역 통계 요약 / 이상 구간
+app.get('/api/analytics/:zone', async (req, res) => {
+    try {
+        const { zone } = req.params;
+        await pipeFromFastAPI(req, res, `${FASTAPI_URL}/api/analytics/${zone}`, req.query, 30000);
+    } catch (error) {
+        console.error(`구역 통계 조회 실패 [${req.params.zone}]:`, error.message);
+        res.status(500).json({ error: '구역 통계를 가져올 수 없습니다' });
+    }
+});
+
+// 이력 내보내기 (NDJSON/CSV/열 단위 바이너리 스트리밍)
+app.get('/api/export', async (req, res) => {
+    try {
+        await pipeFromFastAPI(req, res, `${FASTAPI_URL}/api/export`, req.query, 0); // 구간 길이만큼 오래 걸릴 수 있음
+    } catch (error) {
+        console.error('이력 내보내기 실패:', error.message);
+        res.status(500).json({ error: '이력을 내보낼 수 없습니다' });
+    }
+});
+
 // CCTV 스트림
 app.get('/api/cctv/:zone/stream', async (req, res) => {
     try {
@@ -157,6 +246,29 @@ app.post('/api/device/:deviceId/command', async (req, res) => {
     }
 });
 
+// 여러 장치 일괄 명령 실행 (장치별 결과를 NDJSON으로 끝나는 대로 전달)
+app.post('/api/devices/command', async (req, res) => {
+    try {
+        console.log(`🔧 일괄 SSH 명령 실행: ${req.body.command}`);
+        
+        const response = await axios.post(`${FASTAPI_URL}/api/devices/command`, req.body, {
+            responseType: 'stream',
+            timeout: 0 // 장치별 제한 시간은 FastAPI에서 적용
+        });
+        
+        res.setHeader('Content-Type', 'application/x-ndjson');
+        res.setHeader('X-Accel-Buffering', 'no');
+        res.flushHeaders();
+        
+        response.data.pipe(res);
+        req.on('close', () => response.data.destroy());
+    } catch (error) {
+        console.error('일괄 SSH 명령 실행 실패:', error.message);
+        const status = error.response ? error.response.status : 500;
+        res.status(status).json({ error: '일괄 명령을 실행할 수 없습니다' });
+    }
+});
+
 // 장치 상태 조회
 app.get('/api/devices', async (req, res) => {
     try {
@@ -0,0 +1,304 @@
+"""
+PRISM 수신/조회 경로 벤치마크
+- 장치 N대가 설정한 주기로 센서 데이터를 전송 (raspberry_pi_sensor.py의 센서 읽기 함수 재사용)
+- 동시에 대시보드처럼 /api/history, /api/devices 조회
+- 24시간 분량 데이터를 미리 채워 메모리 증가량 측정 (in-process 모드)
+- 결과는 JSON 리포트로 저장, --baseline 리포트와 비교해 성능 저하 시 종료 코드 1
+
+사용법:
+  python benchmark.py --devices 20 --rate 1 --duration 30
+  python benchmark.py --url http://localhost:8000 --devices 50 --batch 12
+  python benchmark.py --output new.json --baseline benchmark_report.json
+
+httpx 필요 (pip install httpx)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# in-process 모드 기본값: 디스크에 기록하지 않고 로그는 오류만 출력
+os.environ.setdefault("PRISM_STORAGE", "memory")
+os.environ.setdefault("PRISM_LOG_LEVEL", "ERROR")
+# 모든 가상 장치가 같은 주소에서 보내므로 in-process 모드에서는 속도 제한을 사실상 끔
+os.environ.setdefault("PRISM_DEVICE_RATE", "1e9")
+os.environ.setdefault("PRISM_ZONE_RATE", "1e9")
+
+from raspberry_pi_sensor import SENSOR_READERS  # noqa: E402
+
+# ============================================
+# 측정 도구
+# ============================================
+
+class LatencyRecorder:
+    """엔드포인트별 응답 시간(초) 및 오류 수"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def add(self, name: str, elapsed: float, ok: bool) -> None:
+        self.samples.setdefault(name, []).append(elapsed)
+        if not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def summary(self) -> Dict[str, Dict]:
+        result = {}
+        for name, values in self.samples.items():
+            values = sorted(values)
+            result[name] = {
+                "count": len(values),
+                "errors": self.errors.get(name, 0),
+                "mean_ms": round(sum(values) / len(values) * 1000, 3),
+                "p50_ms": round(percentile(values, 50) * 1000, 3),
+                "p99_ms": round(percentile(values, 99) * 1000, 3),
+                "max_ms": round(values[-1] * 1000, 3),
+            }
+        return result
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """nearest-rank 백분위수"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(p / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def make_sample(ts: Optional[float] = None) -> Dict:
+    """실제 장치와 같은 센서 읽기 함수로 샘플 생성"""
+    sample = {name: read() for name, read in SENSOR_READERS.items()}
+    sample["timestamp"] = datetime.fromtimestamp(ts if ts is not None else time.time()).isoformat()
+    return sample
+
+
+async def timed(client, recorder: LatencyRecorder, name: str, method: str, url: str, **kwargs):
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+        ok = response.status_code < 400
+    except httpx.HTTPError:
+        ok = False
+    recorder.add(name, time.perf_counter() - started, ok)
+    return ok
+
+# ============================================
+# 부하 생성
+# ============================================
+
+async def backfill(client, zones: List[str], hours: float, interval: float, batch: int) -> Dict:
+    """구역별 hours 시간 분량 샘플을 배치 요청으로 채움 (메모리 증가량 측정용)"""
+    now = time.time()
+    start = now - hours * 3600
+    count = int(hours * 3600 / interval)
+    sent = 0
+    started = time.perf_counter()
+    for zone in zones:
+        for offset in range(0, count, batch):
+            samples = [make_sample(start + (offset + i) * interval) for i in range(min(batch, count - offset))]
+            response = await client.post(f"/api/sensors/{zone}/batch", json={"samples": samples})
+            response.raise_for_status()
+            sent += len(samples)
+    elapsed = time.perf_counter() - started
+    return {"samples": sent, "seconds": round(elapsed, 3), "samples_per_s": round(sent / elapsed, 1)}
+
+
+async def device_loop(client, recorder: LatencyRecorder, device_id: str, zone: str,
+                      rate: float, batch: int, deadline: float, counts: Dict[str, int]) -> None:
+    """
+    장치 한 대: rate(샘플/초)로 데이터를 만들고 batch개씩 전송
+    전송 시각은 고정 일정 기준 (응답이 늦어져도 다음 전송이 밀리지 않음)
+    """
+    interval = batch / rate
+    next_send = time.perf_counter()
+    while next_send < deadline:
+        await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+        if batch == 1:
+            body = {**make_sample(), "zone": zone}
+            ok = await timed(client, recorder, "POST /api/sensors/{zone}", "POST", f"/api/sensors/{zone}", json=body)
+        else:
+            now = time.time()
+            body = {
+                "samples": [make_sample(now - (batch - 1 - i) / rate) for i in range(batch)],
+                "device_id": device_id,
+            }
+            ok = await timed(client, recorder, "POST /api/sensors/{zone}/batch", "POST",
+                             f"/api/sensors/{zone}/batch", json=body)
+        if ok:
+            counts["samples"] += batch
+        counts["requests"] += 1
+        next_send += interval
+
+
+async def reader_loop(client, recorder: LatencyRecorder, zones: List[str], query_rate: float,
+                      points: int, history_format: str, deadline: float) -> None:
+    """대시보드 한 개: 이력/장치 목록을 번갈아 조회"""
+    interval = 1 / query_rate
+    next_query = time.perf_counter()
+    i = 0
+    while next_query < deadline:
+        await asyncio.sleep(max(0.0, next_query - time.perf_counter()))
+        zone = zones[i % len(zones)]
+        if i % 2 == 0:
+            await timed(client, recorder, "GET /api/history/{zone}", "GET", f"/api/history/{zone}",
+                        params={"hours": 24, "points": points, "format": history_format})
+        else:
+            await timed(client, recorder, "GET /api/devices", "GET", "/api/devices")
+        i += 1
+        next_query += interval
+
+# ============================================
+# 실행
+# ============================================
+
+def memory_snapshot(server) -> Dict:
+    from metrics import resident_memory_bytes
+    archive_bytes = sum(a.nbytes for a in server.archive_store.values())  # 압축 보관 청크 (원본 버퍼와 별도로 보유)
+    store_bytes = sum(h.nbytes for h in server.historical_data_store.values())
+    store_bytes += sum(r.nbytes for r in server.rollup_store.values())
+    store_bytes += archive_bytes
+    return {"rss_bytes": resident_memory_bytes(), "store_bytes": store_bytes, "archive_bytes": archive_bytes}
+
+
+async def run(args) -> Dict:
+    zones = [f"bench_zone_{i}" for i in range(args.zones)]
+    server = None
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=30)
+    else:
+        import api_server as server
+        await server.app.router.startup()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app),
+                                   base_url="http://benchmark", timeout=30)
+
+    report: Dict = {}
+    try:
+        if server is not None:
+            before = memory_snapshot(server)
+            report["backfill"] = await backfill(client, zones, args.simulate_hours, args.interval, 1000)
+            after = memory_snapshot(server)
+            report["memory"] = {
+                "simulated_hours": args.simulate_hours,
+                "before": before,
+                "after": after,
+                "rss_growth_bytes": after["rss_bytes"] - before["rss_bytes"],
+                "store_growth_bytes": after["store_bytes"] - before["store_bytes"],
+                "archive_growth_bytes": after["archive_bytes"] - before["archive_bytes"],
+            }
+
+        recorder = LatencyRecorder()
+        counts = {"samples": 0, "requests": 0}
+        deadline = time.perf_counter() + args.duration
+        tasks = [
+            device_loop(client, recorder, f"bench_device_{i}", zones[i % len(zones)],
+                        args.rate, args.batch, deadline, counts)
+            for i in range(args.devices)
+        ]
+        tasks += [
+            reader_loop(client, recorder, zones, args.query_rate, args.points, args.history_format, deadline)
+            for _ in range(args.readers)
+        ]
+        started = time.perf_counter()
+        await asyncio.gather(*tasks)
+        elapsed = max(time.perf_counter() - started, args.duration)
+
+        report["ingest"] = {
+            "requests": counts["requests"],
+            "samples": counts["samples"],
+            "seconds": round(elapsed, 3),
+            "samples_per_s": round(counts["samples"] / elapsed, 1),
+            "target_samples_per_s": args.devices * args.rate,
+        }
+        report["latency"] = recorder.summary()
+        if server is not None:
+            report["memory"]["after_load"] = memory_snapshot(server)
+    finally:
+        await client.aclose()
+        if server is not None:
+            await server.app.router.shutdown()
+    return report
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """기준 리포트 대비 p99 증가 / 처리량 감소가 tolerance 비율을 넘으면 목록으로 반환"""
+    regressions = []
+    for name, stats in report.get("latency", {}).items():
+        base = baseline.get("latency", {}).get(name)
+        if base and base["p99_ms"] > 0 and stats["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{name} p99 {base['p99_ms']}ms → {stats['p99_ms']}ms")
+    for section in ("ingest", "backfill"):
+        new, base = report.get(section), baseline.get(section)
+        if new and base and new["samples_per_s"] < base["samples_per_s"] * (1 - tolerance):
+            regressions.append(f"{section} 처리량 {base['samples_per_s']} → {new['samples_per_s']} 샘플/초")
+    new, base = report.get("memory"), baseline.get("memory")
+    if new and base and base["store_growth_bytes"] > 0 and \
+            new["store_growth_bytes"] > base["store_growth_bytes"] * (1 + tolerance):
+        regressions.append(f"저장소 메모리 {base['store_growth_bytes']} → {new['store_growth_bytes']} 바이트")
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="PRISM 수신/조회 경로 벤치마크")
+    parser.add_argument("--url", help="서버 주소 (생략하면 api_server.app을 프로세스 안에서 직접 호출)")
+    parser.add_argument("--devices", type=int, default=10, help="시뮬레이션 장치 수")
+    parser.add_argument("--zones", type=int, default=4, help="구역 수 (장치를 나눠 배치)")
+    parser.add_argument("--rate", type=float, default=1.0, help="장치당 초당 샘플 수")
+    parser.add_argument("--batch", type=int, default=1, help="요청당 샘플 수 (1이면 단일 전송 엔드포인트)")
+    parser.add_argument("--readers", type=int, default=2, help="동시 조회 클라이언트 수")
+    parser.add_argument("--query-rate", type=float, default=2.0, help="조회 클라이언트당 초당 요청 수")
+    parser.add_argument("--points", type=int, default=200, help="이력 조회시 points 값")
+    parser.add_argument("--history-format", choices=("rows", "columns"), default="rows", help="이력 응답 형식")
+    parser.add_argument("--duration", type=float, default=20.0, help="부하 시간 (초)")
+    parser.add_argument("--simulate-hours", type=float, default=24.0, help="미리 채울 데이터 기간 (in-process 모드)")
+    parser.add_argument("--interval", type=float, default=5.0, help="미리 채울 데이터의 샘플 간격 (초)")
+    parser.add_argument("--output", default="benchmark_report.json", help="JSON 리포트 경로")
+    parser.add_argument("--baseline", help="비교할 이전 리포트 경로")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="허용 성능 저하 비율 (기본 20%%)")
+    return parser.parse_args()
+
+
+def main():
+    if httpx is None:
+        sys.exit("httpx가 필요합니다: pip install httpx")
+    args = parse_args()
+
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+    }
+    report.update(asyncio.run(run(args)))
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            report["regressions"] = compare(report, json.load(f), args.tolerance)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(json.dumps({key: report[key] for key in ("ingest", "latency") if key in report},
+                     ensure_ascii=False, indent=2))
+    if "memory" in report:
+        print(f"💾 {args.simulate_hours}시간 분량 저장 후 메모리: 저장소 +{report['memory']['store_growth_bytes']:,}B "
+              f"(압축 보관 +{report['memory']['archive_growth_bytes']:,}B), RSS +{report['memory']['rss_growth_bytes']:,}B")
+    print(f"📄 리포트 저장: {args.output}")
+    if report.get("regressions"):
+        print("❌ 성능 저하:")
+        for line in report["regressions"]:
+            print(f"   - {line}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
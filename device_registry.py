@@ -0,0 +1,196 @@
+"""
+PRISM 장치 레지스트리
+- 장치별 마지막 연결 시각과 온라인/오프라인 상태 관리
+- 만료 시각 순 힙으로 온라인 장치를 관리하므로 상태 확인 시 전체 장치를 훑지 않음
+- 온라인/오프라인 장치 수는 상태가 바뀔 때만 갱신 (조회는 O(1))
+- 상태가 바뀌면 on_transition 콜백 호출 (online → offline, offline → online)
+"""
+
+import heapq
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+ONLINE_TIMEOUT = 300  # 마지막 연결 후 이 시간(초)이 지나면 오프라인
+
+# ============================================
+# 장치 정보
+# ============================================
+
+class DeviceRecord:
+    __slots__ = ("device_id", "device_type", "ip_address", "zone", "last_seen", "online")
+
+    def __init__(self, device_id: str, device_type: str, ip_address: str, zone: str, last_seen: float):
+        self.device_id = device_id
+        self.device_type = device_type
+        self.ip_address = ip_address
+        self.zone = zone
+        self.last_seen = last_seen  # epoch 초
+        self.online = False
+
+    @property
+    def status(self) -> str:
+        return "online" if self.online else "offline"
+
+    def to_dict(self) -> Dict:
+        """API 응답/체크포인트 형식"""
+        return {
+            "device_id": self.device_id,
+            "device_type": self.device_type,
+            "ip_address": self.ip_address,
+            "status": self.status,
+            "last_seen": datetime.fromtimestamp(self.last_seen).isoformat(),
+            "zone": self.zone
+        }
+
+# ============================================
+# 레지스트리
+# ============================================
+
+class DeviceRegistry:
+    """
+    온라인 장치는 힙에 (만료 시각, 장치 ID) 항목을 하나씩 가짐
+    하트비트는 last_seen만 갱신하고, 힙 항목은 만료 시점에 꺼내서 그 사이 연결이 있었으면 다시 넣음
+    """
+
+    def __init__(self, timeout: float = ONLINE_TIMEOUT,
+                 on_transition: Optional[Callable[[DeviceRecord], None]] = None):
+        self.timeout = timeout
+        self.on_transition = on_transition
+        self._devices: Dict[str, DeviceRecord] = {}
+        self._expiry: List[Tuple[float, str]] = []
+        self._queued = set()  # 힙에 항목이 있는 장치 ID (장치당 최대 하나)
+        self._online = 0
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+    def __contains__(self, device_id: str) -> bool:
+        return device_id in self._devices
+
+    def get(self, device_id: str) -> Optional[DeviceRecord]:
+        return self._devices.get(device_id)
+
+    def values(self) -> Iterator[DeviceRecord]:
+        return iter(self._devices.values())
+
+    @property
+    def online_count(self) -> int:
+        return self._online
+
+    @property
+    def offline_count(self) -> int:
+        return len(self._devices) - self._online
+
+    # --------------------------------------------
+    # 등록 / 갱신
+    # --------------------------------------------
+
+    def register(self, device_id: str, device_type: str = "unknown", ip_address: str = "0.0.0.0",
+                 zone: str = "unknown", last_seen: Optional[float] = None) -> DeviceRecord:
+        """장치 등록 또는 정보 교체 (last_seen 기준으로 초기 상태 결정, 이벤트 없음)"""
+        now = time.time()
+        last_seen = now if last_seen is None else last_seen
+        previous = self._devices.get(device_id)
+        if previous is not None and previous.online:
+            self._online -= 1
+        record = self._devices[device_id] = DeviceRecord(device_id, device_type, ip_address, zone, last_seen)
+        if last_seen + self.timeout > now:
+            self._set_online(record)
+        return record
+
+    def touch(self, device_id: str, zone: Optional[str] = None, now: Optional[float] = None) -> DeviceRecord:
+        """
+        하트비트 / 장치 ID가 포함된 데이터 수신
+        등록되지 않은 장치는 자동 등록, 오프라인이던 장치는 온라인으로 전환
+        """
+        now = time.time() if now is None else now
+        record = self._devices.get(device_id)
+        if record is None:
+            record = self._devices[device_id] = DeviceRecord(device_id, "unknown", "0.0.0.0", zone or "unknown", now)
+        else:
+            record.last_seen = now
+            if zone and record.zone == "unknown":
+                record.zone = zone
+        if not record.online:
+            self._set_online(record)
+            self._notify(record)
+        return record
+
+    def merge(self, device_id: str, device_type: str, ip_address: str, zone: str, last_seen: float,
+              now: Optional[float] = None, notify: bool = True) -> DeviceRecord:
+        """
+        다른 워커가 기록한 장치 정보 반영 (마지막 연결 시각은 더 최근 값 유지)
+        그 사이 연결이 있어 오프라인에서 온라인이 되면 on_transition 호출 (notify=False면 생략)
+        """
+        now = time.time() if now is None else now
+        record = self._devices.get(device_id)
+        if record is None:
+            record = self._devices[device_id] = DeviceRecord(device_id, device_type, ip_address, zone, last_seen)
+        else:
+            record.device_type = device_type
+            record.ip_address = ip_address
+            record.zone = zone
+            record.last_seen = max(record.last_seen, last_seen)
+        if not record.online and record.last_seen + self.timeout > now:
+            self._set_online(record)
+            if notify:
+                self._notify(record)
+        return record
+
+    def _set_online(self, record: DeviceRecord) -> None:
+        record.online = True
+        self._online += 1
+        if record.device_id not in self._queued:
+            self._queued.add(record.device_id)
+            heapq.heappush(self._expiry, (record.last_seen + self.timeout, record.device_id))
+
+    # --------------------------------------------
+    # 만료 처리
+    # --------------------------------------------
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """
+        만료 시각이 지난 힙 항목만 확인 (만료된 장치가 없으면 힙 맨 앞 하나만 보고 끝)
+        반환: 오프라인으로 전환된 장치 수
+        """
+        now = time.time() if now is None else now
+        expired = 0
+        while self._expiry and self._expiry[0][0] <= now:
+            _, device_id = heapq.heappop(self._expiry)
+            record = self._devices.get(device_id)
+            if record is None or not record.online:
+                self._queued.discard(device_id)
+                continue
+            expires_at = record.last_seen + self.timeout
+            if expires_at > now:
+                # 그 사이 다시 연결됨 → 새 만료 시각으로 다시 넣음
+                heapq.heappush(self._expiry, (expires_at, device_id))
+                continue
+            self._queued.discard(device_id)
+            record.online = False
+            self._online -= 1
+            expired += 1
+            self._notify(record)
+        return expired
+
+    def _notify(self, record: DeviceRecord) -> None:
+        if self.on_transition is not None:
+            self.on_transition(record)
+
+    # --------------------------------------------
+    # 체크포인트
+    # --------------------------------------------
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {device_id: record.to_dict() for device_id, record in self._devices.items()}
+
+    def restore(self, devices: Dict[str, Dict]) -> None:
+        for device_id, info in devices.items():
+            self.register(
+                device_id,
+                info.get("device_type", "unknown"),
+                info.get("ip_address", "0.0.0.0"),
+                info.get("zone", "unknown"),
+                datetime.fromisoformat(info["last_seen"]).timestamp()
+            )
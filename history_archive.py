@@ -0,0 +1,372 @@
+"""
+PRISM 장기 이력 압축 보관 (Gorilla 방식 청크)
+- 원본 링 버퍼(24시간)에 들어온 샘플을 CHUNK_SECONDS 또는 CHUNK_ROWS마다 닫아서 압축 청크로 보관
+- 닫힌 청크는 바뀌지 않으므로 메모리에는 압축된 bytes만 두고 조회할 때 필요한 청크만 풀어서 사용
+- 조회 경로에서는 링 버퍼에 없는 구간(24시간 이전)만 청크에서 읽어 원본 열 배열과 이어 붙임
+- 이미 닫힌 구간에 늦게 온 샘플은 해당 청크를 풀어서 병합한 새 청크로 교체 (청크끼리는 겹치지 않음)
+
+청크 인코딩 (리틀 엔디안):
+  헤더: 매직 "PZ" | 버전(u8) | 행 수(u32) | 시작/끝 타임스탬프(f64) | 중앙값 간격(f64) | 공백 수(u16)
+        공백마다 (직전 샘플, 다음 샘플) 타임스탬프(f64 x 2)
+  본문(zlib): 타임스탬프 열 + 지표별 열
+    타임스탬프: 첫 값(i64) | 첫 차이(i64) | 정수 배열 (마이크로초 정수의 delta-of-delta, 주기가 일정하면 대부분 0)
+    지표값   : 모드(u8) | 첫 값(i64) | 정수 배열
+               Q = 0.01 단위 정수로 바꿔도 값이 그대로일 때 이전 값과의 차이 (센서 전송 형식과 같은 양자화)
+               X = 그 외에는 이전 값과 IEEE 754 비트 XOR (Gorilla, 손실 없음)
+    정수 배열: array 타입 코드(u8) + 값
+    정수 배열은 값 범위에 맞는 가장 작은 폭(1/2/4/8바이트)을 쓰고 남는 0 바이트는 zlib이 압축
+  Python 반복 없이 map/accumulate로 인코딩/디코딩 (4096행 청크 기준 수 ms)
+
+공백(gap): 샘플 간격이 max(GAP_MIN_SECONDS, 중앙값 간격 x GAP_FACTOR)를 넘는 구간
+  청크를 닫을 때 찾아서 헤더에 기록하므로 공백 조회에는 청크를 풀지 않음
+
+환경 변수:
+  PRISM_ARCHIVE_DAYS  압축 보관 기간 (일, 기본 90, 0이면 보관 안 함)
+"""
+
+import os
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, repeat
+from operator import mul, sub, truediv, xor
+from typing import Iterator, List, Optional, Tuple
+
+from history_store import METRICS, TimeSeriesRing
+from sensor_codec import VALUE_SCALE
+
+# ============================================
+# 설정
+# ============================================
+
+ARCHIVE_RETENTION_SECONDS = float(os.getenv("PRISM_ARCHIVE_DAYS", 90)) * 24 * 60 * 60
+CHUNK_SECONDS = 60 * 60      # 닫지 않은 행이 이 시간만큼 쌓이면 청크로 닫음 (1시간)
+CHUNK_ROWS = 4096            # 청크 최대 행 수 (빠른 전송 주기에서도 청크 크기 제한)
+GAP_FACTOR = 3               # 중앙값 간격의 몇 배를 넘으면 공백으로 보는지
+GAP_MIN_SECONDS = 30         # 이보다 짧은 간격은 공백으로 보지 않음 (전송 지연/배치 전송)
+
+TIMESTAMP_SCALE = 1_000_000  # 타임스탬프 정밀도 (마이크로초, datetime 해상도)
+MODE_QUANTIZED = ord("Q")
+MODE_XOR = ord("X")
+
+CHUNK_MAGIC = b"PZ"
+CHUNK_VERSION = 1
+CHUNK_HEADER = struct.Struct("<2sBIdddH")
+GAP = struct.Struct("<dd")
+INT64 = struct.Struct("<q")
+
+Columns = Tuple[array, ...]
+Gap = Tuple[float, float]
+
+# ============================================
+# 정수 열 인코딩
+# ============================================
+
+def _pack_ints(values: List[int]) -> bytes:
+    """값 범위에 맞는 가장 작은 정수 배열로 직렬화 (타입 코드 1바이트 + 배열)"""
+    low = min(values, default=0)
+    high = max(values, default=0)
+    for typecode in ("b", "h", "i", "q"):
+        bits = array(typecode).itemsize * 8
+        if -(1 << (bits - 1)) <= low and high < (1 << (bits - 1)):
+            packed = array(typecode, values)
+            if sys.byteorder != "little":
+                packed.byteswap()
+            return typecode.encode("ascii") + packed.tobytes()
+    raise OverflowError("64비트 정수 범위를 넘는 값")
+
+
+def _unpack_ints(view: memoryview, offset: int, count: int) -> Tuple[array, int]:
+    typecode = chr(view[offset])
+    values = array(typecode)
+    end = offset + 1 + count * values.itemsize
+    values.frombytes(view[offset + 1:end])
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values, end
+
+
+def _quantize(column: array, scale: float) -> Optional[List[int]]:
+    """scale 단위 정수 목록 (되돌렸을 때 값이 하나라도 달라지면 None)"""
+    try:
+        ints = list(map(round, map(mul, column, repeat(float(scale)))))
+    except (OverflowError, ValueError):  # inf / nan
+        return None
+    if array("d", map(truediv, ints, repeat(float(scale)))) != column:
+        return None
+    return ints
+
+
+def _float_bits(column: array) -> array:
+    """float64 열을 같은 비트의 int64 열로 재해석"""
+    bits = array("q")
+    bits.frombytes(column.tobytes())
+    return bits
+
+# ============================================
+# 청크 인코딩 / 디코딩
+# ============================================
+
+def find_gaps(timestamps: array, interval: float) -> List[Gap]:
+    """간격이 공백 기준을 넘는 (직전 샘플, 다음 샘플) 타임스탬프 목록"""
+    threshold = gap_threshold(interval)
+    deltas = map(sub, timestamps[1:], timestamps[:-1])
+    return [(timestamps[i], timestamps[i + 1]) for i, delta in enumerate(deltas) if delta > threshold]
+
+
+def gap_threshold(interval: float) -> float:
+    return max(GAP_MIN_SECONDS, interval * GAP_FACTOR)
+
+
+def median_interval(timestamps: array) -> float:
+    if len(timestamps) < 2:
+        return 0.0
+    deltas = sorted(map(sub, timestamps[1:], timestamps[:-1]))
+    return deltas[len(deltas) // 2]
+
+
+def encode_chunk(columns: Columns) -> bytes:
+    """(timestamp, temperature, gas, dust) 열 배열 → 압축 청크"""
+    timestamps = columns[0]
+    count = len(timestamps)
+    interval = median_interval(timestamps)
+    gaps = find_gaps(timestamps, interval)
+
+    micros = list(map(round, map(mul, timestamps, repeat(float(TIMESTAMP_SCALE)))))
+    deltas = list(map(sub, micros[1:], micros[:-1]))
+    parts = [INT64.pack(micros[0]), INT64.pack(deltas[0] if deltas else 0),
+             _pack_ints(list(map(sub, deltas[1:], deltas[:-1])))]
+
+    for column in columns[1:]:
+        ints = _quantize(column, VALUE_SCALE)
+        if ints is not None:
+            try:
+                encoded = _pack_ints(list(map(sub, ints[1:], ints[:-1])))
+            except OverflowError:
+                ints = None
+        if ints is not None:
+            parts += [bytes((MODE_QUANTIZED,)), INT64.pack(ints[0]), encoded]
+        else:
+            bits = _float_bits(column)
+            parts += [bytes((MODE_XOR,)), INT64.pack(bits[0]),
+                      _pack_ints(list(map(xor, bits[1:], bits[:-1])))]
+
+    header = CHUNK_HEADER.pack(CHUNK_MAGIC, CHUNK_VERSION, count, timestamps[0], timestamps[-1],
+                               interval, len(gaps))
+    return b"".join([header] + [GAP.pack(*gap) for gap in gaps] + [zlib.compress(b"".join(parts))])
+
+
+def decode_chunk(payload: bytes) -> Columns:
+    """압축 청크 → (timestamp, temperature, gas, dust) 열 배열"""
+    magic, _, count, _, _, _, gap_count = CHUNK_HEADER.unpack_from(payload)
+    body = zlib.decompress(memoryview(payload)[CHUNK_HEADER.size + gap_count * GAP.size:])
+    view = memoryview(body)
+
+    (first,) = INT64.unpack_from(view, 0)
+    (first_delta,) = INT64.unpack_from(view, INT64.size)
+    dods, offset = _unpack_ints(view, 2 * INT64.size, max(0, count - 2))
+    micros = accumulate(accumulate(dods, initial=first_delta), initial=first) if count > 1 else [first]
+    columns = [array("d", map(truediv, micros, repeat(float(TIMESTAMP_SCALE))))]
+
+    for _ in METRICS:
+        mode = view[offset]
+        (first,) = INT64.unpack_from(view, offset + 1)
+        values, offset = _unpack_ints(view, offset + 1 + INT64.size, count - 1)
+        if mode == MODE_QUANTIZED:
+            columns.append(array("d", map(truediv, accumulate(values, initial=first), repeat(float(VALUE_SCALE)))))
+        else:
+            column = array("d")
+            column.frombytes(array("q", accumulate(values, xor, initial=first)).tobytes())
+            columns.append(column)
+    return tuple(columns)
+
+# ============================================
+# 청크
+# ============================================
+
+class ArchiveChunk:
+    """닫힌 청크 하나 (헤더 정보 + 압축 bytes, 바뀌지 않음)"""
+
+    __slots__ = ("start", "end", "count", "interval", "gaps", "payload")
+
+    def __init__(self, payload: bytes):
+        magic, version, count, start, end, interval, gap_count = CHUNK_HEADER.unpack_from(payload)
+        if magic != CHUNK_MAGIC or version != CHUNK_VERSION:
+            raise ValueError("지원하지 않는 청크 형식")
+        self.start = start
+        self.end = end
+        self.count = count
+        self.interval = interval
+        self.gaps = [GAP.unpack_from(payload, CHUNK_HEADER.size + i * GAP.size) for i in range(gap_count)]
+        self.payload = payload
+
+    @classmethod
+    def encode(cls, columns: Columns) -> "ArchiveChunk":
+        return cls(encode_chunk(columns))
+
+    def columns(self) -> Columns:
+        return decode_chunk(self.payload)
+
+# ============================================
+# 구역 압축 보관소
+# ============================================
+
+class ZoneArchive:
+    """
+    구역 하나의 닫힌 청크 목록 (시간순)
+    원본 링 버퍼에 추가된 행 수(pending)만 세다가 청크 조건이 되면 링 버퍼 끝부분을 복사해 압축
+    이벤트 루프 단일 스레드에서만 갱신 (청크 목록은 교체만 하므로 조회 중 복사본 순회는 안전)
+    """
+
+    def __init__(self, retention_seconds: float = ARCHIVE_RETENTION_SECONDS):
+        self.retention_seconds = retention_seconds
+        self.chunks: List[ArchiveChunk] = []
+        self.pending = 0  # 링 버퍼 끝에서 아직 청크로 닫지 않은 행 수
+
+    def __len__(self) -> int:
+        return sum(chunk.count for chunk in self.chunks)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(chunk.payload) for chunk in self.chunks)
+
+    @property
+    def first_timestamp(self) -> Optional[float]:
+        return self.chunks[0].start if self.chunks else None
+
+    @property
+    def last_timestamp(self) -> Optional[float]:
+        return self.chunks[-1].end if self.chunks else None
+
+    def resume(self, ring: TimeSeriesRing) -> None:
+        """재시작 후 마지막 청크 이후의 링 버퍼 행을 닫지 않은 행으로 설정"""
+        last = self.last_timestamp
+        self.pending = len(ring) - (ring.bisect_right(last) if last is not None else 0)
+
+    # --------------------------------------------
+    # 청크 닫기
+    # --------------------------------------------
+
+    def add(self, ring: TimeSeriesRing, added: int = 1) -> List[bytes]:
+        """
+        링 버퍼에 added행이 추가됨을 기록하고, 청크 조건(CHUNK_ROWS행 또는 CHUNK_SECONDS)이 되면 닫음
+        반환: 새로 닫은 청크의 압축 bytes (저장소 기록용)
+        """
+        self.pending = min(self.pending + added, len(ring))
+        if not self.pending:
+            return []
+        if self.pending < CHUNK_ROWS and \
+                ring.last_timestamp - ring.timestamp_at(len(ring) - self.pending) < CHUNK_SECONDS:
+            return []
+
+        closed = []
+        while self.pending:
+            lo = len(ring) - self.pending
+            hi = min(lo + CHUNK_ROWS, len(ring))
+            chunk = ArchiveChunk.encode(ring.columns(lo, hi))
+            self.chunks.append(chunk)
+            closed.append(chunk.payload)
+            self.pending -= hi - lo
+        self.expire(ring.last_timestamp - self.retention_seconds)
+        return closed
+
+    def insert(self, rows: List[Tuple[float, ...]]) -> List[bytes]:
+        """
+        이미 청크로 닫힌 구간에 늦게 온 (timestamp, temperature, gas, dust) 행 추가 (시간순)
+        행마다 시작 시각이 그 행 이전인 마지막 청크(없으면 첫 청크)에 병합해서 다시 압축
+        반환: 교체한 청크의 압축 bytes (저장소에 추가하면 복원 시 같은 구간의 이전 청크를 대신함)
+        """
+        if not self.chunks or not rows:
+            return []
+        starts = [chunk.start for chunk in self.chunks]
+        groups = {}
+        for row in rows:
+            groups.setdefault(max(0, bisect_right(starts, row[0]) - 1), []).append(row)
+
+        chunks = list(self.chunks)
+        replaced = []
+        for i, group in groups.items():
+            existing = list(zip(*chunks[i].columns()))
+            merged = sorted(existing + group, key=lambda row: row[0])  # 안정 정렬: 같은 시각이면 기존 행이 먼저
+            chunks[i] = ArchiveChunk.encode(tuple(array("d", column) for column in zip(*merged)))
+            replaced.append(chunks[i].payload)
+        self.chunks = chunks
+        return replaced
+
+    def restore(self, payload: bytes) -> None:
+        """
+        저장소에서 읽은 청크 추가
+        늦게 온 샘플로 교체된 청크는 이전 청크와 구간이 겹치므로 겹치는 청크를 지우고 시간순 위치에 넣음
+        """
+        chunk = ArchiveChunk(payload)
+        if not self.chunks or chunk.start > self.chunks[-1].end:
+            self.chunks.append(chunk)
+            return
+        lo = bisect_left([existing.end for existing in self.chunks], chunk.start)
+        hi = bisect_right([existing.start for existing in self.chunks], chunk.end)
+        self.chunks[lo:hi] = [chunk]
+
+    def expire(self, cutoff: float) -> int:
+        """끝 타임스탬프가 cutoff 이전인 청크 제거"""
+        keep = 0
+        while keep < len(self.chunks) and self.chunks[keep].end <= cutoff:
+            keep += 1
+        if keep:
+            self.chunks = self.chunks[keep:]
+        return keep
+
+    # --------------------------------------------
+    # 조회
+    # --------------------------------------------
+
+    def _overlapping(self, start: float, end: float) -> List[ArchiveChunk]:
+        chunks = self.chunks
+        lo = bisect_left([chunk.end for chunk in chunks], start)
+        hi = bisect_right([chunk.start for chunk in chunks], end)
+        return chunks[lo:hi]
+
+    def count(self, start: float, end: float) -> int:
+        """구간과 겹치는 청크의 행 수 합 (청크를 풀지 않으므로 상한값)"""
+        return sum(chunk.count for chunk in self._overlapping(start, end))
+
+    def iter_columns(self, start: float, end: float, before: float = float("inf")) -> Iterator[Columns]:
+        """[start, end] 구간이면서 before 미만인 행을 청크 단위로 풀어서 전달"""
+        for chunk in self._overlapping(start, min(end, before)):
+            columns = chunk.columns()
+            timestamps = columns[0]
+            lo = bisect_left(timestamps, start)
+            hi = min(bisect_right(timestamps, end), bisect_left(timestamps, before))
+            if lo < hi:
+                yield columns if lo == 0 and hi == len(timestamps) else tuple(c[lo:hi] for c in columns)
+
+    def columns(self, start: float, end: float, before: float = float("inf")) -> Columns:
+        return merge_columns(*self.iter_columns(start, end, before))
+
+    def gaps(self, start: float, end: float) -> List[Gap]:
+        """
+        구간 안의 공백 (청크 헤더에 기록된 공백 + 청크 사이 공백)
+        청크 사이 기준은 앞뒤 청크 중 큰 중앙값 간격
+        """
+        result = []
+        previous = None
+        for chunk in self._overlapping(start, end):
+            if previous is not None and \
+                    chunk.start - previous.end > gap_threshold(max(previous.interval, chunk.interval)):
+                result.append((previous.end, chunk.start))
+            result += chunk.gaps
+            previous = chunk
+        return [gap for gap in result if gap[1] >= start and gap[0] <= end]
+
+
+def merge_columns(*parts: Columns) -> Columns:
+    """시간순으로 나뉜 열 배열 이어 붙이기"""
+    parts = [part for part in parts if len(part[0])]
+    if len(parts) == 1:
+        return parts[0]
+    result = tuple(array("d") for _ in range(1 + len(METRICS)))
+    for part in parts:
+        for merged, column in zip(result, part):
+            merged.extend(column)
+    return result
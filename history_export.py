@@ -0,0 +1,219 @@
+"""
+PRISM 이력 내보내기 (스트리밍)
+- 구역별 링 버퍼를 EXPORT_CHUNK_ROWS 행씩 복사해서 바로 인코딩 → 메모리 사용량은 구간 길이와 무관
+- 청크 사이마다 이벤트 루프에 양보하므로 내보내는 동안에도 수신 처리 계속
+- 청크 사이에 새 행이 추가되거나 오래된 행이 만료되어도 마지막으로 보낸 타임스탬프 기준으로 이어서 읽음
+
+형식:
+  ndjson  : 한 줄에 한 행 {"zone": ..., "timestamp": ISO 8601, "temperature": ..., ...} (NaN/Infinity는 null)
+  csv     : 헤더 + 행 (zone,timestamp,temperature,...)
+  columns : 열 단위 바이너리 (application/vnd.prism.columns, 리틀 엔디안)
+            헤더: 매직 "PRISMCOL" | 버전(u8) | 열 수(u8) | 열 이름마다 길이(u8) + UTF-8
+            블록: 구역 길이(u8) | 구역(UTF-8) | 행 수(u32) | 열마다 float64 x 행 수 (timestamp는 epoch 초)
+            스트림 끝까지 블록 반복 (numpy.frombuffer(..., dtype="<f8")로 열을 바로 읽을 수 있음)
+
+원본 샘플은 원본 버퍼보다 오래된 구간을 압축 보관소(history_archive.py)에서 청크 단위로 풀어서 먼저 내보냄
+롤업 계층(bucket=60/600/3600)을 내보내면 count와 지표별 평균/_min/_max 열
+"""
+
+import asyncio
+import csv
+import io
+import json
+import math
+import struct
+import sys
+from array import array
+from datetime import datetime
+from typing import AsyncIterator, Callable, ContextManager, Iterable, Optional, Tuple
+
+from history_archive import ZoneArchive
+from history_store import METRICS, TimeSeriesRing
+
+EXPORT_CHUNK_ROWS = 4096  # 한 번에 복사/인코딩하는 행 수
+
+RAW_FIELDS = ("timestamp",) + METRICS
+ROLLUP_FIELDS = ("timestamp", "count") + tuple(
+    f"{name}{suffix}" for name in METRICS for suffix in ("", "_min", "_max")
+)
+
+COLUMNS_CONTENT_TYPE = "application/vnd.prism.columns"
+COLUMNS_MAGIC = b"PRISMCOL"
+COLUMNS_VERSION = 1
+
+Columns = Tuple[array, ...]
+
+# ============================================
+# 읽기 위치
+# ============================================
+
+class ExportCursor:
+    """
+    구역 하나의 읽기 위치
+    논리 인덱스는 만료/덮어쓰기로 바뀌므로 (마지막 타임스탬프, 그 타임스탬프로 이미 보낸 행 수)로 기억
+    """
+
+    __slots__ = ("start_ts", "end_ts", "last_ts", "sent_at_last")
+
+    def __init__(self, start_ts: float, end_ts: float):
+        self.start_ts = start_ts
+        self.end_ts = end_ts
+        self.last_ts: Optional[float] = None
+        self.sent_at_last = 0
+
+    def next_chunk(self, ring: TimeSeriesRing, limit: int) -> Optional[Columns]:
+        if self.last_ts is None:
+            lo = ring.bisect_left(self.start_ts)
+        else:
+            lo = ring.bisect_left(self.last_ts) + self.sent_at_last
+        hi = min(ring.bisect_right(self.end_ts), lo + limit)
+        if lo >= hi:
+            return None
+        columns = ring.columns(lo, hi)
+        timestamps = columns[0]
+        last = timestamps[-1]
+        same = 1
+        while same < len(timestamps) and timestamps[-1 - same] == last:
+            same += 1
+        if last == self.last_ts:
+            self.sent_at_last += same
+        else:
+            self.last_ts = last
+            self.sent_at_last = same
+        return columns
+
+
+def rollup_columns(columns: Columns) -> Columns:
+    """롤업 행(버킷 시작, count, 지표별 sum/min/max)을 ROLLUP_FIELDS 순서(평균 포함)로 변환"""
+    counts = columns[1]
+    result = [columns[0], counts]
+    for m in range(len(METRICS)):
+        sums = columns[2 + 3 * m]
+        result.append(array("d", [total / count for total, count in zip(sums, counts)]))
+        result.append(columns[3 + 3 * m])
+        result.append(columns[4 + 3 * m])
+    return tuple(result)
+
+# ============================================
+# 인코더
+# ============================================
+
+class ExportEncoder:
+    """내보내기 포맷 공통 부분: 필드 목록(timestamp 먼저)과 헤더/청크 인코딩"""
+    media_type = "application/octet-stream"
+    extension = "bin"
+
+    def __init__(self, fields: Tuple[str, ...]):
+        self.fields = fields
+
+    def header(self) -> bytes:
+        return b""
+
+    def encode(self, zone: str, columns: Columns) -> bytes:
+        raise NotImplementedError
+
+
+class NdjsonEncoder(ExportEncoder):
+    media_type = "application/x-ndjson"
+    extension = "ndjson"
+
+    def encode(self, zone: str, columns: Columns) -> bytes:
+        names = self.fields[1:]
+        lines = []
+        for row in zip(*columns):
+            record = {"zone": zone, "timestamp": datetime.fromtimestamp(row[0]).isoformat()}
+            # NaN/Infinity는 JSON이 아니므로 null로 기록
+            record.update((name, value if math.isfinite(value) else None) for name, value in zip(names, row[1:]))
+            lines.append(json.dumps(record, ensure_ascii=False, allow_nan=False))
+        lines.append("")
+        return "\n".join(lines).encode("utf-8")
+
+
+class CsvEncoder(ExportEncoder):
+    media_type = "text/csv; charset=utf-8"
+    extension = "csv"
+
+    def header(self) -> bytes:
+        return self._rows([("zone",) + self.fields])
+
+    def encode(self, zone: str, columns: Columns) -> bytes:
+        return self._rows(
+            (zone, datetime.fromtimestamp(row[0]).isoformat()) + row[1:] for row in zip(*columns)
+        )
+
+    def _rows(self, rows: Iterable[tuple]) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(rows)
+        return buffer.getvalue().encode("utf-8")
+
+
+class ColumnsEncoder(ExportEncoder):
+    media_type = COLUMNS_CONTENT_TYPE
+    extension = "prismcol"
+
+    def header(self) -> bytes:
+        parts = [COLUMNS_MAGIC, struct.pack("<BB", COLUMNS_VERSION, len(self.fields))]
+        for name in self.fields:
+            encoded = name.encode("utf-8")
+            parts += [struct.pack("<B", len(encoded)), encoded]
+        return b"".join(parts)
+
+    def encode(self, zone: str, columns: Columns) -> bytes:
+        encoded = zone.encode("utf-8")[:255]
+        parts = [struct.pack("<B", len(encoded)), encoded, struct.pack("<I", len(columns[0]))]
+        for column in columns:
+            if sys.byteorder != "little":
+                column = array("d", column)
+                column.byteswap()
+            parts.append(column.tobytes())
+        return b"".join(parts)
+
+
+ENCODERS = {"ndjson": NdjsonEncoder, "csv": CsvEncoder, "columns": ColumnsEncoder}
+
+# ============================================
+# 스트리밍
+# ============================================
+
+ArchiveSource = Optional[Callable[[], Optional[ZoneArchive]]]
+
+
+async def stream_export(sources: Iterable[Tuple[str, Callable[[], Optional[TimeSeriesRing]], ArchiveSource]],
+                        encoder, start_ts: float, end_ts: float, rollup: bool,
+                        lock: Callable[[], ContextManager],
+                        chunk_rows: int = EXPORT_CHUNK_ROWS) -> AsyncIterator[bytes]:
+    """
+    (구역, 링 버퍼를 돌려주는 함수, 압축 보관소를 돌려주는 함수 또는 None) 순서대로
+    [start_ts, end_ts] 구간을 청크 단위로 인코딩
+    복사는 lock() 안에서, 인코딩/전송은 잠금 밖에서 처리 (압축 청크는 바뀌지 않으므로 잠금 없이 풂)
+    압축 보관소를 내보내는 동안 원본 버퍼에서 만료된 행은 원본 버퍼 첫 행 시각을 다시 확인해서 이어서 내보냄
+    """
+    yield encoder.header()
+    for zone, get_ring, get_archive in sources:
+        cursor = ExportCursor(start_ts, end_ts)
+        while True:
+            with lock():
+                ring = get_ring()
+                before = ring.first_timestamp if ring is not None and len(ring) else math.inf
+                archive = get_archive() if get_archive is not None and cursor.last_ts is None else None
+                archived = archive is not None and before > cursor.start_ts
+                if not archived:
+                    columns = cursor.next_chunk(ring, chunk_rows) if ring is not None else None
+            if archived:
+                # 원본 버퍼 이전 구간 [cursor.start_ts, before)를 압축 보관소에서 내보낸 뒤 원본 버퍼 쪽 시작 시각을 옮김
+                last = None
+                for columns in archive.iter_columns(cursor.start_ts, end_ts, before):
+                    last = columns[0][-1]
+                    yield encoder.encode(zone, columns)
+                    await asyncio.sleep(0)
+                if before == math.inf:
+                    # 원본 버퍼가 비어 있음: 내보낸 마지막 행 이후부터 다시 확인 (없으면 끝)
+                    before = math.nextafter(last, math.inf) if last is not None else math.inf
+                cursor.start_ts = before
+                continue
+            if columns is None:
+                break
+            if rollup:
+                columns = rollup_columns(columns)
+            yield encoder.encode(zone, columns)
+            await asyncio.sleep(0)  # 청크마다 수신 처리에 양보
@@ -0,0 +1,463 @@
+"""
+PRISM 센서 히스토리 저장소
+구역별 시계열 데이터를 병렬 배열 기반 링 버퍼에 보관
+"""
+
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# ============================================
+# 설정
+# ============================================
+
+HISTORY_RETENTION_SECONDS = 24 * 60 * 60  # 최근 24시간 데이터만 유지
+INITIAL_CAPACITY = 256                     # 구역별 초기 버퍼 크기
+MAX_CAPACITY = 24 * 60 * 60                # 1Hz 기준 24시간 (구역당 약 2.7MB)
+
+# 롤업 계층: (버킷 크기 초, 보존 기간 초)
+ROLLUP_TIERS = (
+    (60, 3 * 24 * 60 * 60),         # 1분 버킷, 3일
+    (600, 30 * 24 * 60 * 60),       # 10분 버킷, 30일
+    (3600, 180 * 24 * 60 * 60),     # 1시간 버킷, 180일
+)
+
+METRICS = ("temperature", "gas", "dust")
+
+# ============================================
+# 시계열 링 버퍼
+# ============================================
+
+class TimeSeriesRing:
+    """
+    시간순으로 정렬된 병렬 array('d') 링 버퍼 (0번 열 = 타임스탬프, epoch 초)
+    - 추가: 분할상환 O(1) (가득 차면 2배 확장, 최대 용량에서는 가장 오래된 행을 덮어씀)
+    - 늦게 온 행: 들어갈 위치 뒤쪽 행만 복사해서 다시 붙이므로 뒤쪽 행 수에 비례
+    - 만료: 헤드 포인터만 이동하므로 O(1)
+    - 구간 조회: 이진 탐색으로 경계를 찾고 해당 구간만 복사
+    """
+
+    __slots__ = ("retention_seconds", "max_capacity", "_capacity", "_head", "_size", "_columns")
+
+    def __init__(self, width: int, retention_seconds: float, max_capacity: int):
+        self.retention_seconds = retention_seconds
+        self.max_capacity = max_capacity
+        self._capacity = min(INITIAL_CAPACITY, max_capacity)
+        self._head = 0
+        self._size = 0
+        self._columns = [array("d", bytes(8 * self._capacity)) for _ in range(width)]
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def width(self) -> int:
+        """열 개수 (타임스탬프 포함)"""
+        return len(self._columns)
+
+    @property
+    def nbytes(self) -> int:
+        """버퍼가 차지하는 메모리 (바이트)"""
+        return len(self._columns) * 8 * self._capacity
+
+    @property
+    def first_timestamp(self) -> float:
+        if self._size == 0:
+            return 0.0
+        return self._columns[0][self._head]
+
+    @property
+    def last_timestamp(self) -> float:
+        if self._size == 0:
+            return 0.0
+        return self._columns[0][(self._head + self._size - 1) % self._capacity]
+
+    def append_row(self, row: Tuple[float, ...]) -> None:
+        """
+        행 추가 후 보존 기간이 지난 행을 헤드에서 제거
+        마지막 행보다 이전 시각이면 시간순 위치에 끼워 넣음 (insert_rows)
+        """
+        ts = row[0]
+        if self._size and ts < self.last_timestamp:
+            self.insert_rows([row])
+            return
+
+        if self._size == self._capacity:
+            if self._capacity < self.max_capacity:
+                self._grow()
+            else:
+                # 최대 용량 도달: 가장 오래된 행 덮어쓰기
+                self._head = (self._head + 1) % self._capacity
+                self._size -= 1
+
+        idx = (self._head + self._size) % self._capacity
+        columns = self._columns
+        columns[0][idx] = ts
+        for c in range(1, len(columns)):
+            columns[c][idx] = row[c]
+        self._size += 1
+
+        self.expire(ts - self.retention_seconds)
+
+    def insert_rows(self, rows: List[Tuple[float, ...]]) -> None:
+        """
+        시간순으로 정렬된 행 여러 개를 순서에 맞게 추가
+        첫 행보다 뒤쪽 행만 잘라 두었다가 새 행과 병합해서 다시 붙임 (같은 시각이면 기존 행이 먼저)
+        """
+        if not rows:
+            return
+        lo = self.bisect_right(rows[0][0])
+        tail = list(zip(*self.columns(lo))) if lo < self._size else []
+        self._size = lo
+        if lo == 0:
+            self._head = 0
+        i = j = 0
+        while i < len(tail) or j < len(rows):
+            if j == len(rows) or (i < len(tail) and tail[i][0] <= rows[j][0]):
+                self.append_row(tail[i])
+                i += 1
+            else:
+                self.append_row(rows[j])
+                j += 1
+
+    def expire(self, cutoff: float) -> int:
+        """
+        cutoff 이전(이하) 행을 헤드에서 제거
+        행마다 최대 한 번만 제거되므로 추가 1회당 분할상환 O(1)
+        """
+        removed = 0
+        ts = self._columns[0]
+        capacity = self._capacity
+        while self._size and ts[self._head] <= cutoff:
+            self._head = (self._head + 1) % capacity
+            self._size -= 1
+            removed += 1
+        if self._size == 0:
+            self._head = 0
+        return removed
+
+    def timestamp_at(self, i: int) -> float:
+        """논리 인덱스 i(0 = 가장 오래된 행)의 타임스탬프"""
+        return self._columns[0][(self._head + i) % self._capacity]
+
+    def bisect_left(self, ts: float) -> int:
+        """ts 이상인 첫 행의 논리 인덱스 (이진 탐색, O(log n))"""
+        lo, hi = 0, self._size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.timestamp_at(mid) < ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def bisect_right(self, ts: float) -> int:
+        """ts 초과인 첫 행의 논리 인덱스 (이진 탐색, O(log n))"""
+        lo, hi = 0, self._size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.timestamp_at(mid) <= ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def locate(self, start: Optional[float] = None, end: Optional[float] = None) -> Tuple[int, int]:
+        """[start, end] 구간에 해당하는 논리 인덱스 범위 [lo, hi)"""
+        lo = 0 if start is None else self.bisect_left(start)
+        hi = self._size if end is None else self.bisect_right(end)
+        return lo, max(lo, hi)
+
+    def columns(self, lo: int = 0, hi: Optional[int] = None) -> Tuple[array, ...]:
+        """
+        논리 인덱스 [lo, hi) 구간의 열별 배열 복사본
+        결과 크기에 비례하는 비용만 발생
+        """
+        if hi is None or hi > self._size:
+            hi = self._size
+        lo = max(0, min(lo, hi))
+        return tuple(self._slice(column, lo, hi) for column in self._columns)
+
+    def restore(self, columns: List[array]) -> None:
+        """
+        columns()로 복사한 열 배열로 버퍼 내용을 교체 (체크포인트 복원용)
+        최대 용량을 넘으면 가장 최근 행만 유지
+        """
+        size = len(columns[0])
+        if size > self.max_capacity:
+            columns = [column[size - self.max_capacity:] for column in columns]
+            size = self.max_capacity
+        capacity = max(min(INITIAL_CAPACITY, self.max_capacity), size)
+        padding = array("d", bytes(8 * (capacity - size)))
+        self._columns = [column + padding for column in columns]
+        self._capacity = capacity
+        self._head = 0
+        self._size = size
+
+    def _grow(self) -> None:
+        """용량을 2배로 늘리면서 논리 순서대로 재배치 (헤드 = 0)"""
+        new_capacity = min(self._capacity * 2, self.max_capacity)
+        padding = array("d", bytes(8 * (new_capacity - self._size)))
+        self._columns = [self._slice(column, 0, self._size) + padding for column in self._columns]
+        self._head = 0
+        self._capacity = new_capacity
+
+    def _slice(self, column: array, lo: int, hi: int) -> array:
+        start = (self._head + lo) % self._capacity if self._capacity else 0
+        end = start + (hi - lo)
+        if end <= self._capacity:
+            return column[start:end]
+        return column[start:] + column[:end - self._capacity]
+
+
+class ZoneHistory(TimeSeriesRing):
+    """
+    구역 하나의 원본 샘플 링 버퍼
+    (timestamp, temperature, gas, dust) 병렬 배열, 샘플당 32바이트
+    """
+
+    __slots__ = ()
+
+    def __init__(self, retention_seconds: float = HISTORY_RETENTION_SECONDS,
+                 max_capacity: int = MAX_CAPACITY):
+        super().__init__(1 + len(METRICS), retention_seconds, max_capacity)
+
+    def append(self, ts: float, temperature: float, gas: float, dust: float) -> None:
+        self.append_row((ts, temperature, gas, dust))
+
+    def iter_samples(self) -> Iterator[Tuple[float, float, float, float]]:
+        """오래된 순서로 (timestamp, temperature, gas, dust) 반환"""
+        ts, temperature, gas, dust = self._columns
+        capacity = self._capacity
+        for i in range(self._size):
+            idx = (self._head + i) % capacity
+            yield ts[idx], temperature[idx], gas[idx], dust[idx]
+
+# ============================================
+# 다중 해상도 롤업
+# ============================================
+
+class RollupTier(TimeSeriesRing):
+    """
+    고정 크기 버킷 단위 집계 링 버퍼
+    행 = (버킷 시작 시각, count, 지표별 sum/min/max), 샘플 추가 시 마지막 행을 제자리 갱신
+    """
+
+    __slots__ = ("bucket_seconds",)
+
+    def __init__(self, bucket_seconds: int, retention_seconds: float):
+        self.bucket_seconds = bucket_seconds
+        super().__init__(2 + 3 * len(METRICS), retention_seconds,
+                         int(retention_seconds // bucket_seconds) + 1)
+
+    def add(self, ts: float, temperature: float, gas: float, dust: float) -> None:
+        bucket_start = (ts // self.bucket_seconds) * self.bucket_seconds
+        if self._size and bucket_start <= self.last_timestamp:
+            # 현재 버킷 갱신, 늦게 온 샘플은 해당 시각의 버킷에 합산 (버킷이 없으면 순서에 맞게 추가)
+            i = self._size - 1 if bucket_start == self.last_timestamp else self.bisect_left(bucket_start)
+            if self.timestamp_at(i) == bucket_start:
+                self._merge(i, (temperature, gas, dust))
+                return
+            if bucket_start <= self.last_timestamp - self.retention_seconds:
+                return  # 보존 기간이 지난 버킷
+
+        self.append_row((bucket_start, 1.0,
+                         temperature, temperature, temperature,
+                         gas, gas, gas,
+                         dust, dust, dust))
+
+    def _merge(self, i: int, values: Tuple[float, float, float]) -> None:
+        """논리 인덱스 i 버킷에 샘플 하나 합산"""
+        idx = (self._head + i) % self._capacity
+        columns = self._columns
+        columns[1][idx] += 1
+        for m, value in enumerate(values):
+            c = 2 + 3 * m
+            columns[c][idx] += value
+            if value < columns[c + 1][idx]:
+                columns[c + 1][idx] = value
+            if value > columns[c + 2][idx]:
+                columns[c + 2][idx] = value
+
+    def aggregate(self, lo: int, hi: int, bucket_seconds: float) -> List[Dict]:
+        """
+        [lo, hi) 구간의 행을 bucket_seconds(이 계층 버킷의 배수) 단위로 병합
+        aggregate_buckets()와 같은 형식의 레코드 반환
+        """
+        columns = self.columns(lo, hi)
+        timestamps, counts = columns[0], columns[1]
+        buckets: List[Dict] = []
+        record = None
+        current_key = None
+        for i in range(len(timestamps)):
+            key = int(timestamps[i] // bucket_seconds)
+            if key != current_key:
+                if record is not None:
+                    buckets.append(_finish_record(record))
+                current_key = key
+                record = {"timestamp": key * bucket_seconds, "count": 0}
+                for m, name in enumerate(METRICS):
+                    record[name] = 0.0
+                    record[f"{name}_min"] = columns[3 + 3 * m][i]
+                    record[f"{name}_max"] = columns[4 + 3 * m][i]
+            record["count"] += counts[i]
+            for m, name in enumerate(METRICS):
+                c = 2 + 3 * m
+                record[name] += columns[c][i]
+                if columns[c + 1][i] < record[f"{name}_min"]:
+                    record[f"{name}_min"] = columns[c + 1][i]
+                if columns[c + 2][i] > record[f"{name}_max"]:
+                    record[f"{name}_max"] = columns[c + 2][i]
+        if record is not None:
+            buckets.append(_finish_record(record))
+        return buckets
+
+
+def _finish_record(record: Dict) -> Dict:
+    """합계를 평균으로 바꾸고 count를 정수로 변환"""
+    count = record["count"]
+    record["count"] = int(count)
+    for name in METRICS:
+        record[name] /= count
+    return record
+
+
+class ZoneRollups:
+    """
+    구역 하나의 롤업 계층 묶음 (세밀한 계층 → 거친 계층 순)
+    원본 샘플은 24시간만 유지하고 장기 조회는 롤업 계층에서 처리
+    """
+
+    __slots__ = ("tiers",)
+
+    def __init__(self, tiers: Tuple[Tuple[int, float], ...] = None):
+        self.tiers = [RollupTier(bucket, retention) for bucket, retention in (tiers or ROLLUP_TIERS)]
+
+    def add(self, ts: float, temperature: float, gas: float, dust: float) -> None:
+        for tier in self.tiers:
+            tier.add(ts, temperature, gas, dust)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(tier.nbytes for tier in self.tiers)
+
+    def select(self, resolution: float, exact: bool = False) -> Optional[RollupTier]:
+        """
+        요청 해상도(초)를 만족하는 가장 거친 계층 (없으면 None → 원본 사용)
+        exact=True면 해상도가 계층 버킷의 배수인 경우만 선택
+        """
+        for tier in reversed(self.tiers):
+            if tier.bucket_seconds > resolution or len(tier) == 0:
+                continue
+            if exact and resolution % tier.bucket_seconds:
+                continue
+            return tier
+        return None
+
+# ============================================
+# 다운샘플링
+# ============================================
+
+def aggregate_buckets(columns: Tuple[array, array, array, array],
+                      bucket_seconds: float) -> List[Dict]:
+    """
+    (timestamp, temperature, gas, dust) 배열을 고정 크기 시간 버킷으로 집계
+    버킷 경계는 epoch 기준으로 정렬되어 호출 시점과 무관하게 일정함
+    버킷마다 count와 지표별 평균(min/max 포함)을 반환
+    """
+    timestamps, temperatures, gases, dusts = columns
+    buckets: List[Dict] = []
+    current_key = None
+    count = 0
+    sums = mins = maxs = None
+
+    def flush():
+        record = {"timestamp": current_key * bucket_seconds, "count": count}
+        for m, name in enumerate(METRICS):
+            record[name] = sums[m] / count
+            record[f"{name}_min"] = mins[m]
+            record[f"{name}_max"] = maxs[m]
+        buckets.append(record)
+
+    for ts, temperature, gas, dust in zip(timestamps, temperatures, gases, dusts):
+        key = int(ts // bucket_seconds)
+        if key != current_key:
+            if count:
+                flush()
+            current_key = key
+            count = 0
+            sums = [0.0, 0.0, 0.0]
+            mins = [temperature, gas, dust]
+            maxs = [temperature, gas, dust]
+        count += 1
+        for m, value in enumerate((temperature, gas, dust)):
+            sums[m] += value
+            if value < mins[m]:
+                mins[m] = value
+            elif value > maxs[m]:
+                maxs[m] = value
+
+    if count:
+        flush()
+    return buckets
+
+
+def lttb_indices(columns: Tuple[array, array, array, array], threshold: int) -> List[int]:
+    """
+    LTTB(Largest-Triangle-Three-Buckets) 다운샘플링
+    세 지표를 각 구간의 범위로 정규화한 뒤 삼각형 면적의 합이 가장 큰 샘플을 선택하므로
+    모든 지표가 같은 타임스탬프를 공유함 (첫/마지막 샘플은 항상 포함)
+    """
+    timestamps = columns[0]
+    n = len(timestamps)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    span = (timestamps[-1] - timestamps[0]) or 1.0
+    series = []
+    for column in columns[1:]:
+        low, high = min(column), max(column)
+        series.append((column, low, (high - low) or 1.0))
+
+    def point(i):
+        return ((timestamps[i] - timestamps[0]) / span,
+                [(column[i] - low) / scale for column, low, scale in series])
+
+    selected = [0]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for b in range(threshold - 2):
+        start = int(b * every) + 1
+        stop = int((b + 1) * every) + 1
+
+        # 다음 버킷의 평균점
+        next_start = stop
+        next_stop = min(int((b + 2) * every) + 1, n)
+        next_len = next_stop - next_start
+        avg_t = 0.0
+        avg_y = [0.0] * len(series)
+        for j in range(next_start, next_stop):
+            t, ys = point(j)
+            avg_t += t
+            for m, y in enumerate(ys):
+                avg_y[m] += y
+        avg_t /= next_len
+        avg_y = [y / next_len for y in avg_y]
+
+        ta, ya = point(a)
+        best, best_area = start, -1.0
+        for j in range(start, stop):
+            tb, yb = point(j)
+            area = 0.0
+            for m in range(len(series)):
+                area += abs((ta - avg_t) * (yb[m] - ya[m]) - (ta - tb) * (avg_y[m] - ya[m]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+
+    selected.append(n - 1)
+    return selected
@@ -0,0 +1,98 @@
+"""
+PRISM 실시간 업데이트 (Server-Sent Events)
+센서 데이터 수신/경고 발생 시 구독 중인 대시보드로 즉시 전달
+"""
+
+import asyncio
+import json
+from typing import AsyncIterator, Dict, Optional, Set
+
+# ============================================
+# 설정
+# ============================================
+
+SUBSCRIBER_QUEUE_SIZE = 100  # 구독자별 대기 이벤트 수 (느린 클라이언트는 오래된 이벤트부터 버림)
+KEEPALIVE_INTERVAL = 15      # 이벤트가 없을 때 연결 유지용 주석 전송 주기 (초)
+
+# ============================================
+# 구독 관리
+# ============================================
+
+class Subscription:
+    """클라이언트 하나의 구독 (구역 목록 + 이벤트 큐)"""
+
+    __slots__ = ("zones", "queue", "dropped")
+
+    def __init__(self, zones: Optional[Set[str]]):
+        self.zones = zones  # None이면 모든 구역
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = 0
+
+    def push(self, frame: bytes) -> None:
+        """큐가 가득 차면 가장 오래된 이벤트를 버림 (발행자는 절대 대기하지 않음)"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(frame)
+
+
+class LiveHub:
+    """
+    구역별 구독자 목록을 관리하고 이벤트를 팬아웃
+    이벤트는 SSE 프레임으로 한 번만 직렬화한 뒤 같은 bytes 객체를 각 구독자 큐에 넣음
+    """
+
+    def __init__(self):
+        self._by_zone: Dict[str, Set[Subscription]] = {}
+        self._all_zones: Set[Subscription] = set()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._all_zones) + len({s for subs in self._by_zone.values() for s in subs})
+
+    def subscribe(self, zones: Optional[Set[str]] = None) -> Subscription:
+        subscription = Subscription(zones)
+        if zones is None:
+            self._all_zones.add(subscription)
+        else:
+            for zone in zones:
+                self._by_zone.setdefault(zone, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        if subscription.zones is None:
+            self._all_zones.discard(subscription)
+            return
+        for zone in subscription.zones:
+            subscribers = self._by_zone.get(zone)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._by_zone[zone]
+
+    def has_subscribers(self, zone: str) -> bool:
+        return bool(self._all_zones) or zone in self._by_zone
+
+    def publish(self, zone: str, event: str, data: Dict) -> None:
+        """구독자가 없으면 직렬화도 하지 않음"""
+        if not self.has_subscribers(zone):
+            return
+        frame = format_event(event, data)
+        for subscription in self._by_zone.get(zone, ()):
+            subscription.push(frame)
+        for subscription in self._all_zones:
+            subscription.push(frame)
+
+    async def stream(self, subscription: Subscription) -> AsyncIterator[bytes]:
+        """구독 큐의 이벤트를 순서대로 반환 (이벤트가 없으면 keep-alive 주석)"""
+        while True:
+            try:
+                yield await asyncio.wait_for(subscription.queue.get(), timeout=KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+
+
+def format_event(event: str, data: Dict) -> bytes:
+    """SSE 프레임 생성"""
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return f"event: {event}\ndata: {payload}\n\n".encode("utf-8")
@@ -0,0 +1,199 @@
+"""
+PRISM 서버 메트릭 (Prometheus 텍스트 형식)
+- 수신/조회 경로에서는 dict 값 증가만 수행 (락 없음, 이벤트 루프 단일 스레드에서 갱신)
+- 저장소 크기/큐 길이/장치 수처럼 상태에서 바로 알 수 있는 값은 /metrics 요청 시에만 계산
+"""
+
+import bisect
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 요청 처리 시간 버킷 (초)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+Labels = Tuple[str, ...]
+
+# ============================================
+# 메트릭 종류
+# ============================================
+
+class Counter:
+    """레이블 값 튜플별 누적 카운터"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> Iterable[Tuple[str, Labels, float]]:
+        for labels, value in self.values.items():
+            yield self.name, labels, value
+
+
+class Gauge(Counter):
+    """현재 값 (set 또는 수집 시 콜백으로 계산)"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = (),
+                 collect: Optional[Callable[[], Iterable[Tuple[Labels, float]]]] = None):
+        super().__init__(name, help_text, label_names)
+        self.collect = collect
+
+    def set(self, labels: Labels, value: float) -> None:
+        self.values[labels] = value
+
+    def samples(self) -> Iterable[Tuple[str, Labels, float]]:
+        if self.collect is not None:
+            self.values = dict(self.collect())
+        return super().samples()
+
+
+class Histogram:
+    """고정 버킷 히스토그램 (버킷별 개수는 누적하지 않고 저장, 출력 시 누적)"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self.values: Dict[Labels, List[float]] = {}  # [버킷별 개수..., +Inf 개수, 합계]
+
+    def observe(self, labels: Labels, value: float) -> None:
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self) -> Iterable[Tuple[str, Labels, float]]:
+        for labels, series in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f"{self.name}_bucket", labels + (_format_value(bound),), cumulative
+            cumulative += series[len(self.buckets)]
+            yield f"{self.name}_bucket", labels + ("+Inf",), cumulative
+            yield f"{self.name}_sum", labels, series[-1]
+            yield f"{self.name}_count", labels, cumulative
+
+# ============================================
+# 레지스트리
+# ============================================
+
+class Registry:
+    def __init__(self):
+        self.metrics: List = []
+
+    def counter(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, label_names))
+
+    def gauge(self, name: str, help_text: str, label_names: Tuple[str, ...] = (),
+              collect: Optional[Callable[[], Iterable[Tuple[Labels, float]]]] = None) -> Gauge:
+        return self._register(Gauge(name, help_text, label_names, collect))
+
+    def histogram(self, name: str, help_text: str, label_names: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, label_names, buckets))
+
+    def _register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheus 텍스트 형식으로 출력"""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            names = metric.label_names + (("le",) if metric.kind == "histogram" else ())
+            for sample_name, labels, value in metric.samples():
+                label_names = names if len(labels) == len(names) else metric.label_names
+                if labels:
+                    pairs = ",".join(f'{key}="{_escape(val)}"' for key, val in zip(label_names, labels))
+                    lines.append(f"{sample_name}{{{pairs}}} {_format_value(value)}")
+                else:
+                    lines.append(f"{sample_name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+# ============================================
+# 요청 처리 시간 측정 (ASGI 미들웨어)
+# ============================================
+
+class RequestMetricsMiddleware:
+    """
+    라우트 템플릿(/api/history/{zone})별 요청 수와 응답 시작까지 걸린 시간 기록
+    SSE처럼 오래 열려 있는 응답도 응답 시작 시점 기준으로 측정
+    """
+
+    def __init__(self, app, requests_total: Counter, latency: Histogram):
+        self.app = app
+        self.requests_total = requests_total
+        self.latency = latency
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status, started
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                self._record(scope, status, time.perf_counter() - started)
+                started = None
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if started is not None:
+                self._record(scope, status, time.perf_counter() - started)
+
+    def _record(self, scope, status: int, elapsed: float) -> None:
+        route = scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        self.requests_total.inc((scope["method"], path, str(status)))
+        self.latency.observe((scope["method"], path), elapsed)
+
+# ============================================
+# 프로세스 메모리
+# ============================================
+
+def resident_memory_bytes() -> float:
+    """현재 RSS (리눅스는 /proc, 그 외 유닉스는 최대 RSS, 윈도우는 0)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
@@ -6,6 +6,7 @@ const CONFIG = {
     UPDATE_INTERVAL: 5000, // 5초마다 업데이트
     CHART_UPDATE_INTERVAL: 30000, // 30초마다 차트 업데이트
     EVENT_UPDATE_INTERVAL: 60000, // 1분마다 이벤트 업데이트
+    HISTORY_POINTS: 200, // 과거 데이터 차트 최대 포인트 수
 };
 
 // Global State
@@ -24,6 +25,7 @@ let historicalDataCache = {}; // 과거 데이터 캐시 (날짜별로 저장)
 let updateInterval = null;
 let chartUpdateInterval = null;
 let eventUpdateInterval = null; // 이벤트 업데이트 인터벌
+let eventSource = null; // 실시간 업데이트 스트림 (SSE)
 let isConnected = false; // 센서 연결 상태
 let lastUpdateTime = null;
 let previousSensorData = {}; // 이전 센서 데이터 (임계값 체크용)
@@ -80,6 +82,41 @@ function startDataUpdates() {
     updateInterval = setInterval(fetchSensorData, CONFIG.UPDATE_INTERVAL);
     // 차트는 덜 자주 업데이트 (30초)
     chartUpdateInterval = setInterval(loadHistoricalData, CONFIG.CHART_UPDATE_INTERVAL);
+    
+    // 실시간 스트림 연결 (연결되면 센서 폴링 중지)
+    connectLiveUpdates();
+}
+
+// 실시간 업데이트 (Server-Sent Events)
+function connectLiveUpdates() {
+    if (!window.EventSource) return; // 미지원 브라우저는 폴링 유지
+    if (eventSource) eventSource.close();
+    
+    eventSource = new EventSource(`${CONFIG.API_BASE_URL}/api/stream?zones=${currentZone}`);
+    
+    eventSource.onopen = () => {
+        // 스트림으로 데이터를 받으므로 센서 폴링 중지
+        if (updateInterval) {
+            clearInterval(updateInterval);
+            updateInterval = null;
+        }
+    };
+    
+    eventSource.addEventListener('sensor', (event) => {
+        const data = JSON.parse(event.data);
+        if (data.zone !== currentZone) return;
+        isConnected = true;
+        lastUpdateTime = new Date();
+        updateSensorData(data);
+        updateConnectionStatus(true);
+    });
+    
+    eventSource.onerror = () => {
+        // 연결이 끊기면 재연결될 때까지 폴링으로 대체 (EventSource가 자동 재연결)
+        if (!updateInterval) {
+            updateInterval = setInterval(fetchSensorData, CONFIG.UPDATE_INTERVAL);
+        }
+    };
 }
 
 async function fetchSensorData() {
@@ -375,8 +412,8 @@ async function loadHistoricalData() {
             return;
         }
         
-        // 주간 데이터 요청 (7일)
-        const response = await fetch(`${CONFIG.API_BASE_URL}/api/history/${currentZone}?days=7`);
+        // 주간 데이터 요청 (7일, 차트 폭에 맞춰 서버에서 다운샘플링)
+        const response = await fetch(`${CONFIG.API_BASE_URL}/api/history/${currentZone}?days=7&points=${CONFIG.HISTORY_POINTS}`);
         
         if (!response.ok) {
             throw new Error('과거 데이터를 가져올 수 없습니다');
@@ -711,6 +748,7 @@ function selectZone(zone) {
     
     // 새로운 구역 데이터 가져오기
     fetchSensorData();
+    connectLiveUpdates();
 }
 
 function showPopup(popupId) {
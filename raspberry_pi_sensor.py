@@ -4,12 +4,22 @@ SSH를 통한 원격 관리 지원
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import json
 import os
+import queue
+import random
 import socket
+import threading
 from datetime import datetime
 
+try:
+    # 바이너리 전송 포맷 (sensor_codec.py를 같은 폴더에 복사한 경우 사용 가능)
+    from sensor_codec import PRISM_CONTENT_TYPE, encode_samples
+except ImportError:
+    encode_samples = None
+
 # ============================================
 # 설정
 # ============================================
@@ -19,9 +29,32 @@ API_SERVER = os.getenv("API_SERVER", "http://192.168.1.10:8000")  # FastAPI 서
 ZONE_ID = os.getenv("ZONE_ID", "testbox")  # 구역 ID
 DEVICE_ID = os.getenv("DEVICE_ID", "raspberry_pi_01")  # 장치 ID
 
-SEND_INTERVAL = 5  # 5초마다 데이터 전송
+SEND_INTERVAL = float(os.getenv("SEND_INTERVAL", 5))  # 5초마다 데이터 기록 (전송은 배치 단위)
 HEARTBEAT_INTERVAL = 60  # 60초마다 하트비트 전송
 
+# 배치 전송 및 오프라인 스풀 설정
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", 12))  # 12개(1분 분량) 모이면 전송
+FLUSH_INTERVAL = float(os.getenv("FLUSH_INTERVAL", 60))  # 최대 60초마다 전송
+SPOOL_PATH = os.getenv("SPOOL_PATH", "/var/tmp/prism_spool.jsonl")  # 서버 미연결시 보관 파일
+SPOOL_MAX_BYTES = int(os.getenv("SPOOL_MAX_BYTES", 10 * 1024 * 1024))  # 스풀 최대 크기 (10MB)
+DRAIN_BATCHES_PER_FLUSH = 5  # 연결 복구 후 전송 주기마다 보낼 스풀 배치 수
+MEMORY_RETRY_MAX = 500  # 스풀 파일에 쓸 수 없을 때 메모리에 보관할 최대 샘플 수
+WIRE_FORMAT = os.getenv("WIRE_FORMAT", "json")  # json 또는 binary (샘플당 17바이트, 대역폭 절감)
+
+# 센서별 샘플링 주기 (Hz) - 센서마다 별도 스레드에서 독립적으로 읽음
+SENSOR_RATES = {
+    "temperature": float(os.getenv("TEMPERATURE_HZ", 0.5)),
+    "gas": float(os.getenv("GAS_HZ", 1)),
+    "dust": float(os.getenv("DUST_HZ", 0.2)),
+    "flame": float(os.getenv("FLAME_HZ", 10)),  # 순간 불꽃도 놓치지 않도록 빠르게
+}
+READING_QUEUE_SIZE = 1000  # 수집 → 전송 스레드 사이 큐 크기 (가득 차면 가장 오래된 데이터 폐기)
+
+# HTTP 재시도 설정 (지수 백오프 + 지터)
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", 2))  # 요청당 재시도 횟수
+BACKOFF_BASE = float(os.getenv("BACKOFF_BASE", 0.5))  # 첫 재시도 대기 (초)
+BACKOFF_MAX = float(os.getenv("BACKOFF_MAX", 300))  # 최대 대기 (초)
+
 # ============================================
 # 센서 초기화 (실제 센서 사용시 주석 해제)
 # ============================================
@@ -126,13 +159,151 @@ def collect_sensor_data():
     }
     return data
 
+# ============================================
+# 센서별 샘플링 (스레드)
+# ============================================
+
+SENSOR_READERS = {
+    "temperature": read_temperature_sensor,
+    "gas": read_gas_sensor,
+    "dust": read_dust_sensor,
+    "flame": read_flame_sensor,
+}
+
+class SensorState:
+    """
+    센서별 최신값 (샘플러 스레드가 갱신하고 기록 루프가 읽음)
+    불꽃은 기록 주기 사이에 한 번이라도 감지되면 True로 유지
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {name: reader() for name, reader in SENSOR_READERS.items()}
+        self.flame_latched = bool(self.values["flame"])
+    
+    def update(self, name, value):
+        with self.lock:
+            self.values[name] = value
+            if name == "flame" and value:
+                self.flame_latched = True
+    
+    def snapshot(self):
+        """현재 값으로 센서 데이터 생성 후 불꽃 래치 초기화"""
+        with self.lock:
+            data = {
+                "zone": ZONE_ID,
+                "temperature": self.values["temperature"],
+                "gas": self.values["gas"],
+                "dust": self.values["dust"],
+                "flame": self.flame_latched,
+                "timestamp": datetime.now().isoformat()
+            }
+            self.flame_latched = bool(self.values["flame"])
+        return data
+
+class SensorSampler(threading.Thread):
+    """
+    센서 하나를 고정 주기로 읽는 스레드
+    monotonic 시계 기준으로 다음 시각을 예약하여 누적 드리프트가 없고,
+    읽기가 느린 센서(DHT22 등)가 다른 센서의 주기에 영향을 주지 않음
+    """
+    
+    def __init__(self, name, reader, rate_hz, state, stop_event):
+        super().__init__(name=f"sampler-{name}", daemon=True)
+        self.sensor_name = name
+        self.reader = reader
+        self.period = 1.0 / rate_hz
+        self.state = state
+        self.stop_event = stop_event
+    
+    def run(self):
+        next_due = time.monotonic()
+        while not self.stop_event.is_set():
+            try:
+                self.state.update(self.sensor_name, self.reader())
+            except Exception as e:
+                print(f"✗ 센서 읽기 오류 [{self.sensor_name}]: {e}")
+            
+            next_due += self.period
+            now = time.monotonic()
+            if next_due < now:
+                # 읽기가 주기보다 오래 걸린 경우 밀린 주기는 건너뜀
+                next_due += ((now - next_due) // self.period + 1) * self.period
+            self.stop_event.wait(next_due - now)
+
+def enqueue_reading(readings, reading):
+    """
+    전송 큐에 추가 (가득 차면 가장 오래된 데이터를 버려 수집이 멈추지 않도록 함)
+    """
+    while True:
+        try:
+            readings.put_nowait(reading)
+            return
+        except queue.Full:
+            try:
+                readings.get_nowait()
+                print("⚠️  전송 큐 가득 참 - 가장 오래된 데이터 폐기")
+            except queue.Empty:
+                pass
+
+def create_session():
+    """
+    연결을 재사용하는 HTTP 세션 생성 (keep-alive)
+    매 전송마다 TCP/TLS 핸드셰이크를 반복하지 않음
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"User-Agent": f"prism-sensor/{DEVICE_ID}"})
+    return session
+
+session = create_session()
+
+def backoff_delay(attempt):
+    """
+    지수 백오프 대기 시간 (0.5~1배 무작위 지터)
+    여러 장치가 동시에 재시도하며 몰리지 않도록 분산
+    """
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt))
+    return delay * random.uniform(0.5, 1.0)
+
+def post_with_retry(url, timeout, **kwargs):
+    """
+    연결 오류/서버 오류(5xx)는 HTTP_RETRIES회까지 재시도
+    마지막 응답을 반환하고, 끝까지 연결에 실패하면 예외 발생
+    """
+    for attempt in range(HTTP_RETRIES + 1):
+        try:
+            response = session.post(url, timeout=timeout, **kwargs)
+            if response.status_code < 500 or attempt == HTTP_RETRIES:
+                return response
+        except requests.exceptions.RequestException:
+            if attempt == HTTP_RETRIES:
+                raise
+        time.sleep(backoff_delay(attempt))
+
+class RateLimited(Exception):
+    """서버가 전송 속도 제한(429)을 알림 - retry_after초 동안 전송하지 않음"""
+    
+    def __init__(self, retry_after):
+        super().__init__(f"{retry_after}초 후 재시도")
+        self.retry_after = retry_after
+
+def retry_after_seconds(response):
+    """Retry-After 헤더(초) 해석 (없거나 잘못된 값이면 백오프 기본값)"""
+    try:
+        return min(BACKOFF_MAX, max(1.0, float(response.headers.get("Retry-After", ""))))
+    except ValueError:
+        return backoff_delay(0)
+
 def send_data_to_server(data):
     """
     센서 데이터를 FastAPI 서버로 전송
     """
     try:
         url = f"{API_SERVER}/api/sensors/{ZONE_ID}"
-        response = requests.post(url, json=data, timeout=5)
+        response = post_with_retry(url, timeout=5, json=data)
         
         if response.status_code == 200:
             print(f"✓ 데이터 전송 성공: {datetime.now().strftime('%H:%M:%S')}")
@@ -150,13 +321,244 @@ def send_data_to_server(data):
         print(f"✗ 연결 오류: {e}")
         return False
 
+def send_batch_to_server(readings):
+    """
+    여러 센서 데이터를 배치 엔드포인트로 한 번에 전송
+    반환: True(전송 완료), False(재시도 필요 - 연결 오류/서버 오류)
+    속도 제한(429)이면 RateLimited 발생 (데이터는 보관 후 Retry-After 이후 재전송)
+    """
+    try:
+        url = f"{API_SERVER}/api/sensors/{ZONE_ID}/batch"
+        # device_id를 함께 보내 하트비트를 대신함
+        if WIRE_FORMAT == "binary" and encode_samples is not None:
+            response = post_with_retry(
+                url, timeout=10,
+                data=encode_samples(ZONE_ID, DEVICE_ID, readings),
+                headers={"Content-Type": PRISM_CONTENT_TYPE}
+            )
+        else:
+            response = post_with_retry(url, timeout=10, json={"samples": readings, "device_id": DEVICE_ID})
+        
+        if response.status_code == 200:
+            result = response.json()
+            print(f"✓ 배치 전송 성공: {datetime.now().strftime('%H:%M:%S')} "
+                  f"({result.get('accepted', 0)}/{len(readings)}건 저장)")
+            for reject in result.get("rejected", []):
+                print(f"  ✗ 거부됨 #{reject['index']}: {reject['error']}")
+            return True
+        elif response.status_code == 429:
+            raise RateLimited(retry_after_seconds(response))
+        elif 400 <= response.status_code < 500:
+            # 요청 자체가 잘못된 경우 재시도해도 같은 결과이므로 버림
+            print(f"✗ 배치 전송 거부: {response.status_code} ({len(readings)}건 폐기)")
+            return True
+        else:
+            print(f"✗ 배치 전송 실패: {response.status_code}")
+            return False
+            
+    except requests.exceptions.RequestException as e:
+        print(f"✗ 연결 오류: {e}")
+        return False
+
+class BufferedSender:
+    """
+    센서 데이터를 로컬 큐에 모아서 배치 전송
+    - BATCH_SIZE개가 모이거나 FLUSH_INTERVAL초가 지나면 전송
+    - 서버에 연결할 수 없으면 디스크 스풀 파일(최대 SPOOL_MAX_BYTES)에 보관
+    - 연속 실패시 지수 백오프(지터 포함) 동안 네트워크 시도 없이 스풀에만 보관
+    - 서버가 429로 속도 제한을 알리면 Retry-After 동안 스풀에만 보관
+    - 연결이 복구되면 전송 주기마다 DRAIN_BATCHES_PER_FLUSH개 배치씩 스풀을 비움
+    - 스풀이 남아 있는 동안 새 데이터도 스풀 뒤에 붙여 시간 순서 유지
+    - 스풀 파일에 쓸 수 없으면(디스크 가득 참, 읽기 전용, 권한) 최대 MEMORY_RETRY_MAX개를
+      메모리에 보관했다가 다음 전송 주기에 다시 시도
+    
+    스풀은 한 줄에 배치 하나(JSON)를 기록하고, 전송한 위치는 .offset 파일에 저장
+    """
+    
+    def __init__(self, send_func=send_batch_to_server, spool_path=SPOOL_PATH,
+                 batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 spool_max_bytes=SPOOL_MAX_BYTES):
+        self.send_func = send_func
+        self.spool_path = spool_path
+        self.offset_path = spool_path + ".offset"
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spool_max_bytes = spool_max_bytes
+        self.queue = []
+        self.retry = []  # 스풀에 쓰지 못해 메모리에 보관 중인 데이터
+        self.last_flush = time.monotonic()
+        self.last_success = 0.0  # 마지막 전송 성공 시각 (monotonic)
+        self.failures = 0  # 연속 실패 횟수
+        self.retry_at = 0.0  # 이 시각 전에는 전송을 시도하지 않음 (백오프)
+    
+    def add(self, reading):
+        self.queue.append(reading)
+    
+    def flush_due(self):
+        return (len(self.queue) >= self.batch_size
+                or ((self.queue or self.retry) and time.monotonic() - self.last_flush >= self.flush_interval)
+                or (self.has_spool() and time.monotonic() - self.last_flush >= self.flush_interval))
+    
+    def flush(self):
+        """
+        스풀을 먼저 비운 뒤 큐의 데이터를 전송
+        전송에 실패하면 큐의 데이터를 스풀에 보관
+        """
+        now = time.monotonic()
+        self.last_flush = now
+        batch, self.queue, self.retry = self.retry + self.queue, [], []
+        backing_off = now < self.retry_at
+        
+        if self.has_spool() or backing_off:
+            if batch:
+                self._spool_or_keep(batch)
+            if not backing_off:
+                try:
+                    self._drain_spool()
+                except OSError as e:
+                    print(f"✗ 스풀 읽기 오류: {e}")
+            return
+        
+        if batch and not self._send(batch):
+            self._spool_or_keep(batch)
+    
+    def close(self):
+        """종료 전 남은 데이터 전송 (실패하면 스풀에 보관)"""
+        if self.queue or self.retry:
+            self.flush()
+    
+    def _send(self, batch):
+        """
+        전송 후 결과에 따라 백오프 상태 갱신
+        연속 실패시 다음 시도까지 대기 시간을 지수적으로 늘림
+        """
+        try:
+            sent = self.send_func(batch)
+        except RateLimited as e:
+            # 서버는 정상이므로 백오프 횟수는 늘리지 않고 서버가 알려준 시간만큼 대기
+            print(f"⏳ 전송 속도 제한 - {e.retry_after:.0f}초 후 재전송")
+            self.retry_at = time.monotonic() + e.retry_after
+            return False
+        if sent:
+            self.failures = 0
+            self.retry_at = 0.0
+            self.last_success = time.monotonic()
+            return True
+        self.retry_at = time.monotonic() + backoff_delay(self.failures)
+        self.failures += 1
+        return False
+    
+    def has_spool(self):
+        try:
+            return os.path.getsize(self.spool_path) > self._read_offset()
+        except OSError:
+            return False
+    
+    # --------------------------------------------
+    # 스풀 파일 관리
+    # --------------------------------------------
+    
+    def _drain_spool(self):
+        """스풀에서 정해진 수의 배치만 전송 (느린 네트워크에서 몰아서 보내지 않도록)"""
+        offset = self._read_offset()
+        with open(self.spool_path, "rb") as f:
+            f.seek(offset)
+            for _ in range(DRAIN_BATCHES_PER_FLUSH):
+                line = f.readline()
+                if not line:
+                    break
+                try:
+                    batch = json.loads(line)
+                except ValueError:
+                    # 기록 도중 종료되어 깨진 줄은 건너뜀
+                    offset += len(line)
+                    continue
+                if not self._send(batch):
+                    break
+                offset += len(line)
+                print(f"📤 스풀 배치 전송 ({len(batch)}건)")
+        
+        if offset >= os.path.getsize(self.spool_path):
+            # 모두 전송됨: 스풀 초기화
+            # 오프셋을 먼저 되돌려야 도중에 종료되어도 새 스풀의 앞부분을 건너뛰지 않음 (중복 전송만 발생)
+            self._write_offset(0)
+            os.remove(self.spool_path)
+            print("📤 스풀 비움 완료")
+        else:
+            self._write_offset(offset)
+    
+    def _spool_or_keep(self, batch):
+        """
+        스풀에 보관하고, 파일 오류가 나면 전송 스레드가 멈추지 않도록 메모리에 보관
+        """
+        try:
+            self._spool_append(batch)
+        except OSError as e:
+            self.retry = batch[-MEMORY_RETRY_MAX:]
+            dropped = len(batch) - len(self.retry)
+            print(f"✗ 스풀 쓰기 오류: {e} - 메모리에 {len(self.retry)}건 보관"
+                  + (f", 오래된 데이터 {dropped}건 폐기" if dropped else ""))
+    
+    def _spool_append(self, batch):
+        line = (json.dumps(batch, ensure_ascii=False) + "\n").encode("utf-8")
+        try:
+            size = os.path.getsize(self.spool_path)
+        except OSError:
+            size = 0
+        if size + len(line) > self.spool_max_bytes:
+            self._compact_spool(len(line))
+        with open(self.spool_path, "ab") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        print(f"💾 서버 미연결 - 스풀에 보관 ({len(batch)}건)")
+    
+    def _compact_spool(self, incoming):
+        """
+        전송 완료된 앞부분을 잘라내고, 그래도 공간이 부족하면 가장 오래된 배치부터 버림
+        """
+        offset = self._read_offset()
+        with open(self.spool_path, "rb") as f:
+            f.seek(offset)
+            lines = f.readlines()
+        
+        total = sum(len(line) for line in lines)
+        dropped = 0
+        if total + incoming > self.spool_max_bytes:
+            # 매번 다시 쓰지 않도록 여유 공간(10%)을 확보할 때까지 버림
+            while lines and total + incoming > self.spool_max_bytes * 0.9:
+                total -= len(lines.pop(0))
+                dropped += 1
+        if dropped:
+            print(f"⚠️  스풀 용량 초과 - 오래된 배치 {dropped}개 폐기")
+        
+        tmp_path = self.spool_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.writelines(lines)
+        # 오프셋을 먼저 되돌려야 교체 직전에 종료되어도 데이터를 건너뛰지 않음 (중복 전송만 발생)
+        self._write_offset(0)
+        os.replace(tmp_path, self.spool_path)
+    
+    def _read_offset(self):
+        try:
+            with open(self.offset_path) as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+    
+    def _write_offset(self, offset):
+        tmp_path = self.offset_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(offset))
+        os.replace(tmp_path, self.offset_path)
+
 def send_heartbeat():
     """
     서버에 하트비트 전송 (장치 연결 상태 유지)
     """
     try:
         url = f"{API_SERVER}/api/device/{DEVICE_ID}/heartbeat"
-        response = requests.post(url, timeout=5)
+        response = post_with_retry(url, timeout=5)
         
         if response.status_code == 200:
             print(f"💓 하트비트 전송 성공: {datetime.now().strftime('%H:%M:%S')}")
@@ -169,6 +571,46 @@ def send_heartbeat():
         print(f"✗ 하트비트 오류: {e}")
         return False
 
+class Uploader(threading.Thread):
+    """
+    전송 스레드: 큐의 센서 데이터를 BufferedSender로 배치 전송하고 하트비트 관리
+    네트워크 지연/타임아웃이 센서 수집에 영향을 주지 않음
+    """
+    
+    def __init__(self, readings, sender, stop_event):
+        super().__init__(name="uploader", daemon=True)
+        self.readings = readings
+        self.sender = sender
+        self.stop_event = stop_event
+    
+    def run(self):
+        # 초기 하트비트 전송
+        send_heartbeat()
+        last_heartbeat = time.monotonic()
+        
+        while True:
+            try:
+                self.sender.add(self.readings.get(timeout=1.0))
+                while True:
+                    self.sender.add(self.readings.get_nowait())
+            except queue.Empty:
+                pass
+            
+            if self.stop_event.is_set():
+                break
+            
+            if self.sender.flush_due():
+                self.sender.flush()
+            
+            # 하트비트 전송 (배치 전송이 하트비트를 겸하므로 전송이 없던 경우에만)
+            current_time = time.monotonic()
+            if current_time - max(last_heartbeat, self.sender.last_success) >= HEARTBEAT_INTERVAL:
+                send_heartbeat()
+                last_heartbeat = current_time
+        
+        # 종료 전 남은 데이터 전송 (실패하면 스풀에 보관)
+        self.sender.close()
+
 def get_local_ip():
     """
     로컬 IP 주소 가져오기
@@ -188,7 +630,7 @@ def get_local_ip():
 
 def main():
     """
-    메인 루프: 주기적으로 센서 데이터 수집 및 전송
+    메인 루프: 센서별 샘플러 스레드와 전송 스레드를 시작하고 고정 주기로 데이터 기록
     """
     print("=" * 60)
     print("🚀 PRISM 센서 데이터 수집 시스템 시작")
@@ -197,7 +639,10 @@ def main():
     print(f"🏭 구역 ID: {ZONE_ID}")
     print(f"🖥️  장치 ID: {DEVICE_ID}")
     print(f"🌐 로컬 IP: {get_local_ip()}")
-    print(f"⏱️  전송 주기: {SEND_INTERVAL}초")
+    print(f"⏱️  기록 주기: {SEND_INTERVAL:g}초 (배치 {BATCH_SIZE}개 / 최대 {FLUSH_INTERVAL:.0f}초마다 전송)")
+    if WIRE_FORMAT == "binary" and encode_samples is None:
+        print("⚠️  sensor_codec.py를 찾을 수 없어 JSON 포맷으로 전송합니다")
+    print(f"🔬 센서 주기: " + ", ".join(f"{name} {rate:g}Hz" for name, rate in SENSOR_RATES.items()))
     print("=" * 60)
     print("")
     
@@ -205,37 +650,31 @@ def main():
     # GPIO.setmode(GPIO.BCM)
     # GPIO.setwarnings(False)
     
-    last_heartbeat = time.time()
+    stop_event = threading.Event()
+    state = SensorState()
+    readings = queue.Queue(maxsize=READING_QUEUE_SIZE)
+    samplers = [
+        SensorSampler(name, SENSOR_READERS[name], rate, state, stop_event)
+        for name, rate in SENSOR_RATES.items()
+    ]
+    uploader = Uploader(readings, BufferedSender(), stop_event)
     
     try:
-        # 초기 하트비트 전송
-        send_heartbeat()
+        for sampler in samplers:
+            sampler.start()
+        uploader.start()
         
+        next_record = time.monotonic()
         while True:
-            # 센서 데이터 수집
-            sensor_data = collect_sensor_data()
-            
-            # 서버로 전송
-            send_data_to_server(sensor_data)
+            # 센서별 최신값으로 데이터 기록 후 전송 큐에 넣음 (전송은 별도 스레드)
+            sensor_data = state.snapshot()
+            enqueue_reading(readings, sensor_data)
             
-            # 임계값 체크 (알림)
-            if sensor_data['flame']:
-                print("⚠️  [위험] 불꽃이 감지되었습니다!")
-            if sensor_data['temperature'] > 50:
-                print(f"⚠️  [위험] 온도가 위험 수준입니다! ({sensor_data['temperature']}°C)")
-            if sensor_data['gas'] > 100:
-                print(f"⚠️  [위험] 가스 농도가 위험 수준입니다! ({sensor_data['gas']} ppm)")
-            if sensor_data['dust'] > 100:
-                print(f"⚠️  [경고] 미세먼지 농도가 높습니다! ({sensor_data['dust']} μg/m³)")
-            
-            # 하트비트 전송 (일정 시간마다)
-            current_time = time.time()
-            if current_time - last_heartbeat >= HEARTBEAT_INTERVAL:
-                send_heartbeat()
-                last_heartbeat = current_time
+            # 경고 판단은 서버의 규칙 엔진(alert_rules.py)에서 구역별 규칙으로 일괄 처리
             
-            # 대기
-            time.sleep(SEND_INTERVAL)
+            # 대기 (monotonic 시계 기준 고정 주기)
+            next_record += SEND_INTERVAL
+            time.sleep(max(0.0, next_record - time.monotonic()))
             
     except KeyboardInterrupt:
         print("\n⏹️  프로그램 종료")
@@ -245,6 +684,9 @@ def main():
         print(f"\n❌ 오류 발생: {e}")
         # GPIO 정리 (실제 센서 사용시 주석 해제)
         # GPIO.cleanup()
+    finally:
+        stop_event.set()
+        uploader.join(timeout=30)
 
 # ============================================
 # SSH 원격 관리 가이드
@@ -282,6 +724,8 @@ SSH 원격 관리 설정 방법:
    User=pi
    WorkingDirectory=/home/pi/prism
    Environment="API_SERVER=http://192.168.1.10:8000"
+   # WIRE_FORMAT=binary를 쓰려면 sensor_codec.py도 /home/pi/prism에 복사 필요
+   Environment="WIRE_FORMAT=binary"
    Environment="ZONE_ID=testbox"
    Environment="DEVICE_ID=raspberry_pi_01"
    ExecStart=/usr/bin/python3 /home/pi/prism/raspberry_pi_sensor.py
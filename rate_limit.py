@@ -0,0 +1,87 @@
+"""
+PRISM 수신 속도 제한 (토큰 버킷, 프로세스 내부)
+- 장치별 / 구역별 버킷에서 샘플 수만큼 토큰을 소비
+- 토큰이 부족하면 소비하지 않고 다시 시도할 수 있을 때까지의 시간(초)을 반환 → 429 Retry-After
+
+환경 변수 (초당 샘플 수 / 최대 버스트):
+  PRISM_DEVICE_RATE, PRISM_DEVICE_BURST   장치별 (기본 5 / 1000)
+  PRISM_ZONE_RATE, PRISM_ZONE_BURST       구역별 (기본 20 / 2000)
+  PRISM_HEARTBEAT_RATE, PRISM_HEARTBEAT_BURST  장치별 하트비트 요청 (기본 1 / 5)
+"""
+
+import os
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+MAX_BUCKETS = 10000  # 제한기당 최대 버킷 수 (넘으면 가득 찬 유휴 버킷부터 정리)
+
+# ============================================
+# 토큰 버킷
+# ============================================
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, cost: float) -> float:
+        """cost만큼 토큰이 쌓일 때까지 남은 시간 (초, 0이면 바로 가능)"""
+        cost = min(cost, self.capacity)  # 버스트보다 큰 요청은 버킷이 가득 찼을 때 허용
+        if self.tokens >= cost:
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """키(장치 ID, 구역)별 토큰 버킷"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def bucket(self, key: str, now: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= MAX_BUCKETS:
+                self._prune(now)
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst, now)
+        else:
+            bucket.refill(now)
+        return bucket
+
+    def acquire(self, key: str, cost: float = 1, now: Optional[float] = None) -> float:
+        return acquire_all([(self, key, cost)], now)
+
+    def _prune(self, now: float) -> None:
+        """다시 가득 찼을 버킷(오래 요청이 없던 키)은 지워도 동작이 같음"""
+        for key in [k for k, b in self._buckets.items() if b.tokens + (now - b.updated) * b.rate >= b.capacity]:
+            del self._buckets[key]
+
+
+def acquire_all(limits: Iterable[Tuple[RateLimiter, str, float]], now: Optional[float] = None) -> float:
+    """
+    여러 버킷(장치 + 구역)에서 (제한기, 키, 토큰 수)만큼 한꺼번에 소비
+    하나라도 부족하면 아무것도 소비하지 않고 가장 긴 대기 시간을 반환
+    """
+    now = time.monotonic() if now is None else now
+    costs = [(limiter.bucket(key, now), cost) for limiter, key, cost in limits]
+    wait = max((bucket.wait_time(cost) for bucket, cost in costs), default=0.0)
+    if wait > 0:
+        return wait
+    for bucket, cost in costs:
+        bucket.tokens -= min(cost, bucket.capacity)
+    return 0.0
+
+
+def limiter_from_env(prefix: str, rate: float, burst: float) -> RateLimiter:
+    return RateLimiter(float(os.getenv(f"PRISM_{prefix}_RATE", rate)), float(os.getenv(f"PRISM_{prefix}_BURST", burst)))
@@ -0,0 +1,146 @@
+"""
+PRISM 조회 응답 캐시
+- 경로 + 쿼리 문자열별로 직렬화된 JSON 본문과 ETag 보관 (LRU, 최대 항목 수 제한)
+- 항목마다 태그(zone:<구역>, devices)를 달아 두고 데이터가 바뀐 태그의 항목만 무효화
+- ETag는 본문 해시이므로 무효화 후 다시 만든 응답이 같으면 If-None-Match 요청에 계속 304 응답
+- 시간 기준 조회(최근 N시간)는 새 데이터가 없어도 구간이 움직이므로 TTL이 지나면 다시 생성
+
+환경 변수:
+  PRISM_CACHE_SIZE  최대 항목 수 (기본 1024, 0이면 캐시 사용 안 함)
+  PRISM_CACHE_TTL   항목 유지 시간 (초, 기본 10)
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+CACHE_SIZE = int(os.getenv("PRISM_CACHE_SIZE", 1024))
+CACHE_TTL = float(os.getenv("PRISM_CACHE_TTL", 10))
+
+# 브라우저/프록시는 저장하되 매번 ETag로 재검증
+CACHE_CONTROL = "no-cache"
+
+
+def encode_json(content) -> bytes:
+    """JSONResponse와 같은 형식으로 직렬화 (JSON 기본 타입만 들어 있는 값)"""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def zone_tag(zone: str) -> str:
+    return f"zone:{zone}"
+
+
+DEVICES_TAG = "devices"
+
+# ============================================
+# 캐시 항목
+# ============================================
+
+class CacheEntry:
+    __slots__ = ("body", "etag", "tags", "expires_at")
+
+    def __init__(self, body: bytes, tags: Tuple[str, ...], expires_at: float):
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        self.tags = tags
+        self.expires_at = expires_at
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """If-None-Match 헤더에 etag가 있는지 (약한 비교, * 허용)"""
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+# ============================================
+# 응답 캐시
+# ============================================
+
+class ResponseCache:
+    """
+    이벤트 루프 단일 스레드에서만 사용 (락 없음)
+    태그 → 키 색인으로 무효화 시 해당 항목만 제거
+    """
+
+    def __init__(self, max_entries: int = CACHE_SIZE, ttl: float = CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._tagged: Dict[str, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def respond(self, request: Request, tags: Iterable[str], build: Callable[[], object]) -> Response:
+        """
+        캐시된 본문 또는 build() 결과로 응답 (If-None-Match가 일치하면 본문 없이 304)
+        build()가 bytes를 반환하면 이미 직렬화된 JSON 본문으로 사용
+        build()에서 발생한 HTTPException은 캐시하지 않고 그대로 전달
+        """
+        key = request.url.path
+        if request.url.query:
+            key += "?" + request.url.query
+        now = time.monotonic()
+
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > now:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        else:
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            content = build()
+            body = content if isinstance(content, bytes) else encode_json(jsonable_encoder(content))
+            entry = self._store(key, CacheEntry(body, tuple(tags), now + self.ttl))
+
+        headers = {"ETag": entry.etag, "Cache-Control": CACHE_CONTROL}
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(entry.body, media_type="application/json", headers=headers)
+
+    def invalidate(self, *tags: str) -> None:
+        for tag in tags:
+            keys = self._tagged.pop(tag, None)
+            if keys:
+                for key in list(keys):
+                    self._remove(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._tagged.clear()
+
+    def _store(self, key: str, entry: CacheEntry) -> CacheEntry:
+        if self.max_entries <= 0:
+            return entry
+        self._entries[key] = entry
+        for tag in entry.tags:
+            self._tagged.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))  # 가장 오래 사용하지 않은 항목
+        return entry
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
@@ -0,0 +1,126 @@
+"""
+PRISM 센서 데이터 바이너리 전송 포맷
+라즈베리파이/오렌지파이(raspberry_pi_sensor.py)와 FastAPI 서버(api_server.py)가 함께 사용
+Content-Type: application/vnd.prism.samples
+
+레이아웃 (리틀 엔디안):
+  헤더   : 매직 "PS" | 버전(u8) | 구역 길이(u8) | 구역(UTF-8) | 장치 길이(u8) | 장치 ID(UTF-8)
+           | 샘플 수(u16) | 기준 시각(i64, epoch 밀리초)
+  샘플   : 이전 샘플과의 시각 차이(i32, 밀리초) | 온도/가스/먼지(i32, 값 x 100) | 플래그(u8, bit0 = 불꽃)
+샘플당 17바이트 (JSON 약 130바이트), 센서값은 소수점 2자리까지 정확히 표현
+"""
+
+import struct
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+
+PRISM_CONTENT_TYPE = "application/vnd.prism.samples"
+
+MAGIC = b"PS"
+VERSION = 1
+VALUE_SCALE = 100  # 센서값 양자화 배율 (소수점 2자리)
+FLAG_FLAME = 0x01
+MAX_SAMPLES = 0xFFFF
+
+PREFIX = struct.Struct("<2sB")
+LENGTH = struct.Struct("<B")
+BODY_HEADER = struct.Struct("<Hq")
+SAMPLE = struct.Struct("<iiiiB")
+
+
+class WireFormatError(ValueError):
+    """바이너리 페이로드 형식 오류"""
+
+
+def _timestamp_ms(value) -> int:
+    """datetime / ISO 문자열 / epoch 초를 epoch 밀리초로 변환 (없으면 현재 시각)"""
+    if value is None:
+        value = datetime.now()
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        value = value.timestamp()
+    return int(round(value * 1000))
+
+
+def _quantize(value: float) -> int:
+    return int(round(value * VALUE_SCALE))
+
+
+def encode_samples(zone: str, device_id: str, samples: Iterable[Dict]) -> bytes:
+    """
+    센서 데이터(dict: temperature, gas, dust, flame, timestamp) 목록을 바이너리로 인코딩
+    타임스탬프는 기준 시각 + 샘플 간 차이(delta)로 저장
+    """
+    samples = list(samples)
+    if len(samples) > MAX_SAMPLES:
+        raise WireFormatError(f"한 번에 최대 {MAX_SAMPLES}개까지 인코딩할 수 있습니다")
+
+    zone_bytes = zone.encode("utf-8")[:255]
+    device_bytes = (device_id or "").encode("utf-8")[:255]
+    timestamps = [_timestamp_ms(sample.get("timestamp")) for sample in samples]
+    base = timestamps[0] if timestamps else 0
+
+    parts = [
+        PREFIX.pack(MAGIC, VERSION),
+        LENGTH.pack(len(zone_bytes)), zone_bytes,
+        LENGTH.pack(len(device_bytes)), device_bytes,
+        BODY_HEADER.pack(len(samples), base),
+    ]
+    previous = base
+    for ts, sample in zip(timestamps, samples):
+        parts.append(SAMPLE.pack(
+            ts - previous,
+            _quantize(sample["temperature"]),
+            _quantize(sample["gas"]),
+            _quantize(sample["dust"]),
+            FLAG_FLAME if sample.get("flame") else 0,
+        ))
+        previous = ts
+    return b"".join(parts)
+
+
+def decode_samples(payload: bytes) -> Tuple[str, str, List[Tuple[float, float, float, float, bool]]]:
+    """
+    바이너리 페이로드 디코딩
+    반환: (구역, 장치 ID, [(timestamp 초, temperature, gas, dust, flame), ...])
+    """
+    view = memoryview(payload)
+    try:
+        magic, version = PREFIX.unpack_from(view, 0)
+        if magic != MAGIC:
+            raise WireFormatError("PRISM 바이너리 페이로드가 아닙니다")
+        if version != VERSION:
+            raise WireFormatError(f"지원하지 않는 버전입니다: {version}")
+        offset = PREFIX.size
+
+        (zone_len,) = LENGTH.unpack_from(view, offset)
+        offset += LENGTH.size
+        zone = bytes(view[offset:offset + zone_len]).decode("utf-8")
+        offset += zone_len
+
+        (device_len,) = LENGTH.unpack_from(view, offset)
+        offset += LENGTH.size
+        device_id = bytes(view[offset:offset + device_len]).decode("utf-8")
+        offset += device_len
+
+        count, base = BODY_HEADER.unpack_from(view, offset)
+        offset += BODY_HEADER.size
+    except (struct.error, UnicodeDecodeError) as e:
+        raise WireFormatError(f"헤더를 해석할 수 없습니다: {e}") from e
+
+    if len(view) - offset != count * SAMPLE.size:
+        raise WireFormatError("샘플 수와 페이로드 길이가 일치하지 않습니다")
+
+    samples = []
+    ts = base
+    for delta, temperature, gas, dust, flags in SAMPLE.iter_unpack(view[offset:]):
+        ts += delta
+        samples.append((
+            ts / 1000,
+            temperature / VALUE_SCALE,
+            gas / VALUE_SCALE,
+            dust / VALUE_SCALE,
+            bool(flags & FLAG_FLAME),
+        ))
+    return zone, device_id, samples
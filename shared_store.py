@@ -0,0 +1,784 @@
+"""
+PRISM 다중 워커 공유 저장소 (PRISM_STORAGE=shared)
+uvicorn 워커 여러 개가 mmap 파일 하나로 최신 센서값, 원본 링 버퍼, 롤업 계층을 공유
+
+파일 구조 (data_dir/shared_store.bin, 리틀 엔디안):
+  헤더       : 매직 "PRISMSH1" | 최대 구역 수(u32) | 원본 용량(u32) | 롤업 계층별 용량(u32 x 3)
+  구역 목록  : 구역마다 이름(64바이트) | 최신값 순번(i64) | timestamp, 온도, 가스, 먼지(f64 x 4) | 불꽃(i64)
+  구역 데이터: 구역마다 원본 링 버퍼 [head, size(i64 x 2) + 열 배열] + 롤업 계층별 링 버퍼 (같은 형식)
+
+- 링 버퍼는 history_store와 같은 클래스를 mmap 위의 memoryview로 사용 (최대 용량으로 고정, 확장 없음)
+- 쓰기는 파일 배타 잠금(flock), 조회는 공유 잠금 → 조회끼리는 서로 막지 않음
+- 파일 자체가 디스크에 남으므로 재시작 후에도 데이터 유지 (세그먼트 로그 불필요)
+- 리눅스/유닉스 전용 (fcntl)
+
+워커 간 조정 상태 (data_dir/shared_state.bin, 같은 파일 잠금 사용):
+  헤더       : 매직 "PRISMST2" | 장치 수 한도(u32) | 제한기별 버킷 수(u32) | 경고 샘플 저널 크기(u32) | 규칙 영역 크기(u32)
+  카운터     : 장치 수 | 장치 변경 순번 | 저널 누적 기록 수 | 규칙 변경 순번 | 규칙 JSON 길이
+               | 평가한 저널 위치 | 경고 이벤트 누적 수 | 발생 중 경고 JSON 길이 (i64 x 8)
+  장치 목록  : 장치마다 ID(64) | 종류(32) | IP(48) | 구역(64) | 마지막 연결 시각(f64)
+  토큰 버킷  : 제한기(DEVICE/ZONE/HEARTBEAT)마다 해시 테이블, 항목마다 키 해시(u64) | 토큰 | 갱신 시각(f64)
+  경고 저널  : 모든 워커가 받은 샘플 (구역 슬롯, timestamp, 온도, 가스, 먼지, 불꽃) 원형 기록
+  규칙       : 구역별 경고 규칙 덮어쓰기 (JSON)
+  경고 이벤트: 평가 워커가 낸 발생/해제 이벤트 원형 기록, 항목마다 워커 PID(i64) | 길이(u32) | JSON
+  발생 중 경고: 평가 워커의 active_alerts() (JSON)
+- 장치 레지스트리: 워커마다 레지스트리를 두고 공유 목록과 동기화 (마지막 연결 시각은 큰 값 유지)
+- 속도 제한: 버킷 값 자체를 공유하므로 워커 수와 관계없이 설정한 한도 그대로 적용
+- 경고 규칙: 상태 파일 잠금(LOCK_NB)을 잡은 워커 하나만 저널을 평가하고, 나머지 워커는 이벤트만 전달
+  (평가 워커가 종료되면 다음 워커가 잠금을 잡고 마지막으로 평가한 저널 위치부터 이어서 평가)
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import Mapping, MutableMapping
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # 윈도우: 공유 저장소 사용 불가 (memory/segment만 지원)
+    fcntl = None
+
+from history_store import (
+    HISTORY_RETENTION_SECONDS, MAX_CAPACITY, METRICS, ROLLUP_TIERS, RollupTier, ZoneHistory, ZoneRollups
+)
+from rate_limit import RateLimiter, TokenBucket
+
+# ============================================
+# 설정 / 파일 구조
+# ============================================
+
+SHARED_MAX_ZONES = int(os.getenv("PRISM_SHARED_MAX_ZONES", 64))
+
+MAGIC = b"PRISMSH1"
+FILE_HEADER = struct.Struct("<8sIIIII")
+ZONE_NAME_BYTES = 64
+ZONE_ENTRY = struct.Struct(f"<{ZONE_NAME_BYTES}sqddddq")
+RING_HEADER = struct.Struct("<qq")
+PAGE = mmap.PAGESIZE
+
+SHARED_MAX_DEVICES = int(os.getenv("PRISM_SHARED_MAX_DEVICES", 1024))
+SHARED_MAX_BUCKETS = 4096          # 제한기별 공유 버킷 수
+ALERT_JOURNAL_SIZE = 65536         # 경고 평가 대기 샘플 수 (읽지 못하고 밀려난 샘플은 버림)
+RULES_BYTES = 256 * 1024           # 구역별 경고 규칙 JSON 최대 크기
+ALERT_EVENTS = 4096                # 전달 대기 경고 이벤트 수
+ALERT_EVENT_BYTES = 1024           # 경고 이벤트 하나의 최대 크기 (헤더 포함)
+ACTIVE_BYTES = 64 * 1024           # 발생 중 경고 JSON 최대 크기
+LIMITERS = ("DEVICE", "ZONE", "HEARTBEAT")
+BUCKET_PROBES = 16                 # 버킷 해시 테이블 선형 탐색 길이
+
+STATE_MAGIC = b"PRISMST2"
+STATE_HEADER = struct.Struct("<8sIIII")
+STATE_COUNTERS = 8
+DEVICE_FIELDS = (64, 32, 48, 64)
+DEVICE_ENTRY = struct.Struct("<64s32s48s64sd")
+BUCKET_ENTRY = struct.Struct("<Qdd")
+JOURNAL_ENTRY = struct.Struct("<qddddq")
+EVENT_HEADER = struct.Struct("<qI")
+
+# 카운터 번호
+(DEVICE_COUNT, DEVICE_SEQ, JOURNAL_HEAD, RULES_SEQ, RULES_LENGTH,
+ JOURNAL_EVALUATED, EVENT_HEAD, ACTIVE_LENGTH) = range(STATE_COUNTERS)
+
+RAW_WIDTH = 1 + len(METRICS)
+ROLLUP_WIDTH = 2 + 3 * len(METRICS)
+
+
+def _align(size: int) -> int:
+    return (size + PAGE - 1) // PAGE * PAGE
+
+
+def _ring_bytes(width: int, capacity: int) -> int:
+    return RING_HEADER.size + width * 8 * capacity
+
+
+def _rollup_capacity(bucket_seconds: int, retention: float) -> int:
+    return int(retention // bucket_seconds) + 1
+
+
+class SharedStoreFull(RuntimeError):
+    """구역 목록이 가득 참 (PRISM_SHARED_MAX_ZONES)"""
+
+# ============================================
+# mmap 위의 링 버퍼
+# ============================================
+
+class SharedRing:
+    """
+    head/size를 공유 메모리 헤더에서 읽고 쓰는 링 버퍼 (TimeSeriesRing 하위 클래스와 함께 사용)
+    용량은 최대 용량으로 고정되어 있으므로 확장/복원은 하지 않음
+    """
+
+    __slots__ = ()
+
+    def _attach(self, buffer: memoryview, offset: int, width: int, capacity: int) -> None:
+        self._header = buffer[offset:offset + RING_HEADER.size].cast("q")
+        self._capacity = capacity
+        self.max_capacity = capacity
+        base = offset + RING_HEADER.size
+        self._columns = [
+            buffer[base + c * 8 * capacity:base + (c + 1) * 8 * capacity].cast("d")
+            for c in range(width)
+        ]
+
+    @property
+    def _head(self) -> int:
+        return self._header[0]
+
+    @_head.setter
+    def _head(self, value: int) -> None:
+        self._header[0] = value
+
+    @property
+    def _size(self) -> int:
+        return self._header[1]
+
+    @_size.setter
+    def _size(self, value: int) -> None:
+        self._header[1] = value
+
+    def _slice(self, column: memoryview, lo: int, hi: int) -> array:
+        """공유 메모리 구간을 array로 복사 (조회 결과는 잠금 밖에서 사용)"""
+        start = (self._head + lo) % self._capacity
+        end = start + (hi - lo)
+        result = array("d")
+        if end <= self._capacity:
+            result.frombytes(column[start:end].cast("B"))
+        else:
+            result.frombytes(column[start:].cast("B"))
+            result.frombytes(column[:end - self._capacity].cast("B"))
+        return result
+
+    def release(self) -> None:
+        """mmap을 닫기 전에 메모리 보기 해제"""
+        for view in self._columns:
+            view.release()
+        self._header.release()
+
+    def _grow(self) -> None:
+        raise RuntimeError("공유 링 버퍼는 확장할 수 없습니다")
+
+    def restore(self, columns) -> None:
+        raise RuntimeError("공유 링 버퍼는 파일에서 직접 복원됩니다")
+
+
+class SharedZoneHistory(SharedRing, ZoneHistory):
+    __slots__ = ("_header",)
+
+    def __init__(self, buffer: memoryview, offset: int, capacity: int):
+        self.retention_seconds = HISTORY_RETENTION_SECONDS
+        self._attach(buffer, offset, RAW_WIDTH, capacity)
+
+
+class SharedRollupTier(SharedRing, RollupTier):
+    __slots__ = ("_header",)
+
+    def __init__(self, buffer: memoryview, offset: int, bucket_seconds: int, retention: float):
+        self.bucket_seconds = bucket_seconds
+        self.retention_seconds = retention
+        self._attach(buffer, offset, ROLLUP_WIDTH, _rollup_capacity(bucket_seconds, retention))
+
+
+class SharedZoneRollups(ZoneRollups):
+    """공유 메모리 위의 롤업 계층 묶음 (add/select는 ZoneRollups 그대로 사용)"""
+
+    __slots__ = ()
+
+    def __init__(self, tiers: List[SharedRollupTier]):
+        self.tiers = tiers
+
+# ============================================
+# 공유 저장소
+# ============================================
+
+class SharedStore:
+    """
+    워커마다 같은 파일을 열어 mmap으로 공유
+    구역 이름 → 슬롯 번호는 파일의 구역 목록에서 찾고, 워커별로 캐시
+    """
+
+    def __init__(self, path: str, max_zones: int = SHARED_MAX_ZONES):
+        self.path = path
+        self.max_zones = max_zones
+        self.raw_capacity = MAX_CAPACITY
+        self.rollup_layout = [(bucket, retention, _rollup_capacity(bucket, retention))
+                              for bucket, retention in ROLLUP_TIERS]
+
+        self.directory_offset = FILE_HEADER.size
+        self.data_offset = _align(self.directory_offset + ZONE_ENTRY.size * max_zones)
+        self.zone_bytes = _align(_ring_bytes(RAW_WIDTH, self.raw_capacity)) + sum(
+            _align(_ring_bytes(ROLLUP_WIDTH, capacity)) for _, _, capacity in self.rollup_layout
+        )
+        size = self.data_offset + self.zone_bytes * max_zones
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        with self._locked(fcntl.LOCK_EX):
+            if os.fstat(self._fd).st_size == 0:
+                # 희소 파일: 실제로 쓴 페이지만 디스크/메모리를 차지
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, self._file_header(), 0)
+            elif os.pread(self._fd, FILE_HEADER.size, 0) != self._file_header() or \
+                    os.fstat(self._fd).st_size != size:
+                raise RuntimeError(f"공유 저장소 파일 구조가 다릅니다. 서버를 모두 종료한 뒤 {path}를 삭제하세요")
+        self._mmap = mmap.mmap(self._fd, size)
+        self._buffer = memoryview(self._mmap)
+
+        self._slots: Dict[str, int] = {}
+        self._zones: Dict[str, Tuple[SharedZoneHistory, SharedZoneRollups]] = {}
+        self._seen: Dict[str, int] = {}  # 구역별 마지막으로 확인한 최신값 순번
+        self.histories = _ZoneView(self, 0)
+        self.rollups = _ZoneView(self, 1)
+        self.state = SharedState(os.path.join(os.path.dirname(path) or ".", "shared_state.bin"), self)
+
+    def _file_header(self) -> bytes:
+        return FILE_HEADER.pack(MAGIC, self.max_zones, self.raw_capacity,
+                                *(capacity for _, _, capacity in self.rollup_layout))
+
+    # --------------------------------------------
+    # 잠금
+    # --------------------------------------------
+
+    @contextmanager
+    def _locked(self, mode: int):
+        fcntl.flock(self._fd, mode)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def write_lock(self):
+        """링 버퍼/최신값 갱신 (다른 워커의 쓰기/조회와 배타적)"""
+        return self._locked(fcntl.LOCK_EX)
+
+    def read_lock(self):
+        """조회 (조회끼리는 동시에 가능)"""
+        return self._locked(fcntl.LOCK_SH)
+
+    def flush(self) -> None:
+        """변경된 페이지를 디스크에 기록 (체크포인트 주기마다 호출)"""
+        self._mmap.flush()
+
+    def close(self) -> None:
+        for history, rollups in self._zones.values():
+            history.release()
+            for tier in rollups.tiers:
+                tier.release()
+        self._zones.clear()
+        self.state.close()
+        self._buffer.release()
+        self._mmap.close()
+        os.close(self._fd)
+
+    # --------------------------------------------
+    # 구역 목록
+    # --------------------------------------------
+
+    def _entry_offset(self, slot: int) -> int:
+        return self.directory_offset + slot * ZONE_ENTRY.size
+
+    def _read_entry(self, slot: int) -> tuple:
+        return ZONE_ENTRY.unpack_from(self._mmap, self._entry_offset(slot))
+
+    def _scan(self) -> Iterator[Tuple[int, str]]:
+        """파일의 구역 목록 (다른 워커가 추가한 구역 포함)"""
+        for slot in range(self.max_zones):
+            name = self._mmap[self._entry_offset(slot):self._entry_offset(slot) + ZONE_NAME_BYTES].rstrip(b"\0")
+            if not name:
+                break
+            yield slot, name.decode("utf-8")
+
+    def _refresh(self) -> None:
+        for slot, name in self._scan():
+            self._slots.setdefault(name, slot)
+
+    def slot(self, zone: str, create: bool = False) -> Optional[int]:
+        """구역의 슬롯 번호 (create=True면 없을 때 추가, 쓰기 잠금 안에서 호출)"""
+        slot = self._slots.get(zone)
+        if slot is None:
+            self._refresh()
+            slot = self._slots.get(zone)
+        if slot is None and create:
+            slot = self._create(zone)
+        return slot
+
+    def _create(self, zone: str) -> int:
+        """구역 목록에 추가 (쓰기 잠금 안에서 호출)"""
+        name = zone.encode("utf-8")
+        if len(name) > ZONE_NAME_BYTES:
+            raise ValueError(f"구역 이름은 {ZONE_NAME_BYTES}바이트 이하여야 합니다")
+        slot = len(self._slots)
+        if slot >= self.max_zones:
+            raise SharedStoreFull(f"공유 저장소 구역 수 한도({self.max_zones})를 초과했습니다")
+        ZONE_ENTRY.pack_into(self._mmap, self._entry_offset(slot), name, 0, 0.0, 0.0, 0.0, 0.0, 0)
+        self._slots[zone] = slot
+        return slot
+
+    def zone_names(self) -> List[str]:
+        self._refresh()
+        return list(self._slots)
+
+    def zone_name(self, slot: int) -> Optional[str]:
+        """슬롯 번호 → 구역 이름 (잠금 안에서 호출)"""
+        if slot not in self._slots.values():
+            self._refresh()
+        for zone, zone_slot in self._slots.items():
+            if zone_slot == slot:
+                return zone
+        return None
+
+    # --------------------------------------------
+    # 구역 버퍼
+    # --------------------------------------------
+
+    def zone_buffers(self, zone: str, create: bool = True):
+        """구역의 (원본 링 버퍼, 롤업 계층), 없으면 생성 (create=True일 때는 쓰기 잠금 안에서 호출)"""
+        buffers = self._zones.get(zone)
+        if buffers is not None:
+            return buffers
+        slot = self.slot(zone, create=create)
+        if slot is None:
+            return None
+        offset = self.data_offset + slot * self.zone_bytes
+        history = SharedZoneHistory(self._buffer, offset, self.raw_capacity)
+        offset += _align(_ring_bytes(RAW_WIDTH, self.raw_capacity))
+        tiers = []
+        for bucket, retention, capacity in self.rollup_layout:
+            tiers.append(SharedRollupTier(self._buffer, offset, bucket, retention))
+            offset += _align(_ring_bytes(ROLLUP_WIDTH, capacity))
+        buffers = self._zones[zone] = (history, SharedZoneRollups(tiers))
+        return buffers
+
+    # --------------------------------------------
+    # 최신 센서값
+    # --------------------------------------------
+
+    def latest(self, zone: str) -> Optional[Tuple[int, float, float, float, float, bool]]:
+        """(순번, timestamp, 온도, 가스, 먼지, 불꽃), 데이터가 없으면 None"""
+        slot = self.slot(zone)
+        if slot is None:
+            return None
+        with self.read_lock():
+            _, seq, ts, temperature, gas, dust, flame = self._read_entry(slot)
+        if seq == 0:
+            return None
+        return seq, ts, temperature, gas, dust, bool(flame)
+
+    def set_latest(self, zone: str, ts: float, temperature: float, gas: float, dust: float, flame: bool) -> None:
+        with self.write_lock():
+            slot = self.slot(zone, create=True)
+            entry = self._read_entry(slot)
+            seq = entry[1] + 1
+            ZONE_ENTRY.pack_into(self._mmap, self._entry_offset(slot), entry[0], seq,
+                                 ts, temperature, gas, dust, int(bool(flame)))
+        self._seen[zone] = seq
+
+    def changed_zones(self) -> List[str]:
+        """마지막 확인 이후 다른 워커가 최신값을 바꾼 구역 (이 워커가 쓴 값은 제외)"""
+        changed = []
+        with self.read_lock():
+            for slot, zone in self._scan():
+                self._slots.setdefault(zone, slot)
+                seq = self._read_entry(slot)[1]
+                if seq and seq != self._seen.get(zone):
+                    self._seen[zone] = seq
+                    changed.append(zone)
+        return changed
+
+# ============================================
+# 워커 간 조정 상태
+# ============================================
+
+def _text(value: str, size: int) -> bytes:
+    return value.encode("utf-8")[:size]
+
+
+def _untext(value: bytes) -> str:
+    return value.rstrip(b"\0").decode("utf-8", "replace")
+
+
+class SharedTokenBucket(TokenBucket):
+    """토큰/갱신 시각을 공유 메모리 항목에서 읽고 쓰는 토큰 버킷 (acquire_all에서 그대로 사용)"""
+
+    __slots__ = ("_values", "_index")
+
+    def __init__(self, rate: float, capacity: float, values: memoryview, index: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._values = values
+        self._index = index
+
+    @property
+    def tokens(self) -> float:
+        return self._values[self._index]
+
+    @tokens.setter
+    def tokens(self, value: float) -> None:
+        self._values[self._index] = value
+
+    @property
+    def updated(self) -> float:
+        return self._values[self._index + 1]
+
+    @updated.setter
+    def updated(self, value: float) -> None:
+        self._values[self._index + 1] = value
+
+    def refill(self, now: float) -> None:
+        if now < self.updated:
+            # 재부팅 등으로 monotonic 시계가 처음부터 다시 시작: 가득 찬 버킷으로 취급
+            self.tokens = self.capacity
+            self.updated = now
+        super().refill(now)
+
+
+class SharedRateLimiter(RateLimiter):
+    """
+    공유 메모리 해시 테이블 위의 토큰 버킷 (키 해시 → 항목, 선형 탐색)
+    acquire_all 전체를 SharedStore.write_lock() 안에서 호출해야 함
+    """
+
+    def __init__(self, state: "SharedState", table: int, rate: float, burst: float):
+        super().__init__(rate, burst)
+        self._keys = state.bucket_keys[table]
+        self._values = state.bucket_values[table]
+
+    def bucket(self, key: str, now: float) -> TokenBucket:
+        tag = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") | 1
+        size = len(self._keys)
+        start = tag % size
+        candidate = None
+        for probe in range(min(BUCKET_PROBES, size)):
+            slot = (start + probe) % size
+            stored = self._keys[slot]
+            if stored == tag:
+                bucket = SharedTokenBucket(self.rate, self.burst, self._values, slot * 3 + 1)
+                bucket.refill(now)
+                return bucket
+            if stored == 0:
+                candidate = slot
+                break
+            if candidate is None:
+                # 다시 가득 찼을 버킷(오래 요청이 없던 키) 자리는 재사용해도 동작이 같음
+                bucket = SharedTokenBucket(self.rate, self.burst, self._values, slot * 3 + 1)
+                if bucket.tokens + (now - bucket.updated) * self.rate >= self.burst:
+                    candidate = slot
+        if candidate is None:
+            candidate = start  # 탐색 구간이 모두 사용 중: 새 키로 덮어씀 (가득 찬 버킷에서 시작)
+        self._keys[candidate] = tag
+        bucket = SharedTokenBucket(self.rate, self.burst, self._values, candidate * 3 + 1)
+        bucket.tokens = self.burst
+        bucket.updated = now
+        return bucket
+
+
+class SharedState:
+    """
+    장치 목록, 속도 제한 버킷, 경고 샘플 저널, 경고 규칙을 워커 간에 공유
+    잠금은 SharedStore 파일 잠금을 같이 사용 (잠금 안에서 다시 잠그지 않도록 주의)
+    """
+
+    def __init__(self, path: str, store: SharedStore, max_devices: int = SHARED_MAX_DEVICES,
+                 buckets: int = SHARED_MAX_BUCKETS, journal_size: int = ALERT_JOURNAL_SIZE):
+        self.store = store
+        self.max_devices = max_devices
+        self.journal_size = journal_size
+        header = STATE_HEADER.pack(STATE_MAGIC, max_devices, buckets, journal_size, RULES_BYTES)
+
+        self.counters_offset = STATE_HEADER.size
+        self.devices_offset = self.counters_offset + 8 * STATE_COUNTERS
+        self.buckets_offset = self.devices_offset + DEVICE_ENTRY.size * max_devices
+        self.journal_offset = self.buckets_offset + BUCKET_ENTRY.size * buckets * len(LIMITERS)
+        self.rules_offset = self.journal_offset + JOURNAL_ENTRY.size * journal_size
+        self.events_offset = self.rules_offset + RULES_BYTES
+        self.active_offset = self.events_offset + ALERT_EVENT_BYTES * ALERT_EVENTS
+        size = self.active_offset + ACTIVE_BYTES
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        with store.write_lock():
+            if os.fstat(self._fd).st_size == 0:
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, header, 0)
+            elif os.pread(self._fd, STATE_HEADER.size, 0) != header or os.fstat(self._fd).st_size != size:
+                raise RuntimeError(f"공유 상태 파일 구조가 다릅니다. 서버를 모두 종료한 뒤 {path}를 삭제하세요")
+        self._mmap = mmap.mmap(self._fd, size)
+        buffer = memoryview(self._mmap)
+        self._counters = buffer[self.counters_offset:self.devices_offset].cast("q")
+        self.bucket_keys = []
+        self.bucket_values = []
+        for table in range(len(LIMITERS)):
+            start = self.buckets_offset + table * BUCKET_ENTRY.size * buckets
+            region = buffer[start:start + BUCKET_ENTRY.size * buckets]
+            # 항목 = (키 해시, 토큰, 갱신 시각): 키는 3칸마다 u64, 값은 같은 영역의 f64 보기로 접근
+            self.bucket_keys.append(region.cast("Q")[::3])
+            self.bucket_values.append(region.cast("d"))
+        self._views = [self._counters, *self.bucket_keys, *self.bucket_values, buffer]
+        self._device_slots: Dict[str, int] = {}
+        self.evaluator = False  # 이 워커가 경고 평가 담당인지 (상태 파일 잠금 보유)
+
+    def close(self) -> None:
+        for view in self._views:
+            view.release()
+        self._mmap.close()
+        os.close(self._fd)
+
+    # --------------------------------------------
+    # 장치 목록
+    # --------------------------------------------
+
+    @property
+    def device_seq(self) -> int:
+        return self._counters[DEVICE_SEQ]
+
+    def _device_offset(self, slot: int) -> int:
+        return self.devices_offset + slot * DEVICE_ENTRY.size
+
+    def devices(self) -> List[Tuple[str, str, str, str, float]]:
+        """(장치 ID, 종류, IP, 구역, 마지막 연결 시각) 목록"""
+        with self.store.read_lock():
+            count = self._counters[DEVICE_COUNT]
+            entries = [DEVICE_ENTRY.unpack_from(self._mmap, self._device_offset(slot)) for slot in range(count)]
+        return [(_untext(device_id), _untext(device_type), _untext(ip), _untext(zone), last_seen)
+                for device_id, device_type, ip, zone, last_seen in entries]
+
+    def upsert_device(self, device_id: str, device_type: str, ip_address: str, zone: str,
+                      last_seen: float, keep_existing: bool = False) -> bool:
+        """
+        장치 정보 기록 (마지막 연결 시각은 더 최근 값 유지)
+        keep_existing=True면 이미 있는 장치는 그대로 둠 (시작 시 기본 장치 등록)
+        장치 수 한도를 넘으면 기록하지 않고 False (그 장치는 이 워커에만 보임)
+        """
+        key = _text(device_id, DEVICE_FIELDS[0])
+        with self.store.write_lock():
+            slot = self._device_slots.get(device_id)
+            if slot is None:
+                count = self._counters[DEVICE_COUNT]
+                for i in range(count):
+                    if DEVICE_ENTRY.unpack_from(self._mmap, self._device_offset(i))[0].rstrip(b"\0") == key:
+                        slot = self._device_slots[device_id] = i
+                        break
+            if slot is None:
+                slot = self._counters[DEVICE_COUNT]
+                if slot >= self.max_devices:
+                    return False
+                self._counters[DEVICE_COUNT] = slot + 1
+                self._device_slots[device_id] = slot
+            elif keep_existing:
+                return True
+            else:
+                last_seen = max(last_seen, DEVICE_ENTRY.unpack_from(self._mmap, self._device_offset(slot))[4])
+            DEVICE_ENTRY.pack_into(self._mmap, self._device_offset(slot), key,
+                                   _text(device_type, DEVICE_FIELDS[1]), _text(ip_address, DEVICE_FIELDS[2]),
+                                   _text(zone, DEVICE_FIELDS[3]), last_seen)
+            self._counters[DEVICE_SEQ] += 1
+        return True
+
+    # --------------------------------------------
+    # 속도 제한
+    # --------------------------------------------
+
+    def limiter(self, name: str, rate: float, burst: float) -> SharedRateLimiter:
+        return SharedRateLimiter(self, LIMITERS.index(name), rate, burst)
+
+    # --------------------------------------------
+    # 경고 샘플 저널
+    # --------------------------------------------
+
+    @property
+    def journal_head(self) -> int:
+        return self._counters[JOURNAL_HEAD]
+
+    def append_samples(self, zone: str, rows: List[Tuple[float, float, float, float, bool]]) -> None:
+        """(timestamp, 온도, 가스, 먼지, 불꽃) 샘플을 경고 평가 저널에 추가 (평가 담당 워커가 읽음)"""
+        with self.store.write_lock():
+            slot = self.store.slot(zone, create=True)
+            head = self._counters[JOURNAL_HEAD]
+            for i, (ts, temperature, gas, dust, flame) in enumerate(rows):
+                offset = self.journal_offset + ((head + i) % self.journal_size) * JOURNAL_ENTRY.size
+                JOURNAL_ENTRY.pack_into(self._mmap, offset, slot, ts, temperature, gas, dust, int(bool(flame)))
+            self._counters[JOURNAL_HEAD] = head + len(rows)
+
+    def read_journal(self, position: int) -> Tuple[List[tuple], int, int]:
+        """
+        position 이후 저널 샘플 (구역, timestamp, 온도, 가스, 먼지, 불꽃)
+        반환: (샘플 목록, 다음 읽기 위치, 읽기 전에 덮어써진 샘플 수)
+        """
+        rows = []
+        with self.store.read_lock():
+            head = self._counters[JOURNAL_HEAD]
+            skipped = max(0, head - self.journal_size - position)
+            for seq in range(position + skipped, head):
+                offset = self.journal_offset + (seq % self.journal_size) * JOURNAL_ENTRY.size
+                slot, ts, temperature, gas, dust, flame = JOURNAL_ENTRY.unpack_from(self._mmap, offset)
+                zone = self.store.zone_name(slot)
+                if zone is not None:
+                    rows.append((zone, ts, temperature, gas, dust, bool(flame)))
+        return rows, head, skipped
+
+    def claim_evaluator(self) -> bool:
+        """
+        경고 평가 담당 잠금 시도 (한 워커만 보유, 보유한 워커가 종료되면 해제)
+        반환: 이 워커가 평가 담당인지
+        """
+        if not self.evaluator:
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            self.evaluator = True
+        return True
+
+    @property
+    def evaluated(self) -> int:
+        """평가 담당 워커가 평가 큐에 넣은 마지막 저널 위치"""
+        return self._counters[JOURNAL_EVALUATED]
+
+    @evaluated.setter
+    def evaluated(self, position: int) -> None:
+        self._counters[JOURNAL_EVALUATED] = position
+
+    # --------------------------------------------
+    # 경고 이벤트 (평가 담당 → 다른 워커)
+    # --------------------------------------------
+
+    @property
+    def event_head(self) -> int:
+        return self._counters[EVENT_HEAD]
+
+    def append_alert(self, alert: Dict, active: List[Dict]) -> None:
+        """평가 담당 워커가 낸 경고 이벤트와 그 시점의 발생 중 경고 목록 기록"""
+        data = json.dumps(alert, ensure_ascii=False).encode("utf-8")
+        if EVENT_HEADER.size + len(data) > ALERT_EVENT_BYTES:
+            data = json.dumps({**alert, "message": alert["message"][:64]}, ensure_ascii=False).encode("utf-8")
+        active_data = json.dumps(active, ensure_ascii=False).encode("utf-8")
+        while len(active_data) > ACTIVE_BYTES:
+            active = active[:len(active) // 2]  # 영역보다 크면 앞쪽 경고만 유지
+            active_data = json.dumps(active, ensure_ascii=False).encode("utf-8")
+        with self.store.write_lock():
+            head = self._counters[EVENT_HEAD]
+            offset = self.events_offset + (head % ALERT_EVENTS) * ALERT_EVENT_BYTES
+            EVENT_HEADER.pack_into(self._mmap, offset, os.getpid(), len(data))
+            self._mmap[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + len(data)] = data
+            self._counters[EVENT_HEAD] = head + 1
+            self._mmap[self.active_offset:self.active_offset + len(active_data)] = active_data
+            self._counters[ACTIVE_LENGTH] = len(active_data)
+
+    def read_alerts(self, position: int) -> Tuple[List[Dict], int]:
+        """
+        position 이후 다른 워커가 낸 경고 이벤트 (이 워커가 낸 이벤트는 제외)
+        반환: (이벤트 목록, 다음 읽기 위치), 읽기 전에 덮어써진 이벤트는 건너뜀
+        """
+        events = []
+        pid = os.getpid()
+        with self.store.read_lock():
+            head = self._counters[EVENT_HEAD]
+            for seq in range(max(position, head - ALERT_EVENTS), head):
+                offset = self.events_offset + (seq % ALERT_EVENTS) * ALERT_EVENT_BYTES
+                owner, length = EVENT_HEADER.unpack_from(self._mmap, offset)
+                if owner != pid:
+                    events.append(self._mmap[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length])
+        return [json.loads(data) for data in events], head
+
+    def active_alerts(self) -> List[Dict]:
+        """평가 담당 워커 기준 발생 중 경고"""
+        with self.store.read_lock():
+            length = self._counters[ACTIVE_LENGTH]
+            data = self._mmap[self.active_offset:self.active_offset + length]
+        return json.loads(data) if data else []
+
+    # --------------------------------------------
+    # 경고 규칙
+    # --------------------------------------------
+
+    @property
+    def rules_seq(self) -> int:
+        return self._counters[RULES_SEQ]
+
+    def rules(self) -> Dict[str, list]:
+        """구역별 경고 규칙 덮어쓰기 (AlertEngine.config["zones"] 형식)"""
+        with self.store.read_lock():
+            length = self._counters[RULES_LENGTH]
+            data = self._mmap[self.rules_offset:self.rules_offset + length]
+        return json.loads(data) if data else {}
+
+    def set_zone_rules(self, zone: str, overrides: List[Dict]) -> None:
+        """구역 하나의 규칙 덮어쓰기 교체 (다른 구역 규칙은 그대로)"""
+        with self.store.write_lock():
+            length = self._counters[RULES_LENGTH]
+            zones = json.loads(self._mmap[self.rules_offset:self.rules_offset + length]) if length else {}
+            zones[zone] = overrides
+            data = json.dumps(zones, ensure_ascii=False).encode("utf-8")
+            if len(data) > RULES_BYTES:
+                raise ValueError(f"경고 규칙이 공유 영역 크기({RULES_BYTES}바이트)를 넘습니다")
+            self._mmap[self.rules_offset:self.rules_offset + len(data)] = data
+            self._counters[RULES_LENGTH] = len(data)
+            self._counters[RULES_SEQ] += 1
+
+# ============================================
+# dict 대신 사용하는 구역별 보기
+# ============================================
+
+class _ZoneView(Mapping):
+    """historical_data_store / rollup_store 자리에 쓰는 읽기 전용 매핑 (다른 워커가 만든 구역도 보임)"""
+
+    def __init__(self, store: SharedStore, index: int):
+        self._store = store
+        self._index = index
+
+    def __getitem__(self, zone: str):
+        buffers = self._store.zone_buffers(zone, create=False)
+        if buffers is None:
+            raise KeyError(zone)
+        return buffers[self._index]
+
+    def __iter__(self):
+        return iter(self._store.zone_names())
+
+    def __len__(self) -> int:
+        return len(self._store.zone_names())
+
+    def update(self, other) -> None:
+        if other:
+            raise RuntimeError("공유 저장소는 파일에서 직접 복원됩니다")
+
+
+class SharedLatestMap(MutableMapping):
+    """sensor_data_store 자리에 쓰는 매핑 (값은 공유 메모리에 있고 읽을 때 모델 생성)"""
+
+    def __init__(self, store: SharedStore, factory: Callable):
+        self._store = store
+        self._factory = factory
+
+    def __getitem__(self, zone: str):
+        latest = self._store.latest(zone)
+        if latest is None:
+            raise KeyError(zone)
+        _, ts, temperature, gas, dust, flame = latest
+        return self._factory(zone=zone, temperature=temperature, gas=gas, dust=dust, flame=flame,
+                             timestamp=datetime.fromtimestamp(ts))
+
+    def __setitem__(self, zone: str, data) -> None:
+        self._store.set_latest(zone, data.timestamp.timestamp(), data.temperature, data.gas, data.dust, data.flame)
+
+    def __delitem__(self, zone: str) -> None:
+        raise RuntimeError("공유 저장소의 최신값은 삭제할 수 없습니다")
+
+    def __iter__(self):
+        return iter([zone for zone in self._store.zone_names() if self._store.latest(zone) is not None])
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+def open_shared_store() -> Optional[SharedStore]:
+    """PRISM_STORAGE=shared일 때만 공유 저장소 열기 (PRISM_DATA_DIR/shared_store.bin)"""
+    if os.getenv("PRISM_STORAGE", "memory").lower() != "shared":
+        return None
+    if fcntl is None:
+        raise RuntimeError("PRISM_STORAGE=shared는 리눅스/유닉스에서만 지원합니다")
+    return SharedStore(os.path.join(os.getenv("PRISM_DATA_DIR", "data"), "shared_store.bin"))
@@ -0,0 +1,328 @@
+"""
+PRISM 장치 SSH 명령 실행 (asyncssh 연결 풀)
+- 장치별 SSH 연결을 재사용하고 유휴 시간이 지나면 닫음 (명령마다 새로 접속하지 않음)
+- 장치별 동시 명령 수 제한 (한 연결의 채널 수), 여러 장치 동시 실행 시 전체 동시 실행 수 제한
+- 출력은 줄 단위로 바로 전달 (이벤트 루프를 막지 않음)
+- 연결 함수(connect)를 바꿔 끼울 수 있으므로 로컬 SSH 서버로 시험 가능
+
+환경 변수:
+  PRISM_SSH_USER, PRISM_SSH_PASSWORD, PRISM_SSH_KEY   접속 계정/비밀번호/개인키 경로 (기본 사용자 pi)
+  PRISM_SSH_PORT                                      장치 SSH 포트 (기본 22)
+  PRISM_SSH_KNOWN_HOSTS                               known_hosts 경로 (필수, 없으면 접속하지 않음)
+  PRISM_SSH_INSECURE=1                                known_hosts 없이 호스트 키 검증을 끔 (시험용, 시작 시 경고 로그)
+  PRISM_SSH_IDLE_TIMEOUT                              유휴 연결 유지 시간 (초, 기본 60)
+  PRISM_SSH_MAX_SESSIONS                              장치당 동시 명령 수 (기본 4)
+  PRISM_SSH_CONNECT_TIMEOUT, PRISM_SSH_COMMAND_TIMEOUT 접속/명령 제한 시간 (초, 기본 10/60)
+  PRISM_SSH_SIMULATE=1                                실제로 접속하지 않고 시뮬레이션 출력 반환
+"""
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+try:
+    import asyncssh
+except ImportError:  # 시뮬레이션 모드만 사용 가능
+    asyncssh = None
+
+from structured_logging import get_logger
+
+logger = get_logger("ssh")
+
+CONNECTION_ERRORS = (OSError, asyncssh.Error) if asyncssh is not None else (OSError,)
+
+SSH_PORT = int(os.getenv("PRISM_SSH_PORT", 22))
+IDLE_TIMEOUT = float(os.getenv("PRISM_SSH_IDLE_TIMEOUT", 60))
+MAX_SESSIONS = int(os.getenv("PRISM_SSH_MAX_SESSIONS", 4))
+CONNECT_TIMEOUT = float(os.getenv("PRISM_SSH_CONNECT_TIMEOUT", 10))
+COMMAND_TIMEOUT = float(os.getenv("PRISM_SSH_COMMAND_TIMEOUT", 60))
+INSECURE = os.getenv("PRISM_SSH_INSECURE") == "1"
+REAP_INTERVAL = 5  # 유휴 연결 확인 주기 (초)
+
+# ============================================
+# 예외 / 결과
+# ============================================
+
+class SSHError(Exception):
+    """접속 실패, 연결 끊김 등 (명령이 실패한 경우는 exit_status로 전달)"""
+
+
+class SSHTimeout(SSHError):
+    """접속 또는 명령 실행 제한 시간 초과"""
+
+
+class CommandResult:
+    __slots__ = ("device_id", "command", "exit_status", "stdout", "stderr", "error", "timed_out", "duration")
+
+    def __init__(self, device_id: str, command: str):
+        self.device_id = device_id
+        self.command = command
+        self.exit_status: Optional[int] = None
+        self.stdout = []
+        self.stderr = []
+        self.error: Optional[str] = None
+        self.timed_out = False
+        self.duration = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.exit_status == 0
+
+    def to_dict(self) -> Dict:
+        return {
+            "device_id": self.device_id,
+            "command": self.command,
+            "status": "success" if self.ok else "error",
+            "exit_status": self.exit_status,
+            "output": "".join(self.stdout),
+            "stderr": "".join(self.stderr),
+            "error": self.error,
+            "duration": round(self.duration, 3)
+        }
+
+# ============================================
+# 접속
+# ============================================
+
+async def asyncssh_connect(host: str):
+    """
+    환경 변수 설정으로 장치에 접속 (기본 연결 함수)
+    호스트 키는 PRISM_SSH_KNOWN_HOSTS로 검증 (설정이 없으면 PRISM_SSH_INSECURE=1일 때만 검증 없이 접속)
+    """
+    if asyncssh is None:
+        raise SSHError("asyncssh가 설치되지 않았습니다 (pip install asyncssh)")
+    known_hosts = os.getenv("PRISM_SSH_KNOWN_HOSTS")
+    if not known_hosts and not INSECURE:
+        raise SSHError("PRISM_SSH_KNOWN_HOSTS가 설정되지 않아 호스트 키를 검증할 수 없습니다 "
+                       "(검증 없이 접속하려면 PRISM_SSH_INSECURE=1)")
+    options = {
+        "port": SSH_PORT,
+        "username": os.getenv("PRISM_SSH_USER", "pi"),
+        "known_hosts": known_hosts or None,
+    }
+    if os.getenv("PRISM_SSH_PASSWORD"):
+        options["password"] = os.environ["PRISM_SSH_PASSWORD"]
+    if os.getenv("PRISM_SSH_KEY"):
+        options["client_keys"] = [os.environ["PRISM_SSH_KEY"]]
+    return await asyncssh.connect(host, **options)
+
+
+class DeviceConnection:
+    """장치 하나의 연결과 동시 명령 제한"""
+
+    __slots__ = ("host", "connection", "sessions", "connecting", "active", "last_used")
+
+    def __init__(self, host: str, max_sessions: int):
+        self.host = host
+        self.connection = None
+        self.sessions = asyncio.Semaphore(max_sessions)
+        self.connecting = asyncio.Lock()
+        self.active = 0
+        self.last_used = time.monotonic()
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+# ============================================
+# 연결 풀
+# ============================================
+
+class SSHPool:
+    def __init__(self, connect: Callable[[str], Awaitable] = asyncssh_connect,
+                 idle_timeout: float = IDLE_TIMEOUT, max_sessions: int = MAX_SESSIONS,
+                 connect_timeout: float = CONNECT_TIMEOUT, simulate: Optional[bool] = None):
+        self.connect = connect
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.connect_timeout = connect_timeout
+        self.simulate = os.getenv("PRISM_SSH_SIMULATE") == "1" if simulate is None else simulate
+        self._devices: Dict[str, DeviceConnection] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def open_connections(self) -> int:
+        return sum(1 for device in self._devices.values() if device.connection is not None)
+
+    @property
+    def active_sessions(self) -> int:
+        return sum(device.active for device in self._devices.values())
+
+    # --------------------------------------------
+    # 수명 관리
+    # --------------------------------------------
+
+    def start(self) -> None:
+        if INSECURE and not self.simulate and not os.getenv("PRISM_SSH_KNOWN_HOSTS"):
+            logger.warning("PRISM_SSH_INSECURE=1: 장치 SSH 호스트 키를 검증하지 않습니다 (중간자 공격에 취약)")
+        self._task = asyncio.create_task(self._reap_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for device in self._devices.values():
+            device.close()
+        self._devices.clear()
+
+    async def _reap_loop(self) -> None:
+        while True:
+            await asyncio.sleep(REAP_INTERVAL)
+            self.reap_idle()
+
+    def reap_idle(self, now: Optional[float] = None) -> int:
+        """실행 중인 명령이 없고 유휴 시간이 지난 연결 닫기"""
+        now = time.monotonic() if now is None else now
+        closed = 0
+        for device in self._devices.values():
+            if device.connection is not None and device.active == 0 \
+                    and now - device.last_used >= self.idle_timeout:
+                device.close()
+                closed += 1
+        return closed
+
+    # --------------------------------------------
+    # 세션
+    # --------------------------------------------
+
+    async def _connection(self, device: DeviceConnection, deadline: Optional[float] = None):
+        """살아 있는 연결 반환, 없거나 끊겼으면 다시 접속 (장치당 접속 시도는 하나만)"""
+        async with device.connecting:
+            if device.connection is not None and device.connection.is_closed():
+                device.connection = None
+            if device.connection is None:
+                timeout = self.connect_timeout
+                if deadline is not None:
+                    timeout = min(timeout, max(0.0, deadline - time.monotonic()))
+                try:
+                    device.connection = await asyncio.wait_for(self.connect(device.host), timeout)
+                except asyncio.TimeoutError:
+                    raise SSHTimeout(f"SSH 접속 시간 초과: {device.host}")
+                except CONNECTION_ERRORS as e:
+                    raise SSHError(f"SSH 접속 실패: {device.host}: {e}") from e
+            return device.connection
+
+    @asynccontextmanager
+    async def session(self, host: str, deadline: Optional[float] = None):
+        """
+        장치 연결을 빌려 씀 (장치당 동시 사용 수 제한)
+        deadline(time.monotonic 기준)이 있으면 차례 대기와 접속도 그 안에 끝나야 함 (넘으면 SSHTimeout)
+        """
+        device = self._devices.get(host)
+        if device is None:
+            device = self._devices[host] = DeviceConnection(host, self.max_sessions)
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            await asyncio.wait_for(device.sessions.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise SSHTimeout(f"장치 동시 명령 수 초과로 대기 중 시간 초과: {host}")
+        device.active += 1
+        try:
+            yield await self._connection(device, deadline)
+        finally:
+            device.active -= 1
+            device.last_used = time.monotonic()
+            device.sessions.release()
+
+    # --------------------------------------------
+    # 명령 실행
+    # --------------------------------------------
+
+    async def stream(self, host: str, command: str,
+                     timeout: float = COMMAND_TIMEOUT) -> AsyncIterator[Tuple[str, object]]:
+        """
+        명령 출력을 받는 대로 전달
+        ("stdout", 줄), ("stderr", 줄) ... 마지막에 ("exit", 종료 코드)
+        제한 시간이 지나면 프로세스를 닫고 SSHTimeout
+        """
+        if self.simulate:
+            yield "stdout", "명령 실행 완료 (시뮬레이션)\n"
+            yield "stdout", command + "\n"  # 실제 명령 출력처럼 줄 단위로 전달
+            yield "exit", 0
+            return
+
+        deadline = time.monotonic() + timeout
+        async with self.session(host, deadline) as connection:
+            try:
+                process = await asyncio.wait_for(connection.create_process(command),
+                                                 max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                raise SSHTimeout(f"명령 실행 시간 초과: {host}")
+            except CONNECTION_ERRORS as e:
+                raise SSHError(f"명령 실행 실패: {host}: {e}") from e
+
+            queue: asyncio.Queue = asyncio.Queue()
+
+            async def pump(name: str, reader) -> None:
+                """출력 스트림 하나를 큐로 옮김 (끝나면 None, 연결이 끊기면 예외 객체)"""
+                try:
+                    async for line in reader:
+                        if line:
+                            await queue.put((name, line))
+                    await queue.put((name, None))
+                except CONNECTION_ERRORS as e:
+                    await queue.put((name, e))
+
+            pumps = [asyncio.create_task(pump("stdout", process.stdout)),
+                     asyncio.create_task(pump("stderr", process.stderr))]
+            try:
+                open_streams = len(pumps)
+                while open_streams:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError
+                    name, line = await asyncio.wait_for(queue.get(), remaining)
+                    if isinstance(line, Exception):
+                        raise SSHError(f"SSH 연결이 끊겼습니다: {host}: {line}") from line
+                    if line is None:
+                        open_streams -= 1
+                    else:
+                        yield name, line
+                completed = await asyncio.wait_for(process.wait(), max(0.0, deadline - time.monotonic()))
+                yield "exit", completed.exit_status
+            except asyncio.TimeoutError:
+                raise SSHTimeout(f"명령 실행 시간 초과 ({timeout:g}초): {host}")
+            finally:
+                for task in pumps:
+                    task.cancel()
+                process.close()
+
+    async def run(self, device_id: str, host: str, command: str,
+                  timeout: float = COMMAND_TIMEOUT) -> CommandResult:
+        """명령 실행 후 전체 출력 반환 (접속 실패/시간 초과는 result.error에 기록)"""
+        result = CommandResult(device_id, command)
+        started = time.monotonic()
+        try:
+            async for name, value in self.stream(host, command, timeout):
+                if name == "exit":
+                    result.exit_status = value
+                else:
+                    getattr(result, name).append(value)
+        except SSHError as e:
+            result.error = str(e)
+            result.timed_out = isinstance(e, SSHTimeout)
+        result.duration = time.monotonic() - started
+        return result
+
+    async def run_many(self, targets: Iterable[Tuple[str, str]], command: str, parallelism: int,
+                       timeout: float = COMMAND_TIMEOUT) -> AsyncIterator[CommandResult]:
+        """
+        (장치 ID, 호스트) 여러 개에 같은 명령 실행, 끝나는 순서대로 결과 전달
+        동시에 실행하는 장치 수는 parallelism 이하 (장치별 제한은 그대로 적용)
+        """
+        limit = asyncio.Semaphore(max(1, parallelism))
+
+        async def run_one(device_id: str, host: str) -> CommandResult:
+            async with limit:
+                return await self.run(device_id, host, command, timeout)
+
+        tasks = [asyncio.create_task(run_one(device_id, host)) for device_id, host in targets]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,497 @@
+"""
+PRISM 센서 데이터 영구 저장소
+- MemoryBackend: 저장하지 않음 (기본값, 재시작하면 데이터 초기화)
+- SegmentLogBackend: 추가 전용 세그먼트 로그 + 주기적 체크포인트
+
+세그먼트 로그 구조 (data_dir/segments/<시작 epoch>.seg, 1시간마다 새 세그먼트):
+  Z 레코드: 구역 이름 정의  <c H B> + 이름(UTF-8)   (세그먼트마다 구역별 최초 1회)
+  S 레코드: 센서 샘플       <c H d d d d>            (구역 번호, timestamp, 온도, 가스, 먼지)
+
+압축 보관 (data_dir/archive/<시작 epoch>.arc, 하루마다 새 파일, PRISM_ARCHIVE_DAYS가 지나면 삭제):
+  A 레코드: 닫힌 이력 청크   <c B I> + 구역(UTF-8) + 청크(history_archive.py 형식)
+
+체크포인트 (data_dir/checkpoint.bin):
+  매직 + 헤더(JSON: 롤업 계층 크기, 최신 센서값, 장치 정보, 세그먼트 위치) + 롤업 배열 바이트
+  재시작 시 체크포인트에서 롤업/장치 정보를 복원하고,
+  최근 24시간을 덮는 세그먼트만 mmap으로 읽어 원본 링 버퍼를 다시 채움
+  압축 청크는 헤더만 읽고 압축된 채로 메모리에 올림
+"""
+
+import json
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from history_archive import ARCHIVE_RETENTION_SECONDS, ZoneArchive
+from history_store import HISTORY_RETENTION_SECONDS, ZoneHistory, ZoneRollups
+
+# ============================================
+# 설정
+# ============================================
+
+SEGMENT_SECONDS = 60 * 60          # 세그먼트 교체 주기 (1시간)
+FSYNC_INTERVAL = 1.0               # 디스크 동기화 주기 (초)
+WRITE_BATCH_SIZE = 1024            # 한 번에 기록할 최대 레코드 수
+CHECKPOINT_INTERVAL = 5 * 60       # 체크포인트 주기 (초)
+ARCHIVE_FILE_SECONDS = 24 * 60 * 60  # 압축 보관 파일 교체 주기 (하루)
+
+ZONE_RECORD = struct.Struct("<cHB")
+SAMPLE_RECORD = struct.Struct("<cHdddd")
+ARCHIVE_RECORD = struct.Struct("<cBI")
+CHECKPOINT_MAGIC = b"PRISMCK1"
+CHECKPOINT_HEADER = struct.Struct("<I")
+
+# ============================================
+# 저장소 인터페이스
+# ============================================
+
+class StorageBackend:
+    """
+    저장소 백엔드 기본 클래스 (아무것도 저장하지 않음)
+    모든 메서드는 이벤트 루프에서 호출되므로 블로킹 I/O를 하면 안 됨
+    """
+
+    def load(self) -> Dict:
+        """
+        저장된 상태 복원
+        반환: {"histories": {zone: ZoneHistory}, "rollups": {zone: ZoneRollups},
+               "archives": {zone: ZoneArchive}, "latest": {zone: dict}, "devices": {device_id: dict}}
+        """
+        return {"histories": {}, "rollups": {}, "archives": {}, "latest": {}, "devices": {}}
+
+    def append_sample(self, zone: str, ts: float, temperature: float, gas: float, dust: float) -> None:
+        pass
+
+    def append_samples(self, zone: str, rows: List[Tuple[float, float, float, float]]) -> None:
+        """(timestamp, temperature, gas, dust) 행 여러 개를 한 번에 기록"""
+        for row in rows:
+            self.append_sample(zone, *row)
+
+    def append_chunk(self, zone: str, payload: bytes) -> None:
+        """닫힌 이력 청크 (history_archive.encode_chunk 결과) 기록"""
+        pass
+
+    def checkpoint(self, rollups: Dict[str, ZoneRollups], latest: Dict[str, Dict],
+                   devices: Dict[str, Dict]) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    @property
+    def queue_depth(self) -> int:
+        """기록 대기 중인 큐 항목 수"""
+        return 0
+
+
+class MemoryBackend(StorageBackend):
+    """인메모리 전용 (영구 저장 없음)"""
+
+# ============================================
+# 세그먼트 로그 저장소
+# ============================================
+
+class SegmentLogBackend(StorageBackend):
+    """
+    추가 전용 세그먼트 로그
+    기록은 백그라운드 스레드가 큐에서 모아서 일괄 처리하므로 이벤트 루프를 막지 않음
+    """
+
+    def __init__(self, data_dir: str, segment_seconds: float = SEGMENT_SECONDS):
+        self.data_dir = data_dir
+        self.segment_dir = os.path.join(data_dir, "segments")
+        self.archive_dir = os.path.join(data_dir, "archive")
+        self.checkpoint_path = os.path.join(data_dir, "checkpoint.bin")
+        self.segment_seconds = segment_seconds
+        os.makedirs(self.segment_dir, exist_ok=True)
+        os.makedirs(self.archive_dir, exist_ok=True)
+
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._file = None
+        self._segment_name: Optional[str] = None
+        self._segment_start = 0.0
+        self._zone_ids: Dict[str, int] = {}
+        self._last_fsync = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._archive_file = None
+        self._archive_start = 0.0
+
+    # --------------------------------------------
+    # 이벤트 루프에서 호출
+    # --------------------------------------------
+
+    def append_sample(self, zone: str, ts: float, temperature: float, gas: float, dust: float) -> None:
+        self._queue.put(("S", zone, ts, temperature, gas, dust))
+
+    def append_samples(self, zone: str, rows: List[Tuple[float, float, float, float]]) -> None:
+        self._queue.put(("B", zone, rows))
+
+    def append_chunk(self, zone: str, payload: bytes) -> None:
+        self._queue.put(("A", zone, payload))
+
+    def checkpoint(self, rollups: Dict[str, ZoneRollups], latest: Dict[str, Dict],
+                   devices: Dict[str, Dict]) -> None:
+        """
+        롤업 배열을 복사한 뒤 기록 스레드에 넘김
+        큐 순서대로 처리되므로 체크포인트 이전 샘플은 모두 세그먼트에 기록된 상태
+        """
+        snapshot = {
+            zone: [(tier.bucket_seconds, tier.columns()) for tier in zone_rollups.tiers]
+            for zone, zone_rollups in rollups.items()
+        }
+        self._queue.put(("C", snapshot, latest, devices, time.time()))
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def load(self) -> Dict:
+        """
+        체크포인트 복원 후 최근 세그먼트만 mmap으로 읽어 원본 버퍼 재구성
+        체크포인트 이후 레코드만 롤업에 다시 반영
+        """
+        state = super().load()
+        position = self._load_checkpoint(state)
+        window_start = time.time() - HISTORY_RETENTION_SECONDS
+
+        segments = self._list_segments()
+        first = 0
+        for i, (start, _) in enumerate(segments):
+            next_start = segments[i + 1][0] if i + 1 < len(segments) else float("inf")
+            if next_start <= window_start and position is not None and _segment_key(position[0]) > start:
+                first = i + 1
+        for start, name in segments[first:]:
+            if position is not None and _segment_key(position[0]) > start:
+                replay_from = None  # 체크포인트 이전 세그먼트: 원본 버퍼만 복원
+            elif position is not None and position[0] == name:
+                replay_from = position[1]
+            else:
+                replay_from = 0
+            self._replay_segment(name, state, window_start, replay_from)
+        self._load_archive(state)
+
+        self._thread = threading.Thread(target=self._run, name="prism-storage", daemon=True)
+        self._thread.start()
+        return state
+
+    # --------------------------------------------
+    # 기록 스레드
+    # --------------------------------------------
+
+    def _run(self) -> None:
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            buffer = bytearray()
+            for item in batch:
+                if item is None:
+                    running = False
+                    continue
+                if item[0] in ("S", "B"):
+                    if self._rotation_due():
+                        self._write(buffer)
+                        buffer = bytearray()
+                        self._rotate()
+                    if item[0] == "S":
+                        buffer += self._encode_sample(*item[1:])
+                    else:
+                        zone = item[1]
+                        for row in item[2]:
+                            buffer += self._encode_sample(zone, *row)
+                elif item[0] == "A":
+                    self._write_chunk(*item[1:])
+                else:
+                    self._write(buffer)
+                    buffer = bytearray()
+                    self._write_checkpoint(*item[1:])
+            self._write(buffer)
+
+            now = time.monotonic()
+            if self._file is not None and (not running or now - self._last_fsync >= FSYNC_INTERVAL):
+                os.fsync(self._file.fileno())
+                self._last_fsync = now
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._archive_file is not None:
+            self._archive_file.close()
+            self._archive_file = None
+
+    def _encode_sample(self, zone: str, ts: float, temperature: float, gas: float, dust: float) -> bytes:
+        zone_id = self._zone_ids.get(zone)
+        prefix = b""
+        if zone_id is None:
+            zone_id = self._zone_ids[zone] = len(self._zone_ids)
+            name = zone.encode("utf-8")[:255]
+            prefix = ZONE_RECORD.pack(b"Z", zone_id, len(name)) + name
+        return prefix + SAMPLE_RECORD.pack(b"S", zone_id, ts, temperature, gas, dust)
+
+    def _write(self, buffer: bytearray) -> None:
+        if buffer:
+            self._file.write(buffer)
+            self._file.flush()
+
+    def _rotation_due(self) -> bool:
+        return self._file is None or time.time() - self._segment_start >= self.segment_seconds
+
+    def _rotate(self) -> None:
+        """현재 세그먼트를 닫고 새 세그먼트 시작 (구역 번호는 세그먼트마다 새로 부여)"""
+        now = time.time()
+        if self._file is not None:
+            os.fsync(self._file.fileno())
+            self._file.close()
+        self._segment_start = now
+        self._segment_name = f"{int(now * 1000):015d}.seg"
+        self._file = open(os.path.join(self.segment_dir, self._segment_name), "ab", buffering=0)
+        self._zone_ids = {}
+        self._prune_segments()
+
+    def _prune_segments(self) -> None:
+        """원본 보존 기간이 지났고 체크포인트에 반영된 세그먼트 삭제"""
+        cutoff = time.time() - HISTORY_RETENTION_SECONDS
+        checkpoint_key = self._checkpoint_segment_key()
+        segments = self._list_segments()
+        for i, (start, name) in enumerate(segments[:-1]):
+            next_start = segments[i + 1][0]
+            if next_start < cutoff and checkpoint_key is not None and start < checkpoint_key:
+                os.remove(os.path.join(self.segment_dir, name))
+
+    def _write_chunk(self, zone: str, payload: bytes) -> None:
+        """
+        압축 청크는 구역별로 1시간에 하나 정도라 바로 fsync
+        (원본 세그먼트가 24시간 뒤 삭제되므로 청크가 유일한 사본이 됨)
+        """
+        now = time.time()
+        if self._archive_file is None or now - self._archive_start >= ARCHIVE_FILE_SECONDS:
+            if self._archive_file is not None:
+                self._archive_file.close()
+            self._archive_start = now
+            name = f"{int(now * 1000):015d}.arc"
+            self._archive_file = open(os.path.join(self.archive_dir, name), "ab", buffering=0)
+            self._prune_archive()
+        encoded = zone.encode("utf-8")[:255]
+        self._archive_file.write(ARCHIVE_RECORD.pack(b"A", len(encoded), len(payload)) + encoded + payload)
+        os.fsync(self._archive_file.fileno())
+
+    def _prune_archive(self) -> None:
+        """다음 파일 시작 시각까지 보관 기간이 지난 압축 보관 파일 삭제"""
+        cutoff = time.time() - ARCHIVE_RETENTION_SECONDS
+        files = self._list_archive_files()
+        for i, (start, name) in enumerate(files[:-1]):
+            if files[i + 1][0] < cutoff:
+                os.remove(os.path.join(self.archive_dir, name))
+
+    def _write_checkpoint(self, snapshot, latest, devices, created_at) -> None:
+        """임시 파일에 쓴 뒤 교체하여 원자적으로 체크포인트 갱신"""
+        header = {
+            "created_at": created_at,
+            "segment": self._segment_name,
+            "offset": self._file.tell() if self._file is not None else 0,
+            "latest": latest,
+            "devices": devices,
+            "rollups": {
+                zone: [[bucket, len(columns[0])] for bucket, columns in tiers]
+                for zone, tiers in snapshot.items()
+            },
+        }
+        header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(CHECKPOINT_MAGIC)
+            f.write(CHECKPOINT_HEADER.pack(len(header_bytes)))
+            f.write(header_bytes)
+            for tiers in snapshot.values():
+                for _, columns in tiers:
+                    for column in columns:
+                        f.write(column.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+
+    # --------------------------------------------
+    # 복원
+    # --------------------------------------------
+
+    def _list_segments(self) -> List[Tuple[float, str]]:
+        names = sorted(n for n in os.listdir(self.segment_dir) if n.endswith(".seg"))
+        return [(_segment_key(n), n) for n in names]
+
+    def _list_archive_files(self) -> List[Tuple[float, str]]:
+        names = sorted(n for n in os.listdir(self.archive_dir) if n.endswith(".arc"))
+        return [(_segment_key(n), n) for n in names]
+
+    def _checkpoint_segment_key(self) -> Optional[float]:
+        position = _read_checkpoint_position(self.checkpoint_path)
+        return _segment_key(position[0]) if position else None
+
+    def _load_checkpoint(self, state: Dict) -> Optional[Tuple[str, int]]:
+        if not os.path.exists(self.checkpoint_path) or os.path.getsize(self.checkpoint_path) == 0:
+            return None
+        with open(self.checkpoint_path, "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:len(CHECKPOINT_MAGIC)] != CHECKPOINT_MAGIC:
+                return None
+            offset = len(CHECKPOINT_MAGIC)
+            (header_len,) = CHECKPOINT_HEADER.unpack_from(mm, offset)
+            offset += CHECKPOINT_HEADER.size
+            header = json.loads(mm[offset:offset + header_len].decode("utf-8"))
+            offset += header_len
+
+            view = memoryview(mm)
+            try:
+                for zone, tiers in header["rollups"].items():
+                    zone_rollups = ZoneRollups()
+                    for tier, (bucket, rows) in zip(zone_rollups.tiers, tiers):
+                        columns = []
+                        for _ in range(tier.width):
+                            column = array("d")
+                            column.frombytes(view[offset:offset + rows * 8])
+                            offset += rows * 8
+                            columns.append(column)
+                        if tier.bucket_seconds == bucket:
+                            tier.restore(columns)
+                    state["rollups"][zone] = zone_rollups
+            finally:
+                view.release()
+
+        state["latest"].update(header["latest"])
+        state["devices"].update(header["devices"])
+        if header["segment"] is None:
+            return None
+        return header["segment"], header["offset"]
+
+    def _replay_segment(self, name: str, state: Dict, window_start: float,
+                        replay_from: Optional[int]) -> None:
+        """
+        세그먼트를 mmap으로 읽어 복원
+        - window_start 이후 샘플: 원본 링 버퍼에 추가
+        - replay_from 이후 레코드: 롤업에도 반영 (None이면 반영하지 않음)
+        기록 도중 중단되어 잘린 마지막 레코드는 무시
+        """
+        path = os.path.join(self.segment_dir, name)
+        if os.path.getsize(path) == 0:
+            return
+        histories = state["histories"]
+        rollups = state["rollups"]
+        zones: Dict[int, str] = {}
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = len(mm)
+            offset = 0
+            while offset < size:
+                kind = mm[offset:offset + 1]
+                if kind == b"S":
+                    if offset + SAMPLE_RECORD.size > size:
+                        break
+                    _, zone_id, ts, temperature, gas, dust = SAMPLE_RECORD.unpack_from(mm, offset)
+                    zone = zones.get(zone_id)
+                    if zone is not None:
+                        if ts > window_start:
+                            history = histories.get(zone)
+                            if history is None:
+                                history = histories[zone] = ZoneHistory()
+                            history.append(ts, temperature, gas, dust)
+                        if replay_from is not None and offset >= replay_from:
+                            zone_rollups = rollups.get(zone)
+                            if zone_rollups is None:
+                                zone_rollups = rollups[zone] = ZoneRollups()
+                            zone_rollups.add(ts, temperature, gas, dust)
+                    offset += SAMPLE_RECORD.size
+                elif kind == b"Z":
+                    if offset + ZONE_RECORD.size > size:
+                        break
+                    _, zone_id, name_len = ZONE_RECORD.unpack_from(mm, offset)
+                    offset += ZONE_RECORD.size
+                    if offset + name_len > size:
+                        break
+                    zones[zone_id] = mm[offset:offset + name_len].decode("utf-8", "replace")
+                    offset += name_len
+                else:
+                    break
+
+
+    def _load_archive(self, state: Dict) -> None:
+        """
+        압축 보관 파일의 청크를 압축된 채로 구역별 보관소에 추가
+        보관 기간이 지난 청크와 기록 도중 잘린 마지막 레코드는 무시
+        """
+        archives = state["archives"]
+        cutoff = time.time() - ARCHIVE_RETENTION_SECONDS
+        for _, name in self._list_archive_files():
+            path = os.path.join(self.archive_dir, name)
+            if os.path.getsize(path) == 0:
+                continue
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                size = len(mm)
+                offset = 0
+                while offset + ARCHIVE_RECORD.size <= size:
+                    kind, name_len, payload_len = ARCHIVE_RECORD.unpack_from(mm, offset)
+                    start = offset + ARCHIVE_RECORD.size
+                    end = start + name_len + payload_len
+                    if kind != b"A" or end > size:
+                        break
+                    zone = mm[start:start + name_len].decode("utf-8", "replace")
+                    archive = archives.get(zone)
+                    if archive is None:
+                        archive = archives[zone] = ZoneArchive()
+                    try:
+                        archive.restore(mm[start + name_len:end])
+                    except (ValueError, struct.error):
+                        break
+                    offset = end
+        for archive in archives.values():
+            archive.expire(cutoff)
+
+
+def _segment_key(name: str) -> float:
+    """세그먼트 파일 이름 → 시작 시각 (epoch 초)"""
+    return int(name.split(".", 1)[0]) / 1000
+
+
+def _read_checkpoint_position(path: str) -> Optional[Tuple[str, int]]:
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(CHECKPOINT_MAGIC)) != CHECKPOINT_MAGIC:
+                return None
+            (header_len,) = CHECKPOINT_HEADER.unpack(f.read(CHECKPOINT_HEADER.size))
+            header = json.loads(f.read(header_len).decode("utf-8"))
+    except (OSError, ValueError, struct.error):
+        return None
+    if header.get("segment") is None:
+        return None
+    return header["segment"], header["offset"]
+
+# ============================================
+# 백엔드 생성
+# ============================================
+
+def create_storage_backend() -> StorageBackend:
+    """
+    환경 변수로 저장소 선택
+    PRISM_STORAGE=memory (기본) | segment | shared
+    PRISM_DATA_DIR=세그먼트/체크포인트 저장 경로 (기본 ./data)
+    shared는 이력이 공유 mmap 파일(shared_store.py)에 바로 남으므로 별도 기록 없음
+    """
+    kind = os.getenv("PRISM_STORAGE", "memory").lower()
+    if kind == "segment":
+        return SegmentLogBackend(os.getenv("PRISM_DATA_DIR", "data"))
+    if kind not in ("memory", "shared"):
+        raise ValueError(f"지원하지 않는 저장소입니다: {kind}")
+    return MemoryBackend()
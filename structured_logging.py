@@ -0,0 +1,199 @@
+"""
+PRISM 구조화 로깅
+- 요청 처리 쪽에서는 QueueHandler로 큐에 넣기만 하고, 포맷/출력은 별도 스레드(QueueListener)에서 처리
+- 고빈도 수신 로그는 N건 중 1건만 기록 (샘플링)
+- 구역별 로그 레벨 설정
+- 고정된 필드 순서의 JSON 한 줄 형식 (Render 로그 검색용)
+
+환경 변수:
+  PRISM_LOG_LEVEL        기본 로그 레벨 (기본 INFO)
+  PRISM_LOG_FORMAT       json | text (기본 json)
+  PRISM_LOG_SAMPLE_RATE  수신 로그 기록 비율 0~1 (기본 0.01 = 100건 중 1건, 0이면 기록 안 함)
+  PRISM_LOG_ZONE_LEVELS  구역별 로그 레벨 (예: "warehouse=DEBUG,testbox=WARNING")
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from datetime import datetime
+from typing import Dict, Optional
+
+LOG_QUEUE_SIZE = 10000  # 출력 대기 로그 수 (가득 차면 새 로그는 버림)
+
+# ============================================
+# 포맷
+# ============================================
+
+class JsonFormatter(logging.Formatter):
+    """
+    한 줄 JSON: ts, level, logger, msg 다음에 zone/device_id 등 추가 필드
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """로컬 개발용 사람이 읽기 쉬운 형식"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            text += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return text
+
+# ============================================
+# 비동기 출력 (큐 + 리스너 스레드)
+# ============================================
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    기본 QueueHandler는 호출한 스레드에서 메시지를 포맷하므로,
+    포맷은 리스너 스레드로 미루고 큐가 가득 차면 대기하지 않고 버림
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+# ============================================
+# 구역별 레벨 / 샘플링
+# ============================================
+
+def parse_zone_levels(value: str) -> Dict[str, int]:
+    """"warehouse=DEBUG,testbox=WARNING" → {"warehouse": 10, "testbox": 30}"""
+    levels = {}
+    for item in value.split(","):
+        zone, _, level = item.partition("=")
+        if zone.strip() and level.strip():
+            levels[zone.strip()] = logging.getLevelName(level.strip().upper())
+    return levels
+
+
+class ZoneLevelFilter(logging.Filter):
+    """
+    zone 필드가 있는 로그는 구역별 레벨, 나머지는 기본 레벨 기준으로 거름
+    로거 레벨은 가장 낮은 설정 레벨로 두므로 (구역별 DEBUG 허용) 레벨 판단은 모두 여기서 함
+    """
+
+    def __init__(self, zone_levels: Dict[str, int], default_level: int = logging.INFO):
+        super().__init__()
+        self.zone_levels = zone_levels
+        self.default_level = default_level
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        fields = getattr(record, "fields", None)
+        zone = fields.get("zone") if fields else None
+        return record.levelno >= self.zone_levels.get(zone, self.default_level)
+
+
+class SampledLogger:
+    """
+    고빈도 로그용 래퍼: 구역별로 N건 중 1건만 기록
+    거른 로그는 LogRecord도 만들지 않으므로 비용이 수신량에 비례해 커지지 않음
+    기록되는 로그에는 sample_every(대표하는 건수) 필드가 붙음
+    """
+
+    def __init__(self, logger: logging.Logger, rate: float, zone_levels: Dict[str, int],
+                 default_level: int = logging.INFO):
+        self.logger = logger
+        self.every = round(1 / rate) if rate > 0 else 0
+        self.zone_levels = zone_levels
+        self.default_level = default_level
+        self._counts: Dict[str, int] = {}
+
+    def enabled(self, zone: str, level: int = logging.INFO) -> bool:
+        return level >= self.zone_levels.get(zone, self.default_level)
+
+    def log(self, level: int, zone: str, msg: str, *args, **fields) -> None:
+        if not self.every or not self.enabled(zone, level):
+            return
+        count = self._counts.get(zone, 0)
+        self._counts[zone] = count + 1
+        if count % self.every:
+            return
+        fields["zone"] = zone
+        fields["sample_every"] = self.every
+        self.logger.log(level, msg, *args, extra={"fields": fields})
+
+    def info(self, zone: str, msg: str, *args, **fields) -> None:
+        self.log(logging.INFO, zone, msg, *args, **fields)
+
+# ============================================
+# 설정
+# ============================================
+
+_handler: Optional[DeferredQueueHandler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+_zone_levels: Dict[str, int] = {}
+_default_level = logging.INFO
+_sample_rate = 0.01
+
+
+def setup_logging() -> None:
+    """prism 로거에 큐 핸들러 연결 (여러 번 호출해도 한 번만 설정)"""
+    global _handler, _listener, _zone_levels, _default_level, _sample_rate
+    if _listener is not None:
+        return
+
+    _zone_levels = parse_zone_levels(os.getenv("PRISM_LOG_ZONE_LEVELS", ""))
+    _default_level = logging.getLevelName(os.getenv("PRISM_LOG_LEVEL", "INFO").upper())
+    _sample_rate = float(os.getenv("PRISM_LOG_SAMPLE_RATE", 0.01))
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(TextFormatter() if os.getenv("PRISM_LOG_FORMAT") == "text" else JsonFormatter())
+
+    _handler = DeferredQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    _handler.addFilter(ZoneLevelFilter(_zone_levels, _default_level))
+
+    # 구역별 레벨이 기본 레벨보다 낮을 수 있으므로 로거는 가장 낮은 레벨로 두고 필터에서 거름
+    root = logging.getLogger("prism")
+    root.setLevel(min([_default_level, *_zone_levels.values()]))
+    root.addHandler(_handler)
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def get_logger(name: str) -> logging.Logger:
+    setup_logging()
+    return logging.getLogger(f"prism.{name}")
+
+
+def get_sampled_logger(name: str) -> SampledLogger:
+    return SampledLogger(get_logger(name), _sample_rate, _zone_levels, _default_level)
+
+
+def dropped_count() -> int:
+    """큐가 가득 차서 버린 로그 수"""
+    return _handler.dropped if _handler is not None else 0